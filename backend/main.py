@@ -1,18 +1,37 @@
 # backend/main.py
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
+import asyncio
 import tempfile
+import threading
+import time
+from collections import defaultdict
 import os
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, Optional, List
 
 # Add the parent directory to the Python path to import from src
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.logs_analysis import DocumentAnalysis
 from src.chatbot import ChatBot
-from prompt_templates.templates import default_chat_template
+from src.llm_client import get_llm_client
+from src.cache import get_cache
+from src.jobs import Job, JobManager
+from src.session_store import SessionStore
+from src.log_index import LogIndex
+from src.log_parsers import detect_parser, get_parser, sniff_file
+from src.live_analysis import LiveAnalysis
+from src.uploads import UploadSpool, UploadTooLargeError, split_compression
+from src.event_store import get_event_store
+from src.event_table import EventTable
+from src.tokens import truncate_to_tokens
+from src.streaming import sse_event, SSE_MEDIA_TYPE
+from src import config
+from src import metrics
+from prompt_templates.templates import retrieval_chat_template
 
 app = FastAPI(title="Network Logs Analysis API", version="1.0.0")
 
@@ -25,135 +44,622 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variables to store analysis results and chatbot
-analysis_results = {}
-chatbot_instance = None
+# Analysis results and chatbots are kept per frontend session
+SESSION_HEADER = "X-Session-ID"
+DEFAULT_SESSION_ID = "default"
+
+def delete_stored_events(session):
+    """
+    Delete the stored events of a session's upload, when the session is deleted or evicted
+    """
+    upload_id = session.analysis_results.get("upload_id")
+    if upload_id:
+        get_event_store().delete(upload_id)
+        append_locks.pop(upload_id, None)
+
+session_store = SessionStore(on_evict=delete_stored_events)
+
+# Analyses run in the background so the event loop stays free for other requests
+job_manager = JobManager()
+
+# The log format is sniffed from the contents; the extension only filters out unrelated files.
+# A trailing .gz or .zst marks a compressed upload
+UPLOAD_EXTENSIONS = (".csv", ".txt", ".log")
+
+# Routes taking a multipart upload, whose request body is limited before it is parsed,
+# with room for the multipart boundaries and part headers around the file
+UPLOAD_PATHS = ("/upload-logs", "/append-logs")
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Batches appended to one upload are applied one at a time, in arrival order
+append_locks = defaultdict(threading.Lock)
+
+# How often a waiting /chat request checks whether its client is still connected
+DISCONNECT_POLL_INTERVAL = 0.5
+
+class InstrumentRequests:
+    """
+    Record the latency of each request by route, and profile it with cProfile when it is sent with
+    X-Profile: 1 and profiling is enabled; background jobs the request starts are profiled too.
+    The profile of an async request also covers whatever else the event loop ran meanwhile.
+
+    A plain ASGI middleware rather than @app.middleware("http"), which would hide client
+    disconnects from the endpoints (see cancel_on_disconnect).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        profile = dict(scope["headers"]).get(metrics.PROFILE_HEADER.lower().encode()) == b"1"
+        token = metrics.request_profiling(profile)
+        profiler = metrics.start_profile() if metrics.profiling_requested() else None
+        started = time.perf_counter()
+
+        async def send_instrumented(message):
+            nonlocal profiler
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                path = route.path if route else "unmatched"
+                metrics.record_request(scope["method"], path, message["status"], time.perf_counter() - started)
+                if profiler is not None:
+                    profile_path = metrics.stop_profile(profiler, f"{scope['method']} {path}")
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"x-profile-file", profile_path.encode())]}
+                    profiler = None
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_instrumented)
+        finally:
+            metrics.end_profiling_request(token)
+            if profiler is not None:
+                profiler.disable()
+
+class LimitUploadSize:
+    """
+    Reject upload requests larger than UPLOAD_MAX_BYTES before their multipart body is parsed
+
+    Starlette parses the whole form, spooling the file to a temporary file, before the endpoint
+    runs, so the limit cannot be enforced there. A declared Content-Length over the limit is
+    answered with 413 without reading the body; a body without one (chunked) is counted as it
+    is received and the request fails with 413 once it goes over.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in UPLOAD_PATHS:
+            return await self.app(scope, receive, send)
+        max_bytes = config.UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+        detail = f"Upload exceeds the limit of {config.UPLOAD_MAX_BYTES} bytes"
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            response = JSONResponse({"detail": detail}, status_code=413, headers={"Connection": "close"})
+            return await response(scope, receive, send)
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # FastAPI lets an HTTPException raised while reading the body through as the response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+app.add_middleware(LimitUploadSize)
+
+# no middleware at all unless it is needed, so disabled instrumentation costs nothing per request
+if config.METRICS_ENABLED or config.PROFILING_ENABLED:
+    app.add_middleware(InstrumentRequests)
 
 class ChatRequest(BaseModel):
     message: str
 
 class ChatResponse(BaseModel):
     response: str
+    prompt_tokens: Optional[int] = None
+    source: Optional[str] = None
+    analysis_version: Optional[str] = None
+
+class QueryRequest(BaseModel):
+    filters: Dict[str, Any] = {}
+    start: Optional[str] = None
+    end: Optional[str] = None
+    group_by: List[str] = []
+    limit: int = 10
+
+def get_analysis_results(session_id):
+    """
+    Analysis results of a session, or a 404 if it has none
+    """
+    session = session_store.get(session_id)
+    if not session or not session.analysis_results:
+        raise HTTPException(status_code=404, detail="No analysis results available. Please upload logs first.")
+    return session.analysis_results
+
+def get_versioned_results(session_id, response, if_none_match):
+    """
+    Analysis results of a session and their version, sent as ETag; a 304 if the client's copy is current
+    """
+    analysis_results = get_analysis_results(session_id)
+    version = session_store.get(session_id).analysis_version
+    etag = f'"{version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match == etag:
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return analysis_results, version
+
+def analysis_version(session_id):
+    session = session_store.get(session_id)
+    return session.analysis_version if session else None
+
+async def cancel_on_disconnect(request, coro):
+    """
+    Await coro, cancelling it if the client disconnects first, so its LLM call leaves the queue
+    (or stops generating) instead of keeping a slot busy for nobody
+    """
+    task = asyncio.ensure_future(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            raise HTTPException(status_code=499, detail="Client disconnected")
+
+def get_chatbot(session_id):
+    """
+    Chatbot of a session, or a 400 if no logs were analyzed in it yet
+    """
+    session = session_store.get(session_id)
+    if not session or not session.chatbot:
+        raise HTTPException(status_code=400, detail="Chatbot not initialized. Please upload logs first.")
+    return session.chatbot
+
+def get_session_job(job_id, session_id):
+    """
+    A job started by the session, or a 404
+    """
+    job = job_manager.get(job_id)
+    if not job or job.owner != session_id:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
 
 @app.get("/")
 async def root():
     return {"message": "Network Logs Analysis API is running"}
 
-@app.post("/upload-logs")
-async def upload_logs(file: UploadFile = File(...)):
+def chat_system_prompt(results):
+    return retrieval_chat_template(truncate_to_tokens(results["logs_analysis"], config.CHAT_ANALYSIS_TOKENS))
+
+def analyse_stored_upload(job, upload_id, session_id):
     """
-    Upload and analyze network logs
+    Background job: analyze an upload from the event store and initialize the session's chatbot with the results
     """
-    global analysis_results, chatbot_instance
-    
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Only .csv files are supported")
-    
+    event_store = get_event_store()
+    doc_analysis = DocumentAnalysis(event_store.path(upload_id), parser=event_store.parser())
+    index = LogIndex()
+    results = doc_analysis.run(progress=job.update, on_token=job.emit, index=index)
+    results = {**results, "upload_id": upload_id}
+
+    # Initialize chatbot with the analysis; log lines are retrieved from the index per question,
+    # count/filter questions are answered from the indexed event table
+    job.update("initializing chatbot")
+    event_table = EventTable.from_store(event_store, upload_id)
+    chatbot = ChatBot(system_prompt=chat_system_prompt(results), index=index, event_table=event_table)
+
+    session_store.update(session_id, analysis_results=results, chatbot=chatbot)
+    return results
+
+def analyse_uploaded_file(job, temp_file_path, session_id, parser=None):
+    """
+    Background job: parse the uploaded logs once into the event store, then analyze them from there
+    """
+    try:
+        job.update("storing events")
+        get_event_store().ingest(temp_file_path, parser or detect_parser(temp_file_path), job.id)
+    finally:
+        os.unlink(temp_file_path)
+    return analyse_stored_upload(job, job.id, session_id)
+
+async def save_upload(file):
+    """
+    Copy an upload to a temporary file piece by piece, decompressing .gz/.zst uploads on the fly
+
+    By the time the endpoint runs, Starlette has already received the whole multipart body and
+    spooled the file to its own temporary file; the request size is limited before that by
+    LimitUploadSize. Here only one piece of the upload is held in memory at a time, and the
+    decompressed size limit of src/config.py is enforced as the pieces are inflated.
+
+    Output:
+        string: path of the temporary file
+    """
+    name, compression = split_compression(file.filename)
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in UPLOAD_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Only {', '.join(UPLOAD_EXTENSIONS)} files are supported, "
+                                                    f"optionally gzip or zstd compressed")
+    if file.size is not None and file.size > config.UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the limit of {config.UPLOAD_MAX_BYTES} bytes")
+
+    fd, temp_file_path = tempfile.mkstemp(suffix=extension)
     try:
-        # Create a temporary file to store the uploaded content
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.csv') as temp_file:
-            content = await file.read()
-            temp_file.write(content.decode('utf-8'))
-            temp_file_path = temp_file.name
-        
-        # Analyze the logs
-        doc_analysis = DocumentAnalysis(temp_file_path)
-        results = doc_analysis.run()
-        
-        # Store results globally
-        analysis_results = results
-        
-        # Initialize chatbot with the analysis
-        system_prompt = default_chat_template(results["logs_analysis"])
-        chatbot_instance = ChatBot(system_prompt=system_prompt)
-        
-        # Clean up temporary file
+        with UploadSpool(os.fdopen(fd, "wb"), compression) as spool:
+            while True:
+                piece = await file.read(config.UPLOAD_CHUNK_BYTES)
+                if not piece:
+                    break
+                # decompression is CPU work, keep it off the event loop
+                await asyncio.to_thread(spool.write, piece)
+    except UploadTooLargeError as e:
+        os.unlink(temp_file_path)
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
         os.unlink(temp_file_path)
-        
-        return {
-            "message": "File uploaded and analyzed successfully",
-            "filename": file.filename,
-            "analysis_available": True
-        }
-        
+        raise HTTPException(status_code=400, detail=f"Upload failed: {str(e)}")
     except Exception as e:
-        # Clean up temporary file in case of error
-        if 'temp_file_path' in locals():
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        os.unlink(temp_file_path)
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    return temp_file_path
+
+@app.post("/upload-logs")
+async def upload_logs(file: UploadFile = File(...),
+                      session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
+    """
+    Upload network logs and start analyzing them in the background
+
+    Returns a job ID immediately; poll /jobs/{job_id} for progress and results.
+    """
+    temp_file_path = await save_upload(file)
+
+    try:
+        parser = detect_parser(temp_file_path)
+    except Exception as e:
+        os.unlink(temp_file_path)
+        raise HTTPException(status_code=400, detail=f"Unsupported log format: {str(e)}")
+
+    job = job_manager.submit(file.filename, analyse_uploaded_file, temp_file_path, session_id, parser,
+                             owner=session_id)
+    return {
+        "message": "File uploaded, analysis started",
+        "filename": file.filename,
+        "log_format": parser.name,
+        "job_id": job.id,
+        "status": job.status
+    }
+
+def append_to_upload(job, temp_file_path, session_id, upload_id, parser):
+    """
+    Background job: store a batch of new log lines with the session's upload and update its analysis
+    from the batch alone
+    """
+    event_store = get_event_store()
+    try:
+        with append_locks[upload_id]:
+            session = session_store.get(session_id)
+            if session is None or session.analysis_results.get("upload_id") != upload_id:
+                raise ValueError("The session's analysis changed while the logs were being appended")
+            live = session.live
+            # a re-analysis replaces the chatbot, and with it the index and table the live state extends
+            if live is None or live.upload_id != upload_id or live.index is not session.chatbot.index:
+                # first append to this upload: rebuild the running state once, before the batch is stored
+                job.update("loading analysis state")
+                live = LiveAnalysis.from_store(event_store, upload_id, session.analysis_results,
+                                               index=session.chatbot.index, event_table=session.chatbot.event_table)
+                session_store.update(session_id, live=live)
+
+            chunks = list(parser.iter_chunks(temp_file_path, 50_000))
+            digest = parser.digest(temp_file_path)
+
+            def store_batch():
+                job.update("storing events")
+                event_store.append(upload_id, chunks, digest)
+
+            # the batch is stored and counted only once its model calls succeeded, so a failed
+            # append can be retried without counting the rows twice
+            results = live.append(chunks, progress=job.update, on_token=job.emit, commit=store_batch)
+            session.chatbot.update_system_prompt(chat_system_prompt(results))
+            session_store.update(session_id, analysis_results=results)
+            return results
+    finally:
+        os.unlink(temp_file_path)
+
+@app.post("/append-logs")
+async def append_logs(file: UploadFile = File(...),
+                      session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
+    """
+    Append new log lines to the session's latest upload, e.g. from a tailed log file
+
+    The batch must be in the format of the original upload; CSV batches start with the header line.
+    Only the new lines are parsed and sent to the LLM, and aggregates, anomaly counters and chat
+    indexes are updated in place. Returns a job ID like /upload-logs.
+    """
+    session = session_store.get(session_id)
+    upload_id = get_analysis_results(session_id).get("upload_id")
+    manifest = get_event_store().manifest(upload_id) if upload_id else None
+    if manifest is None or not session.chatbot:
+        raise HTTPException(status_code=404, detail="The uploaded logs are no longer stored. Please upload them again.")
+
+    temp_file_path = await save_upload(file)
+    parser = get_parser(manifest["format"])
+    if not parser.sniff(*sniff_file(temp_file_path)):
+        os.unlink(temp_file_path)
+        raise HTTPException(status_code=400, detail=f"Appended logs are not in the upload's format ({parser.name})")
+
+    job = job_manager.submit(f"append {file.filename}", append_to_upload, temp_file_path, session_id, upload_id,
+                             parser, owner=session_id)
+    return {"message": "Logs appended, analysis update started", "upload_id": upload_id, "log_format": parser.name,
+            "job_id": job.id, "status": job.status}
+
+@app.post("/reanalyse")
+async def reanalyse_logs(session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
+    """
+    Analyze the session's latest upload again from the event store, without uploading it again
+    """
+    upload_id = get_analysis_results(session_id).get("upload_id")
+    if not upload_id or get_event_store().manifest(upload_id) is None:
+        raise HTTPException(status_code=404, detail="The uploaded logs are no longer stored. Please upload them again.")
+
+    job = job_manager.submit(f"reanalyse {upload_id}", analyse_stored_upload, upload_id, session_id, owner=session_id)
+    return {"message": "Analysis started", "upload_id": upload_id, "job_id": job.id, "status": job.status}
+
+@app.get("/jobs")
+async def list_jobs(session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
+    """
+    List the session's analysis jobs without their results
+    """
+    return {"jobs": [job.to_dict(include_result=False) for job in job_manager.list(owner=session_id)]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
+    """
+    Get progress of an analysis job, and its results once completed
+    """
+    return get_session_job(job_id, session_id).to_dict()
 
 @app.get("/logs-analysis")
-async def get_logs_analysis():
+async def get_logs_analysis(response: Response, if_none_match: Optional[str] = Header(None),
+                            session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
     """
     Get the network logs analysis results
+
+    The ETag is the analysis version; send it as If-None-Match to get a 304 while it is current.
     """
-    if not analysis_results:
-        raise HTTPException(status_code=404, detail="No analysis results available. Please upload logs first.")
+    analysis_results, version = get_versioned_results(session_id, response, if_none_match)
     
     return {
         "logs_analysis": analysis_results.get("logs_analysis", ""),
+        "version": version,
         "has_data": True
     }
 
+STREAM_FIELDS = ("logs_analysis", "anomalies")
+STREAM_POLL_INTERVAL = 0.05
+
+async def tail_job_stream(job, field):
+    """
+    Relay a job's streamed output field as server-sent events until the field is complete
+    """
+    sent = 0
+    while True:
+        # read the completion flags before draining, so text appended in between is not lost
+        finished = field in job.closed_streams or job.done
+        chunks = job.streams.get(field, [])
+        while sent < len(chunks):
+            yield sse_event({"token": chunks[sent]})
+            sent += 1
+        if finished:
+            if job.status == Job.FAILED:
+                yield sse_event({"error": job.error})
+            else:
+                yield sse_event({"done": True})
+            return
+        await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+@app.get("/logs-analysis/stream")
+async def stream_logs_analysis(job_id: str = None, field: str = "logs_analysis",
+                               session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
+    """
+    Stream the logs analysis (or, with field=anomalies, the anomalies report) as server-sent events
+
+    With a job_id the text is relayed while the job generates it; without one the latest results
+    are sent in a single event.
+    """
+    if field not in STREAM_FIELDS:
+        raise HTTPException(status_code=400, detail=f"field must be one of {STREAM_FIELDS}")
+
+    if job_id:
+        job = get_session_job(job_id, session_id)
+        return StreamingResponse(tail_job_stream(job, field), media_type=SSE_MEDIA_TYPE)
+
+    analysis_results = get_analysis_results(session_id)
+
+    async def send_results():
+        yield sse_event({"token": analysis_results.get(field, "")})
+        yield sse_event({"done": True})
+
+    return StreamingResponse(send_results(), media_type=SSE_MEDIA_TYPE)
+
 @app.get("/anomalies")
-async def get_anomalies():
+async def get_anomalies(response: Response, if_none_match: Optional[str] = Header(None),
+                        session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
     """
     Get the identified anomalies and recommended actions
+
+    Conditional like /logs-analysis, with the same ETag.
     """
-    if not analysis_results:
-        raise HTTPException(status_code=404, detail="No analysis results available. Please upload logs first.")
+    analysis_results, version = get_versioned_results(session_id, response, if_none_match)
     
     return {
         "anomalies": analysis_results.get("anomalies", ""),
+        "findings": analysis_results.get("anomaly_findings", []),
+        "version": version,
         "has_data": True
     }
 
+@app.post("/query")
+async def query_events(request: QueryRequest, session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
+    """
+    Count, filter and group the session's uploaded events without the LLM
+
+    filters map a column (severity, user, event_type, host, log_type, source_ip, destination_ip) to a
+    value or list of values; IP columns also accept CIDR blocks. start/end bound the time range and
+    group_by takes columns or the minute/hour/day time buckets.
+    """
+    chatbot = get_chatbot(session_id)
+    if chatbot.event_table is None:
+        raise HTTPException(status_code=404, detail="No indexed events available. Please upload logs first.")
+    if not 0 < request.limit <= config.QUERY_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {config.QUERY_MAX_LIMIT}")
+
+    try:
+        result = await asyncio.to_thread(chatbot.event_table.query, request.filters, request.start,
+                                         request.end, request.group_by, request.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"query": request.model_dump(), **result}
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_with_bot(request: ChatRequest):
+async def chat_with_bot(request: ChatRequest, http_request: Request,
+                        session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
     """
     Chat with the network logs analysis bot
+
+    Chat turns are queued for the model before analysis work; the turn is cancelled if the client
+    disconnects while waiting. /chat/stream is cancelled the same way when its client goes away.
     """
-    global chatbot_instance
-    
-    if not chatbot_instance:
-        raise HTTPException(status_code=400, detail="Chatbot not initialized. Please upload logs first.")
+    chatbot = get_chatbot(session_id)
     
     try:
-        response = chatbot_instance.chat(request.message)
-        return ChatResponse(response=response)
+        response = await cancel_on_disconnect(http_request, chatbot.achat(request.message))
+        return ChatResponse(response=response, prompt_tokens=chatbot.last_prompt_tokens, source=chatbot.last_source,
+                            analysis_version=analysis_version(session_id))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
+@app.post("/chat/stream")
+async def stream_chat_with_bot(request: ChatRequest,
+                               session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
+    """
+    Chat with the network logs analysis bot, streaming the response as server-sent events
+    """
+    chatbot = get_chatbot(session_id)
+
+    async def relay():
+        try:
+            async for piece in chatbot.astream_chat(request.message):
+                yield sse_event({"token": piece})
+            yield sse_event({"done": True, "prompt_tokens": chatbot.last_prompt_tokens, "source": chatbot.last_source,
+                             "analysis_version": analysis_version(session_id)})
+        except Exception as e:
+            yield sse_event({"error": f"Chat failed: {str(e)}"})
+
+    return StreamingResponse(relay(), media_type=SSE_MEDIA_TYPE)
+
 @app.post("/clear-chat")
-async def clear_chat():
+async def clear_chat(session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
     """
     Clear the chat conversation history
     """
-    global chatbot_instance
-    
-    if not chatbot_instance:
-        raise HTTPException(status_code=400, detail="Chatbot not initialized. Please upload logs first.")
+    chatbot = get_chatbot(session_id)
     
     try:
-        chatbot_instance.clear_conversation()
+        chatbot.clear_conversation()
         return {"message": "Chat history cleared successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to clear chat: {str(e)}")
 
+@app.delete("/session")
+async def delete_session(session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
+    """
+    Drop a session's analysis results, chatbot and stored events
+    """
+    session = session_store.get(session_id)
+    if session:
+        delete_stored_events(session)
+    return {"deleted": session_store.delete(session_id)}
+
 @app.get("/status")
-async def get_status():
+async def get_status(session_id: str = Header(DEFAULT_SESSION_ID, alias=SESSION_HEADER)):
     """
     Get the current status of the application
     """
+    session = session_store.get(session_id)
     return {
-        "analysis_available": bool(analysis_results),
-        "chatbot_initialized": chatbot_instance is not None,
-        "ollama_model": "llama3.1:8b-instruct-q4_K_M"
+        "analysis_available": bool(session and session.analysis_results),
+        "analysis_version": session.analysis_version if session else None,
+        "chatbot_initialized": bool(session and session.chatbot),
+        "sessions": session_store.stats(),
+        "ollama_model": config.OLLAMA_MODEL,
+        "cache": get_cache().stats() if get_cache() else None,
+        "event_store": get_event_store().stats(),
+        "jobs": job_manager.stats(),
+        "llm_scheduler": get_llm_client().scheduler.stats(),
+        "model_warm_up": model_warm_up
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Pipeline, LLM and request metrics in the Prometheus text format
+    """
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+def job_counts():
+    stats = job_manager.stats()
+    return [({"status": status}, stats[status]) for status in (Job.QUEUED, Job.RUNNING, Job.COMPLETED, Job.FAILED)]
+
+def llm_queue_depth():
+    return [({"priority": priority}, depth) for priority, depth in get_llm_client().scheduler.queue_depth().items()]
+
+metrics.registry.register_gauge("sessions", lambda: len(session_store), help="Active sessions")
+metrics.registry.register_gauge("session_bytes", lambda: session_store.stats()["bytes"],
+                                help="Estimated memory held by sessions")
+metrics.registry.register_gauge("jobs", job_counts, help="Jobs kept in the history, by status")
+metrics.registry.register_gauge("event_store_rows", lambda: get_event_store().stats()["rows"],
+                                help="Events in the event store")
+metrics.registry.register_gauge("event_store_bytes", lambda: get_event_store().stats()["bytes"],
+                                help="Size of the event store on disk")
+metrics.registry.register_gauge("llm_queue_depth", llm_queue_depth, help="LLM calls waiting for a free slot, by priority")
+metrics.registry.register_gauge("llm_in_flight", lambda: get_llm_client().scheduler.in_flight,
+                                help="LLM calls running on the model server")
+
+# outcome of the startup warm-up: "disabled", "loading", "ready" (with the seconds it took) or "failed"
+model_warm_up = {"status": "loading" if config.OLLAMA_WARMUP else "disabled"}
+
+def warm_up_model():
+    try:
+        seconds = get_llm_client().warm_up()
+        model_warm_up.update(status="ready", seconds=round(seconds, 3))
+    except Exception as e:
+        # the model is then loaded by the first call instead
+        model_warm_up.update(status="failed", error=str(e))
+
+@app.on_event("startup")
+def start_model_warm_up():
+    """
+    Load the model in the background, so the first analysis or chat question does not wait for it
+    """
+    if config.OLLAMA_WARMUP:
+        threading.Thread(target=warm_up_model, name="llm-warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown_jobs():
+    job_manager.shutdown()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,122 @@
+#benchmarks/bench_chat.py
+"""
+Prompt evaluation and model loads per chat turn, after an analysis, as the backend runs them.
+
+Synthetic logs (benchmarks/synthetic_logs.py) are analysed with DocumentAnalysis.run, then a ChatBot
+with the analysis in its system prompt and retrieval over the logs' index is asked --turns questions.
+By default this runs against the mock Ollama server, which keeps a prefix cache of recent prompts and
+unloads or reloads the model like Ollama does (see benchmarks/mock_ollama.py); --ollama-url measures
+a real Ollama server instead.
+
+For every turn the prompt tokens evaluated, the prompt evaluation time and the model load time
+reported by the server are printed, then their totals. --warm-up loads the model first, as the
+backend does at startup, and --idle waits that many seconds before the analysis, to let a short
+keep_alive (e.g. OLLAMA_KEEP_ALIVE=1s) expire.
+
+Usage:
+    python benchmarks/bench_chat.py --turns 30 --rows 10000
+    python benchmarks/bench_chat.py --ollama-url http://localhost:11434 --turns 10 --warm-up
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ollama import MockOllamaServer
+from synthetic_logs import SCHEMAS, write_synthetic_logs
+
+QUESTIONS = ["What is the most suspicious activity in these logs?", "Which hosts should be investigated first?",
+             "Summarize the failed logins.", "Is there evidence of lateral movement?",
+             "Which users have the most critical events?", "What should be blocked at the firewall?",
+             "Are there signs of data exfiltration?", "What happened right before the brute force attacks?"]
+
+
+def record_responses(client):
+    """
+    Keep the JSON response of every non-streamed call of the client
+    """
+    responses = []
+    post = client.post
+
+    def recording_post(*args, **kwargs):
+        response = post(*args, **kwargs)
+        responses.append(response)
+        return response
+
+    client.post = recording_post
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=30, help="chat questions asked")
+    parser.add_argument("--rows", type=int, default=10_000, help="synthetic log rows analysed")
+    parser.add_argument("--schema", default="network_events", choices=list(SCHEMAS))
+    parser.add_argument("--ollama-url", default=None, help="measure this Ollama server instead of the mock")
+    parser.add_argument("--warm-up", action="store_true", help="load the model before the analysis")
+    parser.add_argument("--idle", type=float, default=0.0, help="seconds to wait before the analysis")
+    parser.add_argument("--reply-words", type=int, default=120, help="words of every mock answer")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0005,
+                        help="mock model seconds per prompt token evaluated")
+    parser.add_argument("--load-latency", type=float, default=2.0, help="mock model seconds per model load")
+    parser.add_argument("--cache-slots", type=int, default=1, help="prompts the mock keeps for prefix reuse")
+    args = parser.parse_args()
+
+    server = None
+    if args.ollama_url is None:
+        server = MockOllamaServer(reply_words=args.reply_words, prompt_token_latency=args.prompt_token_latency,
+                                  load_latency=args.load_latency, cache_slots=args.cache_slots).start()
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update({"OLLAMA_URL": args.ollama_url or server.url, "CACHE_ENABLED": "0",
+                           "EVENT_STORE_PATH": os.path.join(directory, "events")})
+        from src.chatbot import ChatBot
+        from src.llm_client import get_llm_client
+        from src.log_index import LogIndex
+        from src.logs_analysis import DocumentAnalysis
+        from src.tokens import truncate_to_tokens
+        from src import config
+        from prompt_templates.templates import retrieval_chat_template
+
+        client = get_llm_client()
+        if args.warm_up:
+            print(f"warm-up: {client.warm_up():.2f}s")
+        time.sleep(args.idle)
+
+        path = write_synthetic_logs(os.path.join(directory, f"{args.schema}.csv"), args.schema, args.rows)
+        started = time.perf_counter()
+        index = LogIndex()
+        results = DocumentAnalysis(path).run(index=index)
+        print(f"analysis of {args.rows:,} rows: {time.perf_counter() - started:.2f}s\n")
+
+        system_prompt = retrieval_chat_template(truncate_to_tokens(results["logs_analysis"], config.CHAT_ANALYSIS_TOKENS))
+        chatbot = ChatBot(system_prompt=system_prompt, llm_client=client, index=index)
+        responses = record_responses(client)
+        totals = {"tokens": 0, "eval": 0.0, "load": 0.0, "wall": 0.0}
+        print(f"{'turn':>4}  {'prompt tokens evaluated':>23}  {'prompt eval ms':>14}  {'load ms':>9}  {'turn ms':>9}")
+        for turn in range(args.turns):
+            started = time.perf_counter()
+            chatbot.chat(QUESTIONS[turn % len(QUESTIONS)])
+            seconds = time.perf_counter() - started
+            response = responses[-1]
+            # Ollama reports durations in nanoseconds
+            tokens = response.get("prompt_eval_count") or 0
+            evaluation = (response.get("prompt_eval_duration") or 0) / 1e9
+            load = (response.get("load_duration") or 0) / 1e9
+            for key, value in (("tokens", tokens), ("eval", evaluation), ("load", load), ("wall", seconds)):
+                totals[key] += value
+            print(f"{turn + 1:>4}  {tokens:>23,}  {evaluation * 1000:>14.1f}  {load * 1000:>9.1f}  {seconds * 1000:>9.1f}")
+
+    print(f"\n{args.turns} turns: {totals['tokens']:,} prompt tokens evaluated "
+          f"({totals['tokens'] / args.turns:,.0f} per turn), prompt eval {totals['eval']:.2f}s, "
+          f"model loads {totals['load']:.2f}s, wall {totals['wall']:.2f}s")
+    if server is not None:
+        print(f"mock model loads: {server.loads}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#benchmarks/bench_chat_memory.py
+"""
+Prompt size and latency per turn of a long chat, against the mock Ollama server.
+
+Every answer is padded to a few hundred words so that, without a token budget, the prompt would
+grow with every turn. With the budgeted memory the prompt tokens should plateau once older turns
+start being folded into the running summary.
+
+Usage:
+    python benchmarks/bench_chat_memory.py --turns 100 --reply-words 300
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ollama import MockOllamaServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--reply-words", type=int, default=300)
+    parser.add_argument("--history-tokens", type=int, default=None)
+    parser.add_argument("--every", type=int, default=10, help="print every n-th turn")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(reply_words=args.reply_words).start()
+
+    from src.chatbot import ChatBot
+    from src.llm_client import LLMClient
+
+    chatbot = ChatBot("You are a network logs analyst.", llm_client=LLMClient(base_url=server.url),
+                      history_tokens=args.history_tokens)
+    latencies = []
+    print(f"{'turn':>5} {'prompt tokens':>14} {'messages':>9} {'summary chars':>14} {'latency ms':>11}")
+    for turn in range(1, args.turns + 1):
+        start = time.perf_counter()
+        chatbot.chat(f"Question {turn}: which source IPs failed to log in the most?")
+        latencies.append(time.perf_counter() - start)
+        if turn % args.every == 0 or turn == 1:
+            print(f"{turn:>5} {chatbot.last_prompt_tokens:>14} {len(chatbot.messages):>9} "
+                  f"{len(chatbot.memory.summary):>14} {latencies[-1] * 1000:>11.1f}")
+
+    tokens = list(chatbot.prompt_tokens)
+    print(f"prompt tokens         max {max(tokens)}  last {tokens[-1]}  "
+          f"mean of last 50 {statistics.mean(tokens[-50:]):.0f}")
+    print(f"latency               mean {statistics.mean(latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
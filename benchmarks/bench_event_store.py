@@ -0,0 +1,75 @@
+#benchmarks/bench_event_store.py
+"""
+Re-reading uploaded logs: reparsing the CSV vs memory-mapped column reads from the event store.
+
+assets/sample_gpt_logs.csv is tiled up to the requested number of rows and ingested once. Then a
+typical follow-up aggregation (event counts per severity and source IP) is timed both ways, along
+with a full read of the normalized events as DocumentAnalysis does on a re-run.
+
+Usage:
+    python benchmarks/bench_event_store.py --rows 2000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import pandas as pd
+import pyarrow.compute as pc
+
+from src.event_store import EventStore
+from src.log_parsers import detect_parser
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<42} {elapsed:8.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    sample = pd.read_csv(os.path.join(BASE_DIR, "assets", "sample_gpt_logs.csv"))
+    frame = pd.concat([sample] * -(-args.rows // len(sample)), ignore_index=True).iloc[:args.rows]
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "logs.csv")
+        frame.to_csv(csv_path, index=False)
+        store = EventStore(os.path.join(directory, "events"))
+        log_parser = detect_parser(csv_path)
+
+        manifest = timed("ingest (parse once, write Arrow)", lambda: store.ingest(csv_path, log_parser, "bench"))
+        print(f"{'':<42} {manifest['rows']:,} rows in {len(manifest['days'])} day partitions, "
+              f"{store.size_bytes('bench') / 2**20:.1f} MB on disk vs {os.path.getsize(csv_path) / 2**20:.1f} MB CSV")
+
+        def from_csv():
+            counts = None
+            for chunk in log_parser.iter_chunks(csv_path, 50_000):
+                part = chunk.groupby(["severity", "source_ip"]).size()
+                counts = part if counts is None else counts.add(part, fill_value=0)
+            return counts
+
+        def from_store():
+            table = store.read_table("bench", columns=["severity", "source_ip"])
+            return table.group_by(["severity", "source_ip"]).aggregate([([], "count_all")])
+
+        csv_counts = timed("severity x source_ip, reparsing the CSV", from_csv)
+        store_counts = timed("severity x source_ip, from the event store", from_store)
+        if int(csv_counts.sum()) != pc.sum(store_counts.column("count_all")).as_py():
+            raise SystemExit("aggregations disagree")
+
+        timed("full normalized read, reparsing the CSV", lambda: sum(len(c) for c in log_parser.iter_chunks(csv_path, 50_000)))
+        timed("full normalized read, from the event store", lambda: sum(len(c) for c in store.iter_chunks("bench")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#benchmarks/bench_formatting.py
+"""
+Micro-benchmark of row-wise df.apply(format_log) vs the vectorized format_logs.
+
+Usage:
+    python benchmarks/bench_formatting.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import pandas as pd
+
+from src.logs_analysis import DocumentAnalysis
+
+
+def build_frame(rows):
+    """
+    Tile assets/sample_gpt_logs.csv up to the requested number of rows
+    """
+    sample = pd.read_csv(os.path.join(BASE_DIR, "assets", "sample_gpt_logs.csv"))
+    repeats = -(-rows // len(sample))
+    return pd.concat([sample] * repeats, ignore_index=True).iloc[:rows]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-rowwise", action="store_true", help="only time the vectorized path")
+    args = parser.parse_args()
+
+    df = build_frame(args.rows)
+    analysis = DocumentAnalysis(file_path=None)
+
+    vectorized, vec_elapsed = timed(lambda: analysis.format_logs(df))
+    print(f"vectorized  {len(df):>10,} rows  {vec_elapsed:8.2f}s  {len(df) / vec_elapsed:>12,.0f} rows/s")
+
+    if args.skip_rowwise:
+        return
+
+    rowwise, row_elapsed = timed(lambda: df.apply(analysis.format_log, axis=1).tolist())
+    print(f"row-wise    {len(df):>10,} rows  {row_elapsed:8.2f}s  {len(df) / row_elapsed:>12,.0f} rows/s")
+    print(f"speedup     {row_elapsed / vec_elapsed:.1f}x")
+
+    if rowwise != vectorized:
+        raise SystemExit("vectorized output differs from format_log")
+    print("outputs are identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#benchmarks/bench_ingestion.py
+"""
+Benchmark whole-file vs streaming CSV ingestion over the assets/*.csv files scaled up.
+
+Each mode runs in a fresh process so peak RSS is measured in isolation.
+
+Usage:
+    python benchmarks/bench_ingestion.py --scale 1000 --chunksize 50000
+"""
+import argparse
+import glob
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+FORMAT_COLUMNS = {"timestamp", "log_type", "event_type", "source_ip", "destination_ip", "user", "severity", "message"}
+
+
+def scale_csv(src_path, dst_path, scale):
+    """
+    Write src_path's rows `scale` times into dst_path, keeping a single header
+    """
+    with open(src_path, "r", encoding="utf-8") as f:
+        header = f.readline()
+        body = f.read()
+    if not body.endswith("\n"):
+        body += "\n"
+    with open(dst_path, "w", encoding="utf-8") as out:
+        out.write(header)
+        for _ in range(scale):
+            out.write(body)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_full(path):
+    import pandas as pd
+    from src.logs_analysis import DocumentAnalysis
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    df = pd.read_csv(path)
+    if FORMAT_COLUMNS.issubset(df.columns):
+        analysis = DocumentAnalysis(path)
+        df["formatted_log"] = df.apply(analysis.format_log, axis=1)
+        "\n".join(df["formatted_log"].tolist())
+    rows = len(df)
+    return rows, time.perf_counter() - start, baseline, peak_rss_mb()
+
+
+def run_streaming(path, chunksize):
+    from src.logs_analysis import DocumentAnalysis
+
+    baseline = peak_rss_mb()
+    analysis = DocumentAnalysis(path, chunksize=chunksize)
+    start = time.perf_counter()
+    rows = 0
+    for chunk in analysis.iter_log_chunks():
+        if FORMAT_COLUMNS.issubset(chunk.columns):
+            analysis.format_logs(chunk)
+        rows += len(chunk)
+    return rows, time.perf_counter() - start, baseline, peak_rss_mb()
+
+
+def _worker(mode, path, chunksize, queue):
+    if mode == "full":
+        queue.put(run_full(path))
+    else:
+        queue.put(run_streaming(path, chunksize))
+
+
+def measure(mode, path, chunksize):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_worker, args=(mode, path, chunksize, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1000, help="how many times to repeat each asset's rows")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="rows per chunk in streaming mode")
+    parser.add_argument("--modes", nargs="+", default=["full", "streaming"], choices=["full", "streaming"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for src in sorted(glob.glob(os.path.join(BASE_DIR, "assets", "*.csv"))):
+            name = os.path.basename(src)
+            scaled = os.path.join(tmp, name)
+            scale_csv(src, scaled, args.scale)
+            size_mb = os.path.getsize(scaled) / (1024 * 1024)
+            print(f"\n{name} x{args.scale} ({size_mb:.1f} MB)")
+            for mode in args.modes:
+                rows, elapsed, baseline, peak = measure(mode, scaled, args.chunksize)
+                print(
+                    f"  {mode:<10} rows={rows:>10,}  {rows / elapsed:>12,.0f} rows/s  "
+                    f"peak RSS={peak:8.1f} MB (+{peak - baseline:.1f} MB over import)"
+                )
+            os.unlink(scaled)
+
+
+if __name__ == "__main__":
+    main()
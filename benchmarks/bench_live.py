@@ -0,0 +1,81 @@
+#benchmarks/bench_live.py
+"""
+Cost of appending a fixed-size batch to a live analysis, against the size of the history before it.
+
+For every --history size, synthetic logs (benchmarks/synthetic_logs.py) of that many rows are scanned
+into the running state a tailed upload keeps (LiveAnalysis.from_store does the same scan), then
+--batches batches of --batch-rows later rows are appended with LiveAnalysis.append. The mock Ollama
+server answers without latency, so the timings are the aggregates, the anomaly rules and the index
+and event table updates. The per-batch time should stay flat as the history grows.
+
+Usage:
+    python benchmarks/bench_live.py --history 10000 200000 1000000 --batch-rows 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from mock_ollama import MockOllamaServer
+from synthetic_logs import SCHEMAS, iter_synthetic_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, nargs="+", default=[10_000, 200_000, 1_000_000],
+                        help="rows analysed before the appends")
+    parser.add_argument("--batch-rows", type=int, default=200, help="rows per appended batch")
+    parser.add_argument("--batches", type=int, default=20, help="batches appended per history size")
+    parser.add_argument("--schema", default="network_events", choices=list(SCHEMAS))
+    args = parser.parse_args()
+
+    server = MockOllamaServer(reply_words=20).start()
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update({"OLLAMA_URL": server.url, "CACHE_ENABLED": "0",
+                           "EVENT_STORE_PATH": os.path.join(directory, "events")})
+        from src.event_table import EventTable
+        from src.live_analysis import LiveAnalysis
+        from src.log_index import LogIndex
+        from src.logs_analysis import DocumentAnalysis
+
+        print(f"{'history rows':>12}  {'scan s':>7}  {'append p50 ms':>13}  {'append max ms':>13}  {'rate keys':>10}")
+        for history in args.history:
+            total = history + args.batches * args.batch_rows
+            frame = pd.concat(iter_synthetic_frames(args.schema, total), ignore_index=True)
+            path = os.path.join(directory, f"{args.schema}-{history}.csv")
+            frame.iloc[:history].to_csv(path, index=False)
+
+            started = time.perf_counter()
+            analysis = DocumentAnalysis(path)
+            index = LogIndex()
+            statistics_, detector = analysis.scan(index=index)
+            scan_seconds = time.perf_counter() - started
+            chunks = list(analysis.iter_log_chunks())
+            event_table = EventTable.from_frame(pd.concat(chunks, ignore_index=True))
+            results = {"logs_analysis": "Earlier analysis.", "anomalies": "Earlier anomalies.",
+                       "anomaly_findings": detector.findings()}
+            live = LiveAnalysis(analysis, statistics_, detector, results, index=index, event_table=event_table)
+
+            # batches go through the parser's normalization like the tailed lines do
+            normalize = analysis.parser.normalize_chunk
+            timings = []
+            for start in range(history, total, args.batch_rows):
+                batch = normalize(frame.iloc[start:start + args.batch_rows].reset_index(drop=True))
+                started = time.perf_counter()
+                live.append([batch])
+                timings.append(time.perf_counter() - started)
+            print(f"{history:>12,}  {scan_seconds:>7.2f}  {statistics.median(timings) * 1000:>13.1f}  "
+                  f"{max(timings) * 1000:>13.1f}  {len(detector.ip_minute_counts):>10,}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#benchmarks/bench_parsers.py
+"""
+Streaming parse throughput, in lines per second, of every built-in log format.
+
+Each sample in assets/ is tiled up to the requested number of lines in a temporary file (the Linux
+CSV is also rewritten as plain-text syslog), then detected and parsed chunk by chunk into the
+normalized event table.
+
+Usage:
+    python benchmarks/bench_parsers.py --lines 1000000
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from src.log_parsers import detect_parser, iter_events
+
+
+def read_sample(name):
+    with open(os.path.join(BASE_DIR, "assets", name), "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    if name.endswith(".csv"):
+        return lines[0], lines[1:]
+    return None, lines
+
+
+def syslog_sample():
+    """
+    assets/linux_system_logs.csv rendered as classic syslog lines
+    """
+    with open(os.path.join(BASE_DIR, "assets", "linux_system_logs.csv"), "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return None, [f"{row['timestamp']} {row['hostname']} {row['process']}[{row['pid']}]: {row['message']}"
+                  for row in rows]
+
+
+def write_tiled(directory, name, header, lines, total):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        if header:
+            f.write(header + "\n")
+        written = 0
+        while written < total:
+            batch = lines[:total - written]
+            f.write("\n".join(batch) + "\n")
+            written += len(batch)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    args = parser.parse_args()
+
+    samples = {
+        "sample_gpt_logs.csv": read_sample("sample_gpt_logs.csv"),
+        "windows_event_logs.csv": read_sample("windows_event_logs.csv"),
+        "linux_system_logs.csv": read_sample("linux_system_logs.csv"),
+        "linux_system_logs.syslog": syslog_sample(),
+        "logs.txt": read_sample("logs.txt"),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'file':<26} {'format':<18} {'events':>10} {'seconds':>8} {'lines/s':>12}")
+        for name, (header, lines) in samples.items():
+            path = write_tiled(directory, name, header, lines, args.lines)
+            start = time.perf_counter()
+            log_parser = detect_parser(path)
+            events = sum(len(chunk) for chunk in iter_events(path, args.chunksize, log_parser))
+            elapsed = time.perf_counter() - start
+            print(f"{name:<26} {log_parser.name:<18} {events:>10,} {elapsed:>8.2f} {args.lines / elapsed:>12,.0f}")
+            if events != args.lines:
+                raise SystemExit(f"{name}: parsed {events} of {args.lines} lines")
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
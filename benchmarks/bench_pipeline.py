@@ -0,0 +1,255 @@
+#benchmarks/bench_pipeline.py
+"""
+End-to-end benchmark of the analysis pipeline, the API and the chatbot against the mock Ollama server.
+
+For every schema and size, synthetic logs (benchmarks/synthetic_logs.py) are run through:
+
+    analysis   DocumentAnalysis.run, uncached, --repeat times
+    api        POST /upload-logs until the job completes (--repeat sessions), then /chat and /query
+    chat       ChatBot.chat with retrieval over the file's index, --turns questions
+
+Each scenario runs in a fresh process, so its peak RSS is its own. The mock model answers after
+--latency seconds plus --token-latency per answer word. Throughput, p50/p99 latency and peak
+memory are printed and written to a JSON file; --compare prints the change against an earlier
+results file, e.g. from the previous commit.
+
+Usage:
+    python benchmarks/bench_pipeline.py --rows 10000 100000 --output results.json
+    python benchmarks/bench_pipeline.py --rows 100000 --latency 0.2 --compare results.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ollama import MockOllamaServer
+from synthetic_logs import SCHEMAS, write_synthetic_logs
+
+SCENARIOS = ("analysis", "api", "chat")
+LLM_QUESTIONS = ["What is the most suspicious activity in these logs?", "Which hosts should be investigated first?",
+                 "Summarize the failed logins.", "Is there evidence of lateral movement?"]
+ROUTED_QUESTIONS = ["how many events", "count events by severity"]
+JOB_POLL_INTERVAL = 0.01
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def run_analysis(path, repeat, turns):
+    from src.logs_analysis import DocumentAnalysis
+
+    latencies = [timed(lambda: DocumentAnalysis(path).run()) for _ in range(repeat)]
+    return [{"name": "analysis", "latencies": latencies, "rows_per_run": True}]
+
+
+def run_api(path, repeat, turns):
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    with open(path, "rb") as f:
+        payload = f.read()
+    client = TestClient(app)
+
+    def upload(session_id):
+        headers = {"X-Session-ID": session_id}
+        response = client.post("/upload-logs", files={"file": (os.path.basename(path), payload, "text/csv")},
+                               headers=headers)
+        response.raise_for_status()
+        while True:
+            job = client.get(f"/jobs/{response.json()['job_id']}", headers=headers).json()
+            if job["status"] == "failed":
+                raise RuntimeError(f"analysis failed: {job['error']}")
+            if job["status"] == "completed":
+                return
+            time.sleep(JOB_POLL_INTERVAL)
+
+    upload_latencies = [timed(upload, f"bench-{i}") for i in range(repeat)]
+    headers = {"X-Session-ID": "bench-0"}
+    chat_latencies, routed_latencies, query_latencies = [], [], []
+    for turn in range(turns):
+        question = LLM_QUESTIONS[turn % len(LLM_QUESTIONS)]
+        chat_latencies.append(timed(lambda: client.post("/chat", json={"message": question},
+                                                        headers=headers).raise_for_status()))
+        question = ROUTED_QUESTIONS[turn % len(ROUTED_QUESTIONS)]
+        routed_latencies.append(timed(lambda: client.post("/chat", json={"message": question},
+                                                          headers=headers).raise_for_status()))
+        query_latencies.append(timed(lambda: client.post("/query", json={"group_by": ["severity"]},
+                                                         headers=headers).raise_for_status()))
+    return [
+        {"name": "api_upload", "latencies": upload_latencies, "rows_per_run": True},
+        {"name": "api_chat_llm", "latencies": chat_latencies},
+        {"name": "api_chat_routed", "latencies": routed_latencies},
+        {"name": "api_query", "latencies": query_latencies},
+    ]
+
+
+def run_chat(path, repeat, turns):
+    from src.chatbot import ChatBot
+    from src.log_index import LogIndex
+    from src.logs_analysis import DocumentAnalysis
+
+    index = LogIndex()
+    index_seconds = timed(DocumentAnalysis(path).build_index, index)
+    chatbot = ChatBot(system_prompt="You are a network security analyst.", index=index)
+    latencies = [timed(chatbot.chat, LLM_QUESTIONS[turn % len(LLM_QUESTIONS)]) for turn in range(turns)]
+    return [
+        {"name": "chat_index", "latencies": [index_seconds], "rows_per_run": True},
+        {"name": "chat_turn", "latencies": latencies},
+    ]
+
+
+RUNNERS = {"analysis": run_analysis, "api": run_api, "chat": run_chat}
+
+
+def _worker(scenario, path, repeat, turns, queue):
+    try:
+        queue.put((RUNNERS[scenario](path, repeat, turns), peak_rss_mb(), None))
+    except Exception as e:
+        queue.put((None, peak_rss_mb(), f"{type(e).__name__}: {e}"))
+
+
+def measure(scenario, path, repeat, turns):
+    """
+    Run a scenario in a fresh process
+
+    Output:
+        tuple: (measurements, peak RSS in MB, error or None)
+    """
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_worker, args=(scenario, path, repeat, turns, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def summarize(measurement, schema, rows, peak):
+    latencies = measurement["latencies"]
+    total = sum(latencies)
+    result = {
+        "name": measurement["name"], "schema": schema, "rows": rows, "runs": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2), "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "peak_rss_mb": round(peak, 1),
+    }
+    if measurement.get("rows_per_run"):
+        result["rows_per_second"] = round(rows * len(latencies) / total, 1) if total else None
+    else:
+        result["requests_per_second"] = round(len(latencies) / total, 2) if total else None
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return result["name"], result["schema"], result["rows"]
+
+
+def compare(results, baseline_path):
+    """
+    Print the change of every metric against an earlier results file; higher latency or memory and
+    lower throughput are regressions
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {result_key(result): result for result in baseline["results"]}
+    print(f"\nchange against {baseline_path} (commit {baseline.get('commit')})")
+    for result in results:
+        before = previous.get(result_key(result))
+        if before is None:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p99_ms", "rows_per_second", "requests_per_second", "peak_rss_mb"):
+            if result.get(metric) is None or not before.get(metric):
+                continue
+            change = (result[metric] - before[metric]) / before[metric] * 100
+            changes.append(f"{metric} {before[metric]} -> {result[metric]} ({change:+.1f}%)")
+        print(f"  {result['name']:<16} {result['schema']:<17} {result['rows']:>9,}  " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="log sizes in rows")
+    parser.add_argument("--schemas", nargs="+", default=list(SCHEMAS), choices=list(SCHEMAS))
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="analysis runs and uploads per size")
+    parser.add_argument("--turns", type=int, default=20, help="chat turns and queries per size")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock model seconds before every answer")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="mock model seconds per answer word")
+    parser.add_argument("--reply-words", type=int, default=50, help="words padded into every mock answer")
+    parser.add_argument("--output", "-o", default="bench_pipeline.json", help="JSON results file")
+    parser.add_argument("--compare", default=None, help="earlier JSON results file to compare against")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(reply_words=args.reply_words, latency=args.latency,
+                              token_latency=args.token_latency).start()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        # inherited by the scenario processes: every run does the full work, against the mock model
+        os.environ.update({"OLLAMA_URL": server.url, "CACHE_ENABLED": "0",
+                           "EVENT_STORE_PATH": os.path.join(directory, "events")})
+        for schema in args.schemas:
+            for rows in args.rows:
+                path = write_synthetic_logs(os.path.join(directory, f"{schema}_{rows}.csv"), schema, rows)
+                print(f"\n{schema}, {rows:,} rows ({os.path.getsize(path) / 2**20:.1f} MB)")
+                for scenario in args.scenarios:
+                    measurements, peak, error = measure(scenario, path, args.repeat, args.turns)
+                    if error:
+                        print(f"  {scenario:<16} failed: {error}")
+                        continue
+                    for measurement in measurements:
+                        result = summarize(measurement, schema, rows, peak)
+                        results.append(result)
+                        throughput = (f"{result['rows_per_second']:>12,.0f} rows/s" if "rows_per_second" in result
+                                      else f"{result['requests_per_second']:>12,.2f} req/s ")
+                        print(f"  {result['name']:<16} {throughput}  p50 {result['p50_ms']:>9.1f} ms  "
+                              f"p99 {result['p99_ms']:>9.1f} ms  peak RSS {peak:7.1f} MB")
+                os.unlink(path)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nresults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
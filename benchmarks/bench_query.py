@@ -0,0 +1,119 @@
+#benchmarks/bench_query.py
+"""
+Structured queries on the indexed EventTable vs boolean masks over a pandas DataFrame.
+
+A synthetic table with the event store's column layout (dictionary-coded severity, user, event
+type and host, integer IPs, millisecond timestamps) is generated directly in NumPy, so 10M rows
+fit in memory without going through CSV. Each query is run once cold (building the indexes it
+needs) and then timed warm, and checked against the pandas answer.
+
+Usage:
+    python benchmarks/bench_query.py --rows 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import numpy as np
+import pandas as pd
+
+from src.event_table import EventTable, parse_ip_range, to_epoch_ms
+
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+EVENT_TYPES = ["Connection Established", "Port Scan", "Login Failure", "Malware Detected", "Data Exfiltration",
+               "Brute Force Attack", "DNS Query", "Firewall Block"]
+START = to_epoch_ms("2025-07-01")
+DAYS = 30
+
+
+def synthetic_table(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    users = np.array([f"user{i}" for i in range(500)], dtype=object)
+    hosts = np.array([f"host-{i:03d}" for i in range(200)], dtype=object)
+    codes = {
+        "severity": rng.choice(4, rows, p=[0.4, 0.3, 0.2, 0.1]).astype(np.int32),
+        "event_type": rng.integers(0, len(EVENT_TYPES), rows, dtype=np.int32),
+        "user": rng.zipf(1.3, rows).clip(max=len(users)).astype(np.int32) - 1,
+        "host": rng.integers(0, len(hosts), rows, dtype=np.int32),
+    }
+    categories = {
+        "severity": np.array(SEVERITIES, dtype=object), "event_type": np.array(EVENT_TYPES, dtype=object),
+        "user": users, "host": hosts,
+    }
+    # sources concentrate in 192.168.0.0/16, destinations are spread over 10.0.0.0/8
+    ips = {
+        "source_ip": (parse_ip_range("192.168.0.0")[0] + rng.integers(1, 65_536, rows)).astype(np.uint32),
+        "destination_ip": (parse_ip_range("10.0.0.0")[0] + rng.integers(1, 1 << 24, rows)).astype(np.uint32),
+    }
+    timestamps = np.sort(START + rng.integers(0, DAYS * 86_400_000, rows))
+    return EventTable(codes, categories, ips, timestamps)
+
+
+def as_frame(table):
+    frame = {column: pd.Categorical.from_codes(codes, table.categories[column]) for column, codes in table.codes.items()}
+    frame.update(table.ips)
+    frame["timestamp"] = table.timestamps
+    return pd.DataFrame(frame)
+
+
+def timed(fn, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = synthetic_table(args.rows)
+    frame = as_frame(table)
+    print(f"{args.rows:,} rows generated in {time.perf_counter() - start:.1f}s")
+
+    subnet_low, subnet_high = parse_ip_range("192.168.7.0/24")
+    day_start, day_end = to_epoch_ms("2025-07-15"), to_epoch_ms("2025-07-16")
+    queries = [
+        ("count severity=Critical",
+         {"filters": {"severity": "Critical"}},
+         lambda: int((frame["severity"] == "Critical").sum())),
+        ("count user=user42 and severity=High",
+         {"filters": {"user": "user42", "severity": "High"}},
+         lambda: int(((frame["user"] == "user42") & (frame["severity"] == "High")).sum())),
+        ("count source_ip in 192.168.7.0/24",
+         {"filters": {"source_ip": "192.168.7.0/24"}},
+         lambda: int(frame["source_ip"].between(subnet_low, subnet_high - 1).sum())),
+        ("count Critical on 2025-07-15",
+         {"filters": {"severity": "Critical"}, "start": "2025-07-15", "end": "2025-07-16"},
+         lambda: int(((frame["severity"] == "Critical") & (frame["timestamp"] >= day_start)
+                      & (frame["timestamp"] < day_end)).sum())),
+        ("top 10 users with Login Failure",
+         {"filters": {"event_type": "Login Failure"}, "group_by": ["user"], "limit": 10},
+         lambda: int(frame.loc[frame["event_type"] == "Login Failure", "user"].value_counts().head(10).sum())),
+        ("events per hour for user7",
+         {"filters": {"user": "user7"}, "group_by": ["hour"], "limit": 24 * DAYS},
+         lambda: int((frame.loc[frame["user"] == "user7", "timestamp"] // 3_600_000).value_counts().sum())),
+    ]
+
+    print(f"{'query':<40} {'cold':>9} {'warm':>9} {'pandas':>9} {'speedup':>8}")
+    for label, query, baseline in queries:
+        start = time.perf_counter()
+        table.query(**query)
+        cold = time.perf_counter() - start
+        result, warm = timed(lambda: table.query(**query))
+        expected, pandas_time = timed(baseline, repeat=2)
+        answer = sum(group["count"] for group in result["groups"]) if "groups" in result else result["count"]
+        if answer != expected:
+            raise SystemExit(f"{label}: index answered {answer}, pandas {expected}")
+        print(f"{label:<40} {cold * 1000:7.1f}ms {warm * 1000:7.1f}ms {pandas_time * 1000:7.1f}ms {pandas_time / warm:7.0f}x")
+    print(f"index memory: {table.size_bytes() / 2**20:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#benchmarks/bench_scheduler.py
+"""
+Chat latency behind bulk analysis, first come first served vs the priority scheduler.
+
+Against the mock Ollama server with --latency seconds per answer and --slots requests in flight,
+worker threads keep --bulk analysis generations queued (as a large upload does) while
+--chat interactive questions are asked one after the other from an event loop. Both scheduling modes
+run the same load; the chat latency, the queue waits per priority and the bulk throughput are printed.
+A last check cancels a queued chat call and verifies it never reaches the model server.
+
+Usage:
+    python benchmarks/bench_scheduler.py --slots 2 --latency 0.2 --bulk 200 --chat 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ollama import MockOllamaServer
+from src.llm_client import LLMClient
+from src.llm_scheduler import ANALYSIS, ANOMALIES, CHAT, LLMScheduler
+
+CHAT_INTERVAL = 0.1
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def run(server, prioritize, args):
+    """
+    Bulk and anomaly generations from threads plus sequential chat turns from an event loop
+
+    Output:
+        tuple: (chat latencies, bulk seconds, scheduler stats)
+    """
+    client = LLMClient(base_url=server.url, max_concurrency=args.slots, max_retries=0)
+    client.scheduler = LLMScheduler(args.slots, prioritize=prioritize)
+
+    def bulk(i):
+        priority = ANOMALIES if i % 10 == 0 else ANALYSIS
+        client.post("/api/generate", {"prompt": f"analyse chunk {i}"}, priority=priority)
+
+    async def chat_turns():
+        latencies = []
+        for i in range(args.chat):
+            started = time.perf_counter()
+            await client.apost("/api/chat", {"messages": [{"role": "user", "content": f"question {i}"}]},
+                               priority=CHAT)
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(CHAT_INTERVAL)
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.bulk_threads) as pool:
+        futures = [pool.submit(bulk, i) for i in range(args.bulk)]
+        # let the bulk work fill the queue first, as an upload in progress does
+        while client.scheduler.queue_depth()[ANALYSIS] < min(args.bulk_threads - args.slots, args.bulk) // 2:
+            time.sleep(0.005)
+        latencies = asyncio.run(chat_turns())
+        for future in futures:
+            future.result()
+    bulk_seconds = time.perf_counter() - started
+    stats = client.scheduler.stats()
+    client.close()
+    return latencies, bulk_seconds, stats
+
+
+def check_cancellation(server, args):
+    """
+    Cancel a chat call while it is queued behind a busy slot; it must leave the queue unsent
+
+    Output:
+        bool: whether the cancelled call stayed off the model server and the slot was freed
+    """
+    client = LLMClient(base_url=server.url, max_concurrency=1, max_retries=0)
+    client.scheduler = LLMScheduler(1)
+    blocker = threading.Thread(target=client.post, args=("/api/generate", {"prompt": "blocker"}))
+    blocker.start()
+    while client.scheduler.in_flight == 0:
+        time.sleep(0.001)
+
+    async def cancelled_chat():
+        task = asyncio.ensure_future(client.apost("/api/chat", {"messages": [{"role": "user", "content": "gone"}]},
+                                                  priority=CHAT))
+        await asyncio.sleep(args.latency / 4)
+        queued = client.scheduler.queue_depth()[CHAT]
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return queued
+
+    requests_before = len(server.requests)
+    queued = asyncio.run(cancelled_chat())
+    blocker.join()
+    stats = client.scheduler.stats()
+    sent = len(server.requests) - requests_before
+    client.close()
+    return queued == 1 and sent == 1 and stats["cancelled"] == 1 and stats["in_flight"] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=2, help="LLM requests in flight at once")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock model seconds per answer")
+    parser.add_argument("--bulk", type=int, default=200, help="bulk analysis generations")
+    parser.add_argument("--bulk-threads", type=int, default=16, help="threads submitting bulk generations")
+    parser.add_argument("--chat", type=int, default=10, help="chat turns asked during the bulk work")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(latency=args.latency).start()
+    print(f"{args.slots} slots, {args.latency}s per answer, {args.bulk} bulk generations, {args.chat} chat turns\n")
+    for label, prioritize in (("first come, first served", False), ("priority scheduler", True)):
+        latencies, bulk_seconds, stats = run(server, prioritize, args)
+        waits = ", ".join(f"{priority} {wait['mean_seconds']:.3f}s mean / {wait['max_seconds']:.3f}s max"
+                          for priority, wait in stats["waits"].items() if wait["requests"])
+        print(f"{label:<26} chat p50 {percentile(latencies, 0.5) * 1000:8.1f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms  bulk {args.bulk / bulk_seconds:6.1f} req/s")
+        print(f"{'':<26} queue waits: {waits}")
+    print(f"\ncancelled queued chat call left the queue unsent: {check_cancellation(server, args)}")
+
+
+if __name__ == "__main__":
+    main()
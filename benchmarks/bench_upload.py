@@ -0,0 +1,81 @@
+#benchmarks/bench_upload.py
+"""
+Peak memory of receiving an upload: read + decode + rewrite vs spooling pieces to disk.
+
+A CSV of the requested size is built by tiling assets/sample_gpt_logs.csv and gzip-compressed to
+disk. Both paths then consume it the way the backend receives an upload, and tracemalloc reports
+the peak Python allocation of each: the old path holds the whole body as bytes and as str, the
+spooled path one piece at a time however large the upload is.
+
+Usage:
+    python benchmarks/bench_upload.py --megabytes 512
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from src.uploads import UploadSpool
+
+PIECE_BYTES = 1024 * 1024
+
+
+def measured(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<44} {elapsed:7.2f}s   peak {peak / 2**20:9.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=int, default=512, help="uncompressed upload size")
+    args = parser.parse_args()
+
+    with open(os.path.join(BASE_DIR, "assets", "sample_gpt_logs.csv"), "rb") as f:
+        header, body = f.readline(), f.read()
+
+    with tempfile.TemporaryDirectory() as directory:
+        plain_path = os.path.join(directory, "upload.csv")
+        gzip_path = plain_path + ".gz"
+        with open(plain_path, "wb") as f:
+            f.write(header)
+            for _ in range(args.megabytes * 2**20 // len(body) + 1):
+                f.write(body)
+        with open(plain_path, "rb") as source, gzip.open(gzip_path, "wb", compresslevel=1) as target:
+            shutil.copyfileobj(source, target, PIECE_BYTES)
+        print(f"upload: {os.path.getsize(plain_path) / 2**20:.0f} MB CSV, "
+              f"{os.path.getsize(gzip_path) / 2**20:.0f} MB gzip")
+
+        def read_decode_rewrite():
+            with open(plain_path, "rb") as upload:
+                content = upload.read()
+            with tempfile.NamedTemporaryFile(mode="w+", dir=directory, suffix=".csv") as temp_file:
+                temp_file.write(content.decode("utf-8"))
+
+        def spool(path, compression):
+            def run():
+                with open(path, "rb") as upload, tempfile.NamedTemporaryFile(dir=directory, suffix=".csv") as temp_file:
+                    with UploadSpool(open(temp_file.name, "wb"), compression, max_bytes=2**40,
+                                     max_decompressed_bytes=2**40) as target:
+                        for piece in iter(lambda: upload.read(PIECE_BYTES), b""):
+                            target.write(piece)
+            return run
+
+        measured("read + decode + rewrite (plain)", read_decode_rewrite)
+        measured("spooled pieces (plain)", spool(plain_path, None))
+        measured("spooled pieces (gzip, inflated on the fly)", spool(gzip_path, "gzip"))
+
+
+if __name__ == "__main__":
+    main()
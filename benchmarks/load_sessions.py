@@ -0,0 +1,130 @@
+#benchmarks/load_sessions.py
+"""
+Load test of per-session isolation in the backend, run in-process against the mock Ollama server.
+
+Many sessions upload their own slice of assets/sample_gpt_logs.csv and chat concurrently while
+a prober measures /status latency. Afterwards every session's chat history is checked for
+messages from other sessions.
+
+Usage:
+    python benchmarks/load_sessions.py --sessions 300 --turns 5
+"""
+import argparse
+import asyncio
+import io
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ollama import MockOllamaServer
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def csv_slice(lines, header, index, rows):
+    start = (index * rows) % max(len(lines) - rows, 1)
+    return (header + "".join(lines[start:start + rows])).encode("utf-8")
+
+
+async def run_session(client, session_id, payload, turns, chat_latencies):
+    headers = {"X-Session-ID": session_id}
+    response = await client.post("/upload-logs", files={"file": ("logs.csv", io.BytesIO(payload), "text/csv")},
+                                 headers=headers)
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+    while True:
+        job = (await client.get(f"/jobs/{job_id}", headers=headers)).json()
+        if job["status"] in ("completed", "failed"):
+            break
+        await asyncio.sleep(0.05)
+    if job["status"] == "failed":
+        raise RuntimeError(f"{session_id}: analysis failed: {job['error']}")
+
+    for turn in range(turns):
+        start = time.perf_counter()
+        response = await client.post("/chat", json={"message": f"{session_id} turn {turn}"}, headers=headers)
+        chat_latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+
+async def probe_status(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        (await client.get("/status")).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.02)
+
+
+async def main_async(args):
+    import httpx
+    from backend.main import app, session_store
+
+    with open(os.path.join(BASE_DIR, "assets", "sample_gpt_logs.csv"), "r", encoding="utf-8") as f:
+        header, *lines = f.readlines()
+
+    chat_latencies, status_latencies = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=None) as client:
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe_status(client, stop, status_latencies))
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(
+                run_session(client, f"session-{i}", csv_slice(lines, header, i, args.rows), args.turns,
+                            chat_latencies)
+                for i in range(args.sessions)
+            ))
+        finally:
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await prober
+
+    cross_talk = 0
+    for i in range(args.sessions):
+        session = session_store.get(f"session-{i}")
+        if session is None:
+            continue
+        for message in session.chatbot.messages:
+            if message["role"] == "user" and not message["content"].startswith(f"session-{i} "):
+                cross_talk += 1
+
+    print(f"sessions              {args.sessions} x {args.turns} chat turns in {elapsed:.2f}s")
+    print(f"chat latency          p50 {percentile(chat_latencies, 0.5) * 1000:.1f} ms  "
+          f"p99 {percentile(chat_latencies, 0.99) * 1000:.1f} ms")
+    print(f"/status latency       p50 {percentile(status_latencies, 0.5) * 1000:.1f} ms  "
+          f"p99 {percentile(status_latencies, 0.99) * 1000:.1f} ms  "
+          f"mean {statistics.mean(status_latencies or [0]) * 1000:.1f} ms over {len(status_latencies)} probes")
+    print(f"session store         {session_store.stats()}")
+    print(f"peak RSS              {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+    print(f"cross-talk messages   {cross_talk}")
+    if cross_talk:
+        raise SystemExit("sessions leaked chat messages into each other")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=50, help="CSV rows uploaded per session")
+    args = parser.parse_args()
+
+    server = MockOllamaServer().start()
+    os.environ["OLLAMA_URL"] = server.url
+    os.environ.setdefault("CACHE_PATH", os.path.join(tempfile.mkdtemp(), "cache.sqlite"))
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
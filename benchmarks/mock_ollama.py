@@ -0,0 +1,225 @@
+#benchmarks/mock_ollama.py
+"""
+Local stand-in for the Ollama HTTP API (/api/generate, /api/chat, /api/tags), for exercising the
+analysis pipeline and chatbot without a model.
+
+Latency can be simulated: --latency delays every answer, --token-latency is paid per answer word,
+between the chunks of a streamed answer, and --prompt-token-latency per prompt token evaluated.
+
+Like Ollama, the server keeps the model loaded for the request's keep_alive (5 minutes by default)
+and loads it again, paying --load-latency, when it expired or the request asks for another num_ctx.
+It also keeps the prompts of the last --cache-slots requests: a prompt that starts with the same
+text as one of them only evaluates (and reports in prompt_eval_count) the tokens after the
+shared prefix. A generate request without a prompt only loads the model.
+
+Usage:
+    python benchmarks/mock_ollama.py --port 11435 --latency 0.2 --token-latency 0.02
+    python benchmarks/mock_ollama.py --prompt-token-latency 0.0005 --load-latency 2
+    OLLAMA_URL=http://localhost:11435 python -c "..."
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+DEFAULT_KEEP_ALIVE = 300
+DEFAULT_NUM_CTX = 2048
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def keep_alive_seconds(value):
+    """
+    Seconds of an Ollama keep_alive value: a number of seconds or a duration such as "30m"; negative is forever
+    """
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        seconds = sum(float(amount) * DURATION_UNITS[unit] for amount, unit in re.findall(r"(-?[\d.]+)(ms|s|m|h)", value))
+    return float("inf") if seconds < 0 else seconds
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, chunks):
+        """
+        Send NDJSON chunks with chunked transfer encoding, like Ollama does with stream=true
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(self.server.token_latency)
+            line = json.dumps(chunk).encode("utf-8") + b"\n"
+            self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _reply(self, request, text, field, prompt_text=""):
+        """
+        Answer with text as a single JSON response, or word by word when streaming was requested
+        """
+        if self.server.reply_words:
+            text = " ".join([text] + ["lorem"] * self.server.reply_words)
+        load_seconds = self.server.load(request)
+        evaluated = self.server.evaluate(prompt_text)
+
+        def wrap(piece, done):
+            body = {"response": piece} if field == "response" else {"message": {"role": "assistant", "content": piece}}
+            if done:
+                # rough stand-ins for Ollama's token counts and durations (in nanoseconds)
+                body["load_duration"] = int(load_seconds * 1e9)
+                body["prompt_eval_count"] = evaluated
+                body["prompt_eval_duration"] = max(1, int(evaluated * self.server.prompt_token_latency * 1e9))
+                body["eval_count"] = len(text.split(" "))
+                body["eval_duration"] = max(1, time.perf_counter_ns() - self.started)
+            return {"model": request.get("model", ""), **body, "done": done}
+
+        time.sleep(self.server.latency + evaluated * self.server.prompt_token_latency)
+        if request.get("stream"):
+            words = text.split(" ")
+            pieces = [word if i == 0 else " " + word for i, word in enumerate(words)]
+            self._send_stream([wrap(piece, False) for piece in pieces] + [wrap("", True)])
+        else:
+            time.sleep(self.server.token_latency * len(text.split(" ")))
+            self._send_json(wrap(text, True))
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": "mock"}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        if self.path not in ("/api/generate", "/api/chat"):
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        self.started = time.perf_counter_ns()
+        request = self._read_json()
+        with self.server.lock:
+            self.server.requests.append(request)
+
+        if self.path == "/api/generate" and not request.get("prompt"):
+            load_seconds = self.server.load(request)
+            self._send_json({"model": request.get("model", ""), "response": "", "done": True, "done_reason": "load",
+                             "load_duration": int(load_seconds * 1e9)})
+        elif self.path == "/api/generate":
+            prompt = request["prompt"]
+            self._reply(request, f"mock analysis of {len(prompt.splitlines())} prompt lines", "response", prompt)
+        else:
+            messages = request.get("messages", [])
+            # rendered like a chat template, so equal leading messages give an equal prompt prefix
+            self._reply(request, f"mock reply to {len(messages)} messages", "message",
+                        "".join(f"<|{message.get('role')}|>{message.get('content', '')}" for message in messages))
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    """
+    Threaded mock server that records every request it receives
+
+    reply_words pads every answer with that many extra words, to simulate long model answers.
+    latency is waited before every answer, token_latency per answer word, prompt_token_latency per
+    prompt token evaluated and load_latency per model load, in seconds.
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, reply_words=0, latency=0.0, token_latency=0.0,
+                 prompt_token_latency=0.0, load_latency=0.0, cache_slots=1):
+        super().__init__((host, port), MockOllamaHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.reply_words = reply_words
+        self.latency = latency
+        self.token_latency = token_latency
+        self.prompt_token_latency = prompt_token_latency
+        self.load_latency = load_latency
+        self.cache_slots = cache_slots
+        self.loads = 0
+        # (model, num_ctx) loaded, and until when
+        self._loaded = None
+        self._expires = 0.0
+        self._cached_prompts = []
+
+    def load(self, request):
+        """
+        Load the model unless it is loaded with the request's num_ctx; returns the seconds spent loading
+        """
+        model = (request.get("model"), (request.get("options") or {}).get("num_ctx", DEFAULT_NUM_CTX))
+        with self.lock:
+            now = time.monotonic()
+            reload = self._loaded != model or now > self._expires
+            if reload:
+                self._loaded = model
+                self._cached_prompts = []
+                self.loads += 1
+            self._expires = now + keep_alive_seconds(request.get("keep_alive"))
+        if reload:
+            time.sleep(self.load_latency)
+        return self.load_latency if reload else 0.0
+
+    def evaluate(self, prompt_text):
+        """
+        Prompt tokens to evaluate after the longest prefix shared with a cached prompt, at least one
+        """
+        with self.lock:
+            shared = max((len(os.path.commonprefix([prompt_text, cached])) for cached in self._cached_prompts), default=0)
+            self._cached_prompts = ([prompt_text] + self._cached_prompts)[:self.cache_slots]
+        return max(1, (len(prompt_text) - shared) // CHARS_PER_TOKEN)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Serve in a background thread and return self
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--reply-words", type=int, default=0, help="extra words padded into every answer")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before every answer")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds per answer word")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0, help="seconds per prompt token evaluated")
+    parser.add_argument("--load-latency", type=float, default=0.0, help="seconds per model load")
+    parser.add_argument("--cache-slots", type=int, default=1, help="prompts kept for prefix reuse")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(args.host, args.port, args.reply_words, args.latency, args.token_latency,
+                              args.prompt_token_latency, args.load_latency, args.cache_slots)
+    print(f"Mock Ollama listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#benchmarks/synthetic_logs.py
+"""
+Synthetic logs in the schemas of the CSV samples in assets/, at any size.
+
+Values are drawn from the same vocabularies as the samples, with skewed frequencies, and timestamps
+increase through the file over a month. A small share of rows forms runs of failed logins from
+one source, so the anomaly prefilter has something to flag. Rows are generated
+and written in chunks, so memory does not grow with the number of rows.
+
+Usage:
+    python benchmarks/synthetic_logs.py network_events --rows 1000000 --output network.csv
+"""
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import numpy as np
+import pandas as pd
+
+START = pd.Timestamp("2025-07-01")
+SPAN_SECONDS = 30 * 86_400
+BURST_ROWS = 200
+
+LOG_TYPES = ["IDS", "Authentication", "Application", "System", "Firewall"]
+EVENT_TYPES = ["Login Failure", "Login Success", "RDP Connection", "Port Scan Detected", "Data Exfiltration",
+               "Malware Signature Detected", "Brute Force Attack", "Suspicious File Executed", "Anomaly Detected",
+               "Privilege Escalation", "Phishing Attempt", "Unauthorized Access Attempt"]
+NETWORK_USERS = ["service_account", "user1", "admin", "root", "guest"]
+NETWORK_SEVERITIES = ["Low", "Medium", "High", "Critical"]
+
+HOSTNAMES = ["db-node", "log-aggregator", "ubuntu-host", "web-server"]
+PROCESSES = ["cron", "rsyslogd", "python3", "docker", "sudo", "nginx", "systemd", "bash", "sshd"]
+LOG_LEVELS = ["INFO", "WARNING", "ERROR", "CRITICAL"]
+LINUX_USERS = ["arnab", "shreya", "ubuntu", "svc-logger", "root"]
+LINUX_ACTIONS = ["session opened", "session closed", "Accepted password", "Failed password", "useradd", "usermod",
+                 "service started", "system reboot"]
+
+# event id, description, relative frequency
+WINDOWS_EVENTS = [
+    (4624, "An account was successfully logged on", 35), (4625, "An account failed to log on", 15),
+    (4688, "A new process has been created", 20), (4648, "A logon was attempted using explicit credentials", 10),
+    (5156, "The Windows Filtering Platform has permitted a connection", 12), (4720, "A user account was created", 2),
+    (4722, "A user account was enabled", 2), (4725, "A user account was disabled", 2),
+    (4697, "A service was installed in the system", 1.9), (1102, "The audit log was cleared", 0.1),
+]
+COMPUTERS = ["DC01", "WEB01", "SRV01", "APP01", "EXCH01", "FILE01"]
+ACCOUNTS = ["svc-backup", "guest", "shreya", "svc-web", "arnab", "admin"]
+WINDOWS_SEVERITIES = ["Information", "Warning", "Error", "Critical"]
+LOGON_TYPES = ["", "Interactive", "Network", "Batch", "Service", "Unlock", "RemoteInteractive"]
+
+
+def skewed(rng, values, rows, exponent=1.2):
+    """
+    Draw rows values, the first ones far more often than the last ones
+    """
+    weights = 1.0 / np.arange(1, len(values) + 1) ** exponent
+    return np.asarray(values, dtype=object)[rng.choice(len(values), rows, p=weights / weights.sum())]
+
+
+def timestamps(rng, rows, first_row, total_rows):
+    """
+    Increasing timestamps for rows first_row .. first_row + rows of a file of total_rows
+    """
+    offsets = np.sort(rng.uniform(first_row, first_row + rows, rows)) * SPAN_SECONDS / max(total_rows, 1)
+    return START + pd.to_timedelta(offsets.astype(np.int64), unit="s")
+
+
+def bursts(rng, rows, anomaly_rate):
+    """
+    Row positions of a chunk that belong to a burst of failures, in runs of BURST_ROWS
+    """
+    positions = np.zeros(rows, dtype=bool)
+    for _ in range(rng.binomial(max(rows // BURST_ROWS, 1), min(anomaly_rate, 1.0))):
+        start = rng.integers(0, max(rows - BURST_ROWS, 1))
+        positions[start:start + BURST_ROWS] = True
+    return positions
+
+
+def network_events(rng, rows, first_row, total_rows, anomaly_rate):
+    source_ip = "192.168.1." + pd.Series(rng.integers(1, 100, rows)).astype(str)
+    destination_ip = "10.0.0." + pd.Series(rng.integers(1, 50, rows)).astype(str)
+    frame = pd.DataFrame({
+        "timestamp": timestamps(rng, rows, first_row, total_rows).strftime("%Y-%m-%d %H:%M:%S"),
+        "log_type": skewed(rng, LOG_TYPES, rows),
+        "event_type": skewed(rng, EVENT_TYPES, rows, exponent=0.8),
+        "source_ip": source_ip,
+        "destination_ip": destination_ip,
+        "user": skewed(rng, NETWORK_USERS, rows),
+        "severity": skewed(rng, NETWORK_SEVERITIES, rows),
+    })
+    burst = bursts(rng, rows, anomaly_rate)
+    frame.loc[burst, ["log_type", "event_type", "source_ip", "user", "severity"]] = \
+        ["Authentication", "Login Failure", "192.168.1.250", "admin", "High"]
+    frame["message"] = (frame["event_type"] + " from " + frame["source_ip"] + " to " + frame["destination_ip"]
+                        + " using user " + frame["user"])
+    return frame
+
+
+def windows_events(rng, rows, first_row, total_rows, anomaly_rate):
+    weights = np.array([weight for _, _, weight in WINDOWS_EVENTS])
+    events = rng.choice(len(WINDOWS_EVENTS), rows, p=weights / weights.sum())
+    frame = pd.DataFrame({
+        "timestamp": timestamps(rng, rows, first_row, total_rows).strftime("%Y-%m-%d %H:%M:%S"),
+        "event_id": np.array([event_id for event_id, _, _ in WINDOWS_EVENTS])[events],
+        "description": np.array([description for _, description, _ in WINDOWS_EVENTS], dtype=object)[events],
+        "computer": skewed(rng, COMPUTERS, rows),
+        "account_name": skewed(rng, ACCOUNTS, rows),
+        "severity": skewed(rng, WINDOWS_SEVERITIES, rows),
+        "logon_type": skewed(rng, LOGON_TYPES, rows, exponent=0.5),
+    })
+    burst = bursts(rng, rows, anomaly_rate)
+    frame.loc[burst, ["event_id", "description", "computer", "account_name", "severity", "logon_type"]] = \
+        [4625, "An account failed to log on", "DC01", "admin", "Warning", "Network"]
+    return frame
+
+
+def linux_syslog_csv(rng, rows, first_row, total_rows, anomaly_rate):
+    frame = pd.DataFrame({
+        "timestamp": timestamps(rng, rows, first_row, total_rows).strftime("%b %d %H:%M:%S"),
+        "hostname": skewed(rng, HOSTNAMES, rows),
+        "process": skewed(rng, PROCESSES, rows, exponent=0.7),
+        "pid": rng.integers(300, 10_000, rows),
+        "log_level": skewed(rng, LOG_LEVELS, rows, exponent=1.5),
+        "action": skewed(rng, LINUX_ACTIONS, rows, exponent=0.6),
+        "user": skewed(rng, LINUX_USERS, rows),
+    })
+    burst = bursts(rng, rows, anomaly_rate)
+    frame.loc[burst, ["hostname", "process", "log_level", "action", "user"]] = \
+        ["web-server", "sshd", "WARNING", "Failed password", "root"]
+    frame["message"] = frame["action"] + " for user " + frame["user"]
+    return frame.drop(columns=["action", "user"])
+
+
+# keyed by the name of the parser that reads each schema
+SCHEMAS = {
+    "network_events": network_events,
+    "windows_events": windows_events,
+    "linux_syslog_csv": linux_syslog_csv,
+}
+
+
+def iter_synthetic_frames(schema, rows, seed=0, chunk_rows=100_000, anomaly_rate=0.05):
+    """
+    Synthetic events of a schema as DataFrames of at most chunk_rows rows
+
+    Args:
+        schema: key of SCHEMAS
+        rows: total number of rows
+        seed: random seed; the same arguments always give the same rows
+        chunk_rows: rows per DataFrame
+        anomaly_rate: chance per BURST_ROWS rows of a burst of failed logins
+    """
+    if schema not in SCHEMAS:
+        raise ValueError(f"Unknown schema '{schema}', expected one of {list(SCHEMAS)}")
+    rng = np.random.default_rng(seed)
+    for first_row in range(0, rows, chunk_rows):
+        yield SCHEMAS[schema](rng, min(chunk_rows, rows - first_row), first_row, rows, anomaly_rate)
+
+
+def write_synthetic_logs(path, schema, rows, seed=0, chunk_rows=100_000, anomaly_rate=0.05):
+    """
+    Write a synthetic CSV log file with a header line, returning its path
+    """
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, frame in enumerate(iter_synthetic_frames(schema, rows, seed, chunk_rows, anomaly_rate)):
+            frame.to_csv(f, header=i == 0, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("schema", choices=list(SCHEMAS))
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--output", "-o", default=None, help="CSV path, defaults to <schema>_<rows>.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--anomaly-rate", type=float, default=0.05, help="chance of a failure burst per 200 rows")
+    args = parser.parse_args()
+
+    path = args.output or f"{args.schema}_{args.rows}.csv"
+    write_synthetic_logs(path, args.schema, args.rows, args.seed, anomaly_rate=args.anomaly_rate)
+    print(f"wrote {args.rows} {args.schema} rows to {path} ({os.path.getsize(path) / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 # frontend/app.py
 import streamlit as st
-import requests
 import json
+import time
 import uuid
-from src.api_health import check_api_health
+from src.api_client import BackendClient, invalidate, note_version
+from src.api_health import cached_api_health
+from src.streaming import iter_sse_tokens
 
 API_BASE_URL = "http://localhost:8000"
 LLM_URL="http://localhost:11434"
@@ -25,60 +27,106 @@ if 'analysis_result' not in st.session_state:
     st.session_state.analysis_result = {}
 if 'analysis_complete' not in st.session_state:
     st.session_state.analysis_complete = False
+if 'results_cache' not in st.session_state:
+    st.session_state.results_cache = {}
+
+@st.cache_resource
+def get_backend_client():
+    """One pooled client for every browser session of this Streamlit process"""
+    return BackendClient(API_BASE_URL)
+
+def api(method, path, **kwargs):
+    """Request the backend as this browser session, which keeps analyses and chats per session"""
+    return get_backend_client().request(method, path, st.session_state.session_id, **kwargs)
+
+def get_results(path):
+    """Analysis results, fetched again only when the backend reports a new analysis version"""
+    return get_backend_client().get_results(path, st.session_state.session_id, st.session_state.results_cache)
 
 # --- Sidebar Configuration ---
 with st.sidebar:
     st.title("⚙️ Settings")
     st.info(f"Session ID: {st.session_state.session_id[:8]}...")
 
-    if check_api_health(API_BASE_URL, "/"):
+    # probes are cached for a few seconds, not repeated on every rerun
+    if cached_api_health(API_BASE_URL, "/"):
         st.success("✅ Backend API is running")
     else:
         st.error("❌ Backend API is not available")
 
     # Ollama health
-    if check_api_health(LLM_URL, "/api/tags"):
+    if cached_api_health(LLM_URL, "/api/tags"):
         st.success("✅ API Ollama is running")
     else:
         st.error("❌ API Ollama is not available")
 
     if st.button("🔄 New Session"):
+        try:
+            api("DELETE", "/session")
+        except:
+            pass
         st.session_state.session_id = str(uuid.uuid4())
         st.session_state.chat_history = []
         st.session_state.analysis_result = {}
         st.session_state.analysis_complete = False
+        st.session_state.results_cache = {}
         st.rerun()
 
     if st.button("🧹 Clear Chat History"):
         try:
-            requests.post(f"{API_BASE_URL}/clear-chat")
+            api("POST", "/clear-chat")
             st.session_state.chat_history = []
             st.success("Chat history cleared")
         except:
             st.error("Failed to clear chat")
 
 # --- Section 1: Upload Logs ---
-st.subheader("Upload Network Logsin CSV format")
-uploaded_file = st.file_uploader("Upload a .csv file", type=['csv'])
+st.subheader("Upload Network Logs in CSV or text format")
+uploaded_file = st.file_uploader("Upload a .csv, .txt or .log file, optionally .gz or .zst compressed",
+                                 type=['csv', 'txt', 'log', 'gz', 'zst'])
 
 if uploaded_file is not None and not st.session_state.analysis_complete:
-    with st.spinner("Analyzing uploaded logs..."):
-        files = {"file": (uploaded_file.name, uploaded_file, "text/plain")}
-        response = requests.post(f"{API_BASE_URL}/upload-logs", files=files)
-        if response.status_code == 200:
-            st.success("✅ Logs uploaded and analyzed successfully!")
+    files = {"file": (uploaded_file.name, uploaded_file, "text/plain")}
+    response = api("POST", "/upload-logs", files=files)
+    if response.status_code == 200:
+        job_id = response.json()["job_id"]
+        progress_bar = st.progress(0.0, text="Analyzing uploaded logs...")
+
+        # show the analysis and anomalies as they are generated
+        for field, title in (("logs_analysis", "Logs Analysis"), ("anomalies", "Anomaly Detection")):
+            st.subheader(title)
+            try:
+                with api("GET", "/logs-analysis/stream", params={"job_id": job_id, "field": field},
+                         stream=True) as stream:
+                    st.write_stream(iter_sse_tokens(stream))
+            except Exception as e:
+                st.error(f"Error streaming {title.lower()}: {e}")
+
+        while True:
+            job = api("GET", f"/jobs/{job_id}").json()
+            progress_bar.progress(job["progress"], text=f"Analyzing uploaded logs: {job['stage']}")
+            if job["status"] in ("completed", "failed"):
+                break
+            time.sleep(1)
+        progress_bar.empty()
+
+        if job["status"] == "completed":
             st.session_state.analysis_complete = True
+            invalidate(st.session_state.results_cache)
+            st.rerun()
         else:
-            st.error(f"❌ Upload failed: {response.json().get('detail', 'Unknown error')}")
+            st.error(f"❌ Analysis failed: {job.get('error', 'Unknown error')}")
+    else:
+        st.error(f"❌ Upload failed: {response.json().get('detail', 'Unknown error')}")
 
 # --- Section 2: Logs Analysis ---
 if st.session_state.analysis_complete:
     st.markdown("---")
     st.subheader("Logs Analysis")
     try:
-        response = requests.get(f"{API_BASE_URL}/logs-analysis")
-        if response.status_code == 200:
-            logs_analysis = response.json().get("logs_analysis", "")
+        results = get_results("/logs-analysis")
+        if results is not None:
+            logs_analysis = results.get("logs_analysis", "")
             st.session_state.analysis_result['logs_analysis'] = logs_analysis
             st.markdown(logs_analysis, unsafe_allow_html=True)
         else:
@@ -91,9 +139,9 @@ if st.session_state.analysis_complete:
     st.markdown("---")
     st.subheader("Anomaly Detection")
     try:
-        response = requests.get(f"{API_BASE_URL}/anomalies")
-        if response.status_code == 200:
-            anomalies = response.json().get("anomalies", "")
+        results = get_results("/anomalies")
+        if results is not None:
+            anomalies = results.get("anomalies", "")
             st.session_state.analysis_result['anomalies'] = anomalies
 
             print(f"\n\nAnomalies: {anomalies}\n\n")
@@ -120,14 +168,20 @@ if st.session_state.analysis_complete:
 
     if prompt := st.chat_input("Ask something about the network logs"):
         st.session_state.chat_history.append({"role": "user", "content": prompt})
-        with st.spinner("Thinking..."):
-            try:
-                response = requests.post(f"{API_BASE_URL}/chat", json={"message": prompt})
-                if response.status_code == 200:
-                    bot_reply = response.json().get("response", "")
-                    st.session_state.chat_history.append({"role": "assistant", "content": bot_reply})
-                else:
-                    st.error("Failed to get bot response")
-            except:
-                st.error("Error during chat with bot")
+        with chat_container:
+            with st.chat_message("user"):
+                st.write(prompt)
+            with st.chat_message("assistant"):
+                try:
+                    with api("POST", "/chat/stream", json={"message": prompt}, stream=True) as response:
+                        if response.status_code == 200:
+                            # the answer carries the analysis version, so the rerun below needs no other request
+                            on_done = lambda payload: note_version(st.session_state.results_cache,
+                                                                   payload.get("analysis_version"))
+                            bot_reply = st.write_stream(iter_sse_tokens(response, on_done))
+                            st.session_state.chat_history.append({"role": "assistant", "content": bot_reply})
+                        else:
+                            st.error("Failed to get bot response")
+                except Exception as e:
+                    st.error(f"Error during chat with bot: {e}")
         st.rerun()
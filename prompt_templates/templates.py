@@ -1,4 +1,8 @@
 #prompt_templates/templates.py
+
+# Bump whenever a template changes, so cached analyses built from older prompts are not reused
+TEMPLATE_VERSION = "6"
+
 def default_chat_template(analysis):
     """
     set's up default LLM prompt for chatbot
@@ -14,12 +18,38 @@ def default_chat_template(analysis):
     """
     return default_system_prompt
 
+def retrieval_chat_template(analysis):
+    """
+    set's up LLM prompt for the chatbot when relevant log lines are retrieved per question
+    """
+    return f"""
+    Act as a cybersecurity expert specializing in network logs analysis.
+    You are provided with an analysis of network logs, and with each question the log lines most relevant to it.
+    Your task is to assist users in understanding the analysis and the logs, identifying potential security threats, and providing recommendations for mitigation.
+    Base answers about specific events on the provided log lines, and say so when they do not contain the answer.
+    If the user asks for anything unrelated to network logs analysis, politely inform them that you can only assist with network logs analysis.
+    Here is the analysis:
+    {analysis}
+    Please provide a concise and informative response to user queries related to network logs analysis.
+    """
+
+def retrieval_context(question, log_lines):
+    """
+    Attach the log lines retrieved for a question to the user's message
+    """
+    return f"""{question}
+
+    Relevant log lines:
+    {log_lines}
+    """
+
 def logs_analysis(logs):
     """
     Set up the logs analysis prompt template
     """
     return f"""
     You are an expert in analyzing network logs. Your task is to analyze the provided logs and identify any anomalies or issues.
+    Repeated lines may be grouped as "count x template | variable ranges", where <TIME>, <IP>, <NUM> and <*n> mark the parts that vary.
     
     Logs:
     {logs}
@@ -39,4 +69,88 @@ def identify_anomalies(logs_analysis):
     
     Create a short report identifying any anomalies and recommended actions.
     Structure the response using points.
-    """
\ No newline at end of file
+    """
+
+def merge_analyses(analyses):
+    """
+    Set up the prompt template for merging partial analyses of log chunks
+    """
+    partials = "\n\n".join(f"Partial analysis {i}:\n{analysis}" for i, analysis in enumerate(analyses, 1))
+    return f"""
+    You are an expert in analyzing network logs. The logs were too large to analyze at once, so they were split into chunks and each chunk was analyzed separately.
+    
+    {partials}
+    
+    Merge the partial analyses into one short analysis of the logs. Keep every anomaly or issue mentioned, combine duplicates, and do not invent new findings.
+    """
+
+
+def logs_statistics_analysis(statistics, samples):
+    """
+    Set up the logs analysis prompt template over aggregated statistics and sampled lines
+    """
+    return f"""
+    You are an expert in analyzing network logs. Your task is to analyze the provided logs and identify any anomalies or issues.
+    The logs are too large to show in full, so you are given aggregated statistics over all of them and a random sample of raw lines.
+    
+    Statistics:
+    {statistics}
+    
+    Sampled logs:
+    {samples}
+    
+    Create a short analysis of the logs.
+    """
+
+
+def incremental_analysis(previous_analysis, statistics, samples):
+    """
+    Set up the prompt template for updating an analysis with newly appended logs only
+    """
+    return f"""
+    You are an expert in analyzing network logs. New logs were appended to logs you already analyzed.
+    Your task is to update the existing analysis with what the new logs show, without seeing the earlier logs again.
+    
+    Existing analysis:
+    {previous_analysis}
+    
+    Statistics of the new logs:
+    {statistics}
+    
+    Sampled new logs:
+    {samples}
+    
+    Create a short, updated analysis of all the logs. Keep earlier findings that still hold and point out what changed.
+    """
+
+
+def escalate_anomalies(logs_analysis, findings, flagged_logs):
+    """
+    Set up the prompt template for reviewing windows flagged by the rule-based anomaly prefilter
+    """
+    return f"""
+    You are an expert in cybersecurity. A rule-based detector flagged suspicious windows in the network logs.
+    Your task is to review the flagged findings and the log lines inside those windows, in light of the overall analysis.
+    
+    logs_analysis:
+    {logs_analysis}
+    
+    Flagged findings (JSON), with the ip_tags of addresses: internal or external, asset subnet, local blocklists listing them:
+    {findings}
+    
+    Logs inside the flagged windows:
+    {flagged_logs}
+    
+    Create a short report identifying the real anomalies among the findings and recommended actions.
+    Structure the response using points.
+    """
+
+
+def conversation_summary(summary):
+    """
+    Set up the system message carrying the summary of earlier chat turns dropped from the history
+    """
+    return f"""
+    Summary of the earlier part of this conversation, which is no longer shown in full:
+    {summary}
+    """
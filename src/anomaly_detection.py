@@ -0,0 +1,313 @@
+#src/anomaly_detection.py
+from src.timestamps import parse_timestamps
+from src import config
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+FAILED_LOGIN_EVENT_TYPES = ("Login Failure", "Brute Force Attack")
+FAILED_LOGIN_EVENT_IDS = (4625,)
+FAILED_LOGIN_PATTERN = r"failed password|failed login|failed to log on"
+ROOT_SESSION_PATTERN = r"session opened for user root"
+ENTITY_COLUMNS = ("source_ip", "host")
+SEVERITY_ORDER = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
+# attributes update() replaces, logged for rollback() next to the counters it changes
+SCALAR_STATE = ("total_rows", "first_seen", "last_seen", "timezone", "entity_column")
+# undo log value of a key that did not exist yet
+ABSENT = object()
+# approximate memory of one entry of a running count: the dict slot, a string or small tuple key and an int
+COUNT_ENTRY_BYTES = 150
+
+def remember(undo, totals, keys):
+    """
+    Log the current values of keys of a dict (or Counter) to an undo log, if one is kept
+    """
+    if undo is not None:
+        undo.extend((totals, key, totals.get(key, ABSENT)) for key in keys)
+
+def rollback(undo):
+    """
+    Restore every value logged to an undo log, newest first, and empty the log
+    """
+    for totals, key, previous in reversed(undo):
+        if previous is ABSENT:
+            totals.pop(key, None)
+        else:
+            totals[key] = previous
+    undo.clear()
+
+class AnomalyDetector:
+    """
+    CPU-only, rule and statistics based anomaly prefilter
+
+    Chunks are folded into running counters with update(), and findings() evaluates the rules:
+        - rate_spike: per-IP events per minute far above that IP's own baseline (z-score)
+        - brute_force: bursts of failed logins from one source within a short window
+        - rare_event_id: Windows event IDs that make up a tiny share of all events
+        - off_hours_root: root sessions opened outside business hours
+        - blocklist_hit: addresses listed in a local blocklist, when given IP enrichment counts
+    Findings about an address carry its ip_tags (internal or external, asset subnet, blocklists).
+    Only windows flagged here are escalated to the LLM.
+
+    Counters are dicts updated in place, with per-IP running sums and sums of squares of the minute
+    counts, so a chunk costs time proportional to its own keys. update() returns the keys it touched,
+    and findings(touched) evaluates only those, which keeps appends to a live analysis independent of
+    the history before them.
+    """
+
+    def __init__(self, zscore_threshold=None, min_spike_count=None, brute_force_threshold=None,
+                 brute_force_window=None, rare_event_share=None, business_hours=None, ip_enrichment=None):
+        """
+        Args:
+            zscore_threshold: minimum z-score of a per-IP minute count to be reported as a spike
+            min_spike_count: minimum events in the minute for a spike, so tiny baselines don't trigger
+            brute_force_threshold: failed logins within one window that count as a brute-force burst
+            brute_force_window: pandas frequency string of the brute-force window, e.g. "5min"
+            rare_event_share: event IDs below this share of all events are rare
+            business_hours: (start_hour, end_hour) outside of which root sessions are flagged
+            ip_enrichment: IPEnrichment updated with the same chunks (by LogStatistics), whose
+                           blocklist hits are reported and whose tags are added to the findings
+        """
+        self.zscore_threshold = zscore_threshold or config.ANOMALY_ZSCORE_THRESHOLD
+        self.min_spike_count = min_spike_count or config.ANOMALY_MIN_SPIKE_COUNT
+        self.brute_force_threshold = brute_force_threshold or config.ANOMALY_BRUTE_FORCE_THRESHOLD
+        self.brute_force_window = brute_force_window or config.ANOMALY_BRUTE_FORCE_WINDOW
+        self.rare_event_share = rare_event_share or config.ANOMALY_RARE_EVENT_SHARE
+        self.business_hours = business_hours or config.ANOMALY_BUSINESS_HOURS
+        self.ip_enrichment = ip_enrichment
+
+        self.total_rows = 0
+        self.entity_column = None
+        self.first_seen = None
+        self.last_seen = None
+        self.timezone = None
+        # window starts in the keys are integer nanoseconds, which hash far faster than Timestamps
+        # (ip, minute) -> events, and per IP the sum and the sum of squares of its minute counts
+        self.ip_minute_counts = {}
+        self.ip_sums = {}
+        self.ip_squares = {}
+        # (entity, window start) -> failed logins, (host, hour) -> off-hours root sessions
+        self.failed_login_counts = {}
+        self.off_hours_root_counts = {}
+        self.event_id_counts = Counter()
+
+    def size_bytes(self):
+        """
+        Approximate memory held by the running counts
+        """
+        counts = (self.ip_minute_counts, self.ip_sums, self.ip_squares, self.failed_login_counts,
+                  self.off_hours_root_counts, self.event_id_counts)
+        return COUNT_ENTRY_BYTES * sum(len(totals) for totals in counts)
+
+    @staticmethod
+    def _accumulate(totals, counts, undo=None):
+        """
+        Add the value_counts of a chunk to a dict of running counts
+
+        Output:
+            tuple: (keys touched, their totals before, their totals after) as a list and two arrays
+        """
+        keys = counts.index.tolist()
+        remember(undo, totals, keys)
+        before = np.fromiter((totals.get(key, 0) for key in keys), dtype=np.int64, count=len(keys))
+        after = before + counts.to_numpy(dtype=np.int64)
+        totals.update(zip(keys, after.tolist()))
+        return keys, before, after
+
+    def _window_starts(self, timestamps, freq):
+        """
+        Start of the freq window of every timestamp, as integer nanoseconds (UTC if tz-aware)
+        """
+        self.timezone = self.timezone or timestamps.dt.tz
+        starts = timestamps.dt.floor(freq).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        return pd.Series(starts, index=timestamps.index)
+
+    def _timestamp(self, nanoseconds):
+        timestamp = pd.Timestamp(nanoseconds)
+        return timestamp.tz_localize("UTC").tz_convert(self.timezone) if self.timezone else timestamp
+
+    @staticmethod
+    def _entity_column(chunk):
+        return next((column for column in ENTITY_COLUMNS if column in chunk.columns and chunk[column].notna().any()), None)
+
+    def _failed_login_mask(self, chunk):
+        mask = pd.Series(False, index=chunk.index)
+        if "event_type" in chunk.columns:
+            mask |= chunk["event_type"].isin(FAILED_LOGIN_EVENT_TYPES)
+        if "event_id" in chunk.columns:
+            mask |= chunk["event_id"].isin(FAILED_LOGIN_EVENT_IDS)
+        for column in ("message", "description"):
+            if column in chunk.columns:
+                mask |= chunk[column].astype(str).str.contains(FAILED_LOGIN_PATTERN, case=False, regex=True)
+        return mask
+
+    def _root_session_mask(self, chunk):
+        mask = pd.Series(False, index=chunk.index)
+        if "message" in chunk.columns:
+            mask |= chunk["message"].astype(str).str.contains(ROOT_SESSION_PATTERN, case=False, regex=True)
+        if "event_type" in chunk.columns and "user" in chunk.columns:
+            mask |= (chunk["event_type"] == "Login Success") & (chunk["user"] == "root")
+        return mask
+
+    def update(self, chunk, undo=None):
+        """
+        Fold a chunk of raw log rows into the detector's counters
+
+        Args:
+            chunk: normalized event DataFrame
+            undo: optional undo log the replaced values are added to, so that rollback(undo) takes
+                  the chunk out again; it grows with the chunk, not with the counters
+
+        Output:
+            dict: counter name -> keys the chunk touched, for findings(touched)
+        """
+        remember(undo, self.__dict__, SCALAR_STATE)
+        self.total_rows += len(chunk)
+        touched = {"ip_minute_counts": [], "failed_login_counts": [], "off_hours_root_counts": []}
+
+        if "event_id" in chunk.columns:
+            event_ids = chunk["event_id"].value_counts().to_dict()
+            remember(undo, self.event_id_counts, event_ids)
+            self.event_id_counts.update(event_ids)
+
+        if "timestamp" not in chunk.columns:
+            return touched
+        timestamps = parse_timestamps(chunk["timestamp"])
+        valid = timestamps.notna()
+        if not valid.any():
+            return touched
+        chunk, timestamps = chunk[valid], timestamps[valid]
+
+        first, last = timestamps.min(), timestamps.max()
+        self.first_seen = first if self.first_seen is None else min(self.first_seen, first)
+        self.last_seen = last if self.last_seen is None else max(self.last_seen, last)
+
+        if "source_ip" in chunk.columns:
+            pairs = pd.MultiIndex.from_arrays([chunk["source_ip"], self._window_starts(timestamps, "min")])
+            counts = pairs.value_counts()
+            keys, before, after = self._accumulate(self.ip_minute_counts, counts, undo)
+            per_ip = pd.DataFrame({"added": after - before, "squares": after * after - before * before})
+            per_ip = per_ip.groupby(counts.index.get_level_values(0).to_numpy()).sum()
+            remember(undo, self.ip_sums, per_ip.index)
+            remember(undo, self.ip_squares, per_ip.index)
+            for ip, added, squares in zip(per_ip.index.tolist(), per_ip["added"].tolist(), per_ip["squares"].tolist()):
+                self.ip_sums[ip] = self.ip_sums.get(ip, 0) + added
+                self.ip_squares[ip] = self.ip_squares.get(ip, 0) + squares
+            touched["ip_minute_counts"] = keys
+
+        entity = self._entity_column(chunk)
+        self.entity_column = self.entity_column or entity
+        failed = self._failed_login_mask(chunk)
+        if entity and failed.any():
+            pairs = pd.MultiIndex.from_arrays([
+                chunk.loc[failed, entity], self._window_starts(timestamps[failed], self.brute_force_window)
+            ])
+            touched["failed_login_counts"] = self._accumulate(self.failed_login_counts, pairs.value_counts(), undo)[0]
+
+        start_hour, end_hour = self.business_hours
+        hours = timestamps.dt.hour
+        off_hours_root = self._root_session_mask(chunk) & ((hours < start_hour) | (hours >= end_hour))
+        if off_hours_root.any():
+            host = chunk.loc[off_hours_root, entity] if entity else pd.Series("unknown", index=chunk.index[off_hours_root])
+            pairs = pd.MultiIndex.from_arrays([host, self._window_starts(timestamps[off_hours_root], "h")])
+            touched["off_hours_root_counts"] = self._accumulate(self.off_hours_root_counts, pairs.value_counts(), undo)[0]
+        return touched
+
+    def _rate_spikes(self, keys=None):
+        keys = list(self.ip_minute_counts) if keys is None else keys
+        if not keys:
+            return []
+        # baseline per IP over every minute of the capture, minutes without events counting as zero
+        span = max(int((self.last_seen - self.first_seen) / pd.Timedelta(minutes=1)) + 1, 1)
+        counts = np.fromiter((self.ip_minute_counts[key] for key in keys), dtype=np.float64, count=len(keys))
+        codes, ips = pd.factorize(np.array([ip for ip, _ in keys], dtype=object))
+        mean = np.array([self.ip_sums[ip] for ip in ips], dtype=np.float64)[codes] / span
+        squares = np.array([self.ip_squares[ip] for ip in ips], dtype=np.float64)[codes]
+        std = np.sqrt(np.maximum(squares / span - mean ** 2, 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            zscores = np.where(std > 0, (counts - mean) / std, 0.0)
+
+        flagged = np.flatnonzero((zscores >= self.zscore_threshold) & (counts >= self.min_spike_count))
+        findings = []
+        for position in flagged.tolist():
+            (ip, minute), count, zscore = keys[position], counts[position], zscores[position]
+            minute = self._timestamp(minute)
+            findings.append({
+                "rule": "rate_spike",
+                "severity": "High" if zscore >= 2 * self.zscore_threshold else "Medium",
+                "column": "source_ip",
+                "value": str(ip),
+                "window_start": minute.isoformat(),
+                "window_end": (minute + pd.Timedelta(minutes=1)).isoformat(),
+                "count": int(count),
+                "score": round(float(zscore), 2),
+                "description": f"{int(count)} events from {ip} in one minute (z-score {zscore:.1f})",
+            })
+        return findings
+
+    def _brute_force(self, keys=None):
+        keys = self.failed_login_counts if keys is None else keys
+        counts = {(entity, self._timestamp(start)): self.failed_login_counts[entity, start] for entity, start in keys
+                  if self.failed_login_counts[entity, start] >= self.brute_force_threshold}
+        window = pd.Timedelta(self.brute_force_window)
+        return [{
+            "rule": "brute_force",
+            "severity": "Critical" if count >= 2 * self.brute_force_threshold else "High",
+            "column": self.entity_column,
+            "value": str(entity),
+            "window_start": start.isoformat(),
+            "window_end": (start + window).isoformat(),
+            "count": int(count),
+            "score": round(float(count / self.brute_force_threshold), 2),
+            "description": f"{int(count)} failed logins from {entity} within {self.brute_force_window}",
+        } for (entity, start), count in counts.items()]
+
+    def _rare_event_ids(self):
+        rare = {event_id: count for event_id, count in self.event_id_counts.items()
+                if count / self.total_rows < self.rare_event_share}
+        return [{
+            "rule": "rare_event_id",
+            "severity": "Medium",
+            "column": "event_id",
+            "value": str(event_id),
+            "window_start": None,
+            "window_end": None,
+            "count": int(count),
+            "score": round(float(count / self.total_rows), 6),
+            "description": f"Windows event ID {event_id} seen only {int(count)} times out of {self.total_rows}",
+        } for event_id, count in rare.items()]
+
+    def _off_hours_root(self, keys=None):
+        keys = self.off_hours_root_counts if keys is None else keys
+        counts = {(host, self._timestamp(hour)): self.off_hours_root_counts[host, hour] for host, hour in keys}
+        return [{
+            "rule": "off_hours_root",
+            "severity": "High",
+            "column": self.entity_column,
+            "value": str(host),
+            "window_start": hour.isoformat(),
+            "window_end": (hour + pd.Timedelta(hours=1)).isoformat(),
+            "count": int(count),
+            "score": float(count),
+            "description": f"{int(count)} root sessions on {host} outside business hours",
+        } for (host, hour), count in counts.items()]
+
+    def findings(self, touched=None):
+        """
+        Evaluate the rules over the accumulated counters
+
+        Args:
+            touched: keys returned by update(); only those keys of the per-IP, brute-force and
+                     off-hours counters are evaluated, against the baselines of the whole history.
+                     Rare event IDs and blocklist hits, which only have a handful of counters, are
+                     always evaluated in full.
+
+        Output:
+            list: JSON-serializable findings, most severe first
+        """
+        keys = (lambda counter: None) if touched is None else (lambda counter: touched.get(counter, []))
+        findings = (self._brute_force(keys("failed_login_counts")) + self._rate_spikes(keys("ip_minute_counts"))
+                    + self._off_hours_root(keys("off_hours_root_counts")) + self._rare_event_ids())
+        if self.ip_enrichment is not None:
+            findings = self.ip_enrichment.annotate(findings + self.ip_enrichment.findings())
+        return sorted(findings, key=lambda finding: (SEVERITY_ORDER[finding["severity"]], -finding["count"]))
@@ -0,0 +1,90 @@
+#src/api_client.py
+from src import config
+import requests
+from requests.adapters import HTTPAdapter
+
+SESSION_HEADER = "X-Session-ID"
+
+class BackendClient:
+    """
+    Pooled HTTP client of the Streamlit frontend for the backend API
+
+    Streamlit reruns the whole script on every widget interaction and chat message. One client is
+    shared by every browser session of the frontend process, so connections are reused, and analysis
+    results are kept in a cache per browser session: they are only fetched again once the backend
+    reports a new analysis version, and then with a conditional (If-None-Match) request.
+    """
+
+    def __init__(self, base_url, pool_size=None, timeout=None):
+        """
+        Args:
+            base_url: backend URL
+            pool_size: keep-alive connections to the backend, shared by all browser sessions
+            timeout: seconds to wait for a response to start; streamed requests are not limited
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout or config.FRONTEND_REQUEST_TIMEOUT
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or config.FRONTEND_POOL_SIZE)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+
+    def request(self, method, path, session_id, headers=None, **kwargs):
+        """
+        Send a request on behalf of a browser session
+
+        Output:
+            requests.Response
+        """
+        if not kwargs.get("stream"):
+            kwargs.setdefault("timeout", self.timeout)
+        headers = {SESSION_HEADER: session_id, **(headers or {})}
+        return self.http.request(method, f"{self.base_url}{path}", headers=headers, **kwargs)
+
+    def get_results(self, path, session_id, cache):
+        """
+        GET an analysis endpoint (/logs-analysis, /anomalies) through the session's results cache
+
+        The cached body is returned without a request while its version is the latest one known
+        (see note_version); otherwise it is revalidated, and a 304 keeps the cached body.
+
+        Args:
+            path: endpoint path
+            session_id: browser session id
+            cache: dict kept per browser session, e.g. in st.session_state
+
+        Output:
+            dict: response body, or None if the session has no results
+        """
+        entry = cache.get(path)
+        if entry is not None and entry["version"] is not None and entry["version"] == cache.get("version"):
+            return entry["body"]
+
+        headers = {"If-None-Match": entry["etag"]} if entry is not None else {}
+        response = self.request("GET", path, session_id, headers=headers)
+        if response.status_code == 304:
+            # the ETag is the analysis version, so the cached body is current
+            cache["version"] = entry["version"]
+            return entry["body"]
+        if response.status_code == 404:
+            cache.pop(path, None)
+            return None
+        response.raise_for_status()
+        body = response.json()
+        cache[path] = {"etag": response.headers.get("ETag"), "version": body.get("version"), "body": body}
+        cache["version"] = body.get("version")
+        return body
+
+def note_version(cache, version):
+    """
+    Record the analysis version reported by the backend (e.g. with a chat answer); cached results of
+    another version are revalidated on their next use
+    """
+    if version is not None:
+        cache["version"] = version
+
+def invalidate(cache):
+    """
+    Mark the cached results of a session as stale, e.g. once a new analysis job completes
+    """
+    cache["version"] = None
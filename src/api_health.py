@@ -1,9 +1,32 @@
-import requests
+from src.llm_client import get_http_client
+from src import config
+import threading
+import time
+import httpx
 
-def check_api_health(url, path):
+# (url, path) -> (monotonic time of the probe, healthy)
+_probes = {}
+_probes_lock = threading.Lock()
+
+def check_api_health(url, path, timeout=None):
     """Check if the backend API is running"""
     try:
-        response = requests.get(f"{url}{path}")
+        response = get_http_client().get(f"{url}{path}", timeout=timeout or httpx.USE_CLIENT_DEFAULT)
         return response.status_code == 200
-    except requests.exceptions.RequestException:
-        return False
\ No newline at end of file
+    except httpx.HTTPError:
+        return False
+
+def cached_api_health(url, path, ttl=None, timeout=None):
+    """
+    check_api_health, remembered for ttl seconds by every session of the process, so Streamlit
+    reruns do not probe the services again
+    """
+    ttl = config.HEALTH_CHECK_TTL if ttl is None else ttl
+    with _probes_lock:
+        probe = _probes.get((url, path))
+    if probe is not None and time.monotonic() - probe[0] < ttl:
+        return probe[1]
+    healthy = check_api_health(url, path, timeout)
+    with _probes_lock:
+        _probes[(url, path)] = (time.monotonic(), healthy)
+    return healthy
@@ -0,0 +1,209 @@
+#src/batch_analysis.py
+"""
+Analyze every log file of a directory from the command line, writing one JSON line per file.
+
+Parsing and aggregation run in a pool of worker processes, one file per task, so they use every
+core. The LLM stage runs in the main process on a small thread pool shared by all files, which
+bounds the requests sent to Ollama no matter how many workers parse. Parsed files wait for a
+free LLM slot, and no more files are parsed ahead than a few slots' worth.
+
+Results are appended to the output file as each file finishes. Re-running with the same output
+resumes: files that completed before and have not changed since are skipped, failed ones are retried.
+
+Usage:
+    python -m src.batch_analysis exports/ --output results.jsonl --workers 8 --llm-concurrency 2
+"""
+from src.logs_analysis import DocumentAnalysis, NO_ANOMALIES_MESSAGE
+from src.log_parsers import get_parser
+from src import config
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+LOG_EXTENSIONS = (".csv", ".txt", ".log")
+
+def find_log_files(directory, recursive=False):
+    """
+    Log files of a directory in a stable order
+    """
+    if recursive:
+        paths = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+    else:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    return sorted(path for path in paths if os.path.isfile(path) and path.lower().endswith(LOG_EXTENSIONS))
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+def load_completed(output_path):
+    """
+    Signatures of the files completed in an earlier run of the same output, by path
+
+    A last line cut off by an interruption is ignored, so that file is analyzed again.
+    """
+    completed = {}
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "completed":
+                completed[record["path"]] = (record["size"], record["mtime"])
+    return completed
+
+def prepare_file(path, chunksize):
+    """
+    CPU stage, run in a worker process: parse and aggregate one file, and collect what the LLM stage needs
+
+    Output:
+        dict: path, log_format and either the cached results, the prepared statistics, findings and
+              flagged lines, or the error
+    """
+    started = time.perf_counter()
+    record = {"path": path, **file_signature(path)}
+    try:
+        doc_analysis = DocumentAnalysis(path, chunksize=chunksize)
+        record["log_format"] = doc_analysis.parser.name
+        key = doc_analysis.result_key() if doc_analysis.cache else None
+        cached = doc_analysis.cache.get("results", key) if key else None
+        if cached is not None:
+            return {**record, "key": key, "cached": cached, "parse_seconds": time.perf_counter() - started}
+
+        statistics, detector = doc_analysis.scan()
+        findings = detector.findings() if config.ANOMALY_PREFILTER else None
+        flagged_lines = doc_analysis.collect_flagged_lines(findings) if findings else []
+        return {**record, "key": key, "rows": statistics.total_rows, "statistics": statistics, "findings": findings,
+                "flagged_lines": flagged_lines, "parse_seconds": time.perf_counter() - started}
+    except Exception as e:
+        # exceptions are returned rather than raised, not every exception type survives pickling
+        return {**record, "error": str(e), "parse_seconds": time.perf_counter() - started}
+
+def finish_file(prepared):
+    """
+    LLM stage, run in the main process: analysis and anomaly report of a prepared file
+
+    Output:
+        dict: the JSONL record of the file
+    """
+    started = time.perf_counter()
+    record = {key: prepared[key] for key in ("path", "size", "mtime", "log_format", "rows", "parse_seconds")
+              if key in prepared}
+    if "error" in prepared:
+        return {**record, "status": "failed", "error": prepared["error"]}
+    if "cached" in prepared:
+        return {**record, "status": "completed", "cached": True, **prepared["cached"]}
+
+    try:
+        doc_analysis = DocumentAnalysis(prepared["path"], parser=get_parser(prepared["log_format"]))
+        if doc_analysis.summarize:
+            logs_analysis = doc_analysis.analyse_statistics(prepared["statistics"])
+        else:
+            logs_analysis = doc_analysis.analyse_logs(doc_analysis.analysed_lines(prepared["statistics"]))
+        findings = prepared["findings"]
+        anomalies = doc_analysis.identify_anomalies(logs_analysis, findings, flagged_lines=prepared["flagged_lines"])
+        results = {"logs_analysis": logs_analysis, "anomalies": anomalies, "anomaly_findings": findings or []}
+        if prepared["key"]:
+            doc_analysis.cache.set("results", prepared["key"], results)
+        return {**record, "status": "completed", "cached": False, **results,
+                "llm_seconds": time.perf_counter() - started}
+    except Exception as e:
+        return {**record, "status": "failed", "error": str(e)}
+
+class BatchAnalysis:
+    """
+    Analyzes many log files with a process pool for parsing and a bounded thread pool for LLM calls
+    """
+
+    def __init__(self, output_path, workers=None, llm_concurrency=None, chunksize=50_000, max_prepared=None):
+        """
+        Args:
+            output_path: JSONL file the records are appended to
+            workers: parsing processes, defaults to the number of cores
+            llm_concurrency: files in the LLM stage at once, shared by all workers
+            chunksize: events read per chunk within a file
+            max_prepared: parsed files allowed to wait for the LLM stage, bounding memory
+        """
+        self.output_path = output_path
+        self.workers = workers or os.cpu_count() or 1
+        self.llm_concurrency = llm_concurrency or config.BATCH_LLM_CONCURRENCY
+        self.chunksize = chunksize
+        self.max_prepared = max_prepared or 2 * self.llm_concurrency + self.workers
+
+    def run(self, paths, progress=None):
+        """
+        Analyze the files that are not completed in the output yet
+
+        Args:
+            paths: log files to analyze
+            progress: optional callback progress(done, total, record)
+
+        Output:
+            dict: counts of completed, failed and skipped files
+        """
+        completed = load_completed(self.output_path)
+        pending = [path for path in paths
+                   if completed.get(path) != tuple(file_signature(path).values())]
+        counts = {"completed": 0, "failed": 0, "skipped": len(paths) - len(pending)}
+
+        # spawn, so workers do not inherit the parent's SQLite connection and HTTP client threads
+        context = multiprocessing.get_context("spawn")
+        with open(self.output_path, "a", encoding="utf-8") as output, \
+                ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as parse_pool, \
+                ThreadPoolExecutor(max_workers=self.llm_concurrency) as llm_pool:
+            queue = list(reversed(pending))
+            parsing, finishing = set(), set()
+            while queue or parsing or finishing:
+                # parse ahead only while the LLM stage keeps up
+                while queue and len(parsing) + len(finishing) < self.max_prepared:
+                    parsing.add(parse_pool.submit(prepare_file, queue.pop(), self.chunksize))
+
+                done, _ = wait(parsing | finishing, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in parsing:
+                        parsing.remove(future)
+                        finishing.add(llm_pool.submit(finish_file, future.result()))
+                        continue
+                    finishing.remove(future)
+                    record = future.result()
+                    output.write(json.dumps(record, default=str) + "\n")
+                    output.flush()
+                    os.fsync(output.fileno())
+                    counts[record["status"]] += 1
+                    if progress:
+                        progress(counts["completed"] + counts["failed"], len(pending), record)
+        return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="directory of log exports")
+    parser.add_argument("--output", "-o", default="batch_results.jsonl", help="JSONL results file, appended to")
+    parser.add_argument("--workers", type=int, default=None, help="parsing processes, defaults to the core count")
+    parser.add_argument("--llm-concurrency", type=int, default=None,
+                        help=f"files in the LLM stage at once (default {config.BATCH_LLM_CONCURRENCY})")
+    parser.add_argument("--recursive", "-r", action="store_true", help="include subdirectories")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    args = parser.parse_args()
+
+    paths = find_log_files(args.directory, args.recursive)
+    batch = BatchAnalysis(args.output, args.workers, args.llm_concurrency, args.chunksize)
+
+    def progress(done, total, record):
+        detail = record.get("error") or ("cached" if record.get("cached") else f"{record.get('rows', 0)} rows")
+        print(f"[{done}/{total}] {record['status']}: {record['path']} ({detail})", file=sys.stderr)
+
+    started = time.perf_counter()
+    counts = batch.run(paths, progress)
+    print(f"{counts['completed']} completed, {counts['failed']} failed, {counts['skipped']} already done "
+          f"in {time.perf_counter() - started:.1f}s, results in {args.output}", file=sys.stderr)
+    sys.exit(1 if counts["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
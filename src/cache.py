@@ -0,0 +1,160 @@
+#src/cache.py
+from src import config
+from collections import Counter
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+def make_key(*parts) -> str:
+    """
+    Build a cache key by hashing the given parts
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def file_digest(path, block_size=1 << 20) -> str:
+    """
+    SHA-256 of a file's bytes, read in fixed-size blocks
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    SQLite-backed, content-addressed cache with TTL and LRU size eviction
+
+    Entries live in namespaces ("results" for whole analyses, "prompts" for single completions)
+    and store JSON values. Hit and miss counters are kept per namespace.
+    """
+
+    def __init__(self, path, max_bytes=None, ttl_seconds=None):
+        """
+        Args:
+            path: SQLite database file, or ":memory:"
+            max_bytes: total size of stored values above which least recently used entries are evicted
+            ttl_seconds: entries older than this are treated as missing; 0 disables expiry
+        """
+        self.path = path
+        self.max_bytes = config.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl_seconds = config.CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._conn.commit()
+
+    def get(self, namespace, key):
+        """
+        Look up a value, returning None on a miss or an expired entry
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            now = time.time()
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                    self._conn.commit()
+                self.misses[namespace] += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+            )
+            self._conn.commit()
+            self.hits[namespace] += 1
+            return json.loads(row[0])
+
+    def set(self, namespace, key, value):
+        """
+        Store a JSON-serializable value and evict least recently used entries beyond max_bytes
+        """
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, payload, len(payload), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        if not self.max_bytes:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at").fetchall()
+        evicted = []
+        for namespace, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((namespace, key))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Hit/miss counters and occupancy, for the /status endpoint
+        """
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        namespaces = sorted(set(self.hits) | set(self.misses))
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": sum(self.hits.values()),
+            "misses": sum(self.misses.values()),
+            "by_namespace": {
+                namespace: {"hits": self.hits[namespace], "misses": self.misses[namespace]}
+                for namespace in namespaces
+            },
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    Process-wide cache configured from src/config.py, or None when caching is disabled
+    """
+    global _cache
+    if not config.CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(config.CACHE_PATH)
+        return _cache
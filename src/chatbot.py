@@ -1,17 +1,104 @@
 #src/chatbot.py
-import ollama
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, AsyncIterator
+from collections import deque
+import asyncio
 from src.custom_exception import CustomException
+from src.conversation_memory import ConversationMemory
+from src.llm_client import LLMClient, get_llm_client
+from src.llm_scheduler import CHAT
+from src.log_index import LogIndex
+from src.query_router import route_question
+from src.tokens import estimate_tokens
+from src import config
+from src import metrics
+from prompt_templates.templates import retrieval_context
 
 class ChatBot:
-    def __init__(self, system_prompt: str="", model: str="llama3.1:8b-instruct-q4_K_M"):
-        self.model=model
-        self.messages=[]
+    def __init__(self, system_prompt: str="", model: Optional[str]=None, llm_client: Optional[LLMClient]=None,
+                 index: Optional[LogIndex]=None, top_k: Optional[int]=None, history_tokens: Optional[int]=None,
+                 event_table=None):
+        """
+        Args:
+            system_prompt: instructions and analysis context pinned at the start of the chat
+            model: model name, defaults to the configured Ollama model
+            llm_client: client used for model calls, defaults to the shared client
+            index: index of the uploaded log lines; the top_k lines relevant to each question are
+                   added to that turn only, instead of keeping the logs in the prompt
+            top_k: number of log lines retrieved per turn
+            history_tokens: token budget of the chat history; older turns are folded into a running summary
+            event_table: indexed table of the uploaded events; count/filter questions are answered from it
+                         directly instead of by the LLM
+        """
+        self.llm=llm_client or get_llm_client()
+        self.model=model or self.llm.model
+        self.index=index
+        self.top_k=top_k or config.CHAT_RETRIEVAL_TOP_K
+        self.event_table=event_table
+        # "query" when the latest answer came from the event table, "llm" otherwise
+        self.last_source=None
+        # prompt tokens of recent turns, as counted by Ollama when it reports them
+        self.prompt_tokens=deque(maxlen=1000)
 
-        if system_prompt:
-            self.messages.append({"role": "system", "content": system_prompt})
-        else:
+        if not system_prompt:
             raise ValueError("No system prompt received in chatbot class")
+        self.memory=ConversationMemory(system_prompt, token_budget=history_tokens)
+
+    @property
+    def messages(self)-> List[Dict]:
+        return self.memory.messages()
+
+    @property
+    def last_prompt_tokens(self)-> Optional[int]:
+        return self.prompt_tokens[-1] if self.prompt_tokens else None
+
+    def _add_user_message(self, user_input: str):
+        self.memory.add({"role": "user", "content": user_input})
+
+    def _record_prompt_tokens(self, response: Dict, messages: List[Dict]):
+        count=response.get("prompt_eval_count")
+        self.prompt_tokens.append(count if count else sum(estimate_tokens(message["content"]) for message in messages))
+
+    def _route(self, user_input: str)-> Optional[str]:
+        """
+        Answer the question from the event table if it is a pure count/filter/group-by question
+        """
+        if not config.CHAT_QUERY_ROUTER or self.event_table is None:
+            return None
+        with metrics.span("query_router"):
+            routed=route_question(user_input, self.event_table)
+        if routed is None:
+            return None
+        if config.METRICS_ENABLED:
+            metrics.registry.inc("chat_routed_questions_total", help="Chat questions answered from the event table")
+        self.memory.add({"role": "user", "content": user_input})
+        self.memory.add({"role": "assistant", "content": routed["answer"]})
+        self.prompt_tokens.append(0)
+        self.last_source="query"
+        return routed["answer"]
+
+    def _request_messages(self)-> List[Dict]:
+        """
+        Messages sent for the current turn: the history, with retrieved log lines attached to the
+        latest question only, so they are not carried into later turns
+        """
+        if not self.index or not len(self.index):
+            return self.messages
+
+        question=self.messages[-1]["content"]
+        with metrics.span("retrieval"):
+            lines=[line for line, _ in self.index.search(question, self.top_k)]
+        if not lines:
+            return self.messages
+        return self.messages[:-1]+[{"role": "user", "content": retrieval_context(question, "\n".join(lines))}]
+
+    def _add_assistant_message(self, response: Dict)-> str:
+        assistant_message=response['message']['content']
+
+        if not assistant_message:
+            raise ValueError(f"Failed to receive assistant message in chatbot class")
+        self.memory.add({"role": "assistant", "content": assistant_message})
+
+        return assistant_message
 
     def chat(self, user_input: str)-> str:
         """
@@ -23,42 +110,102 @@ class ChatBot:
         Output:
             string: LLM Response
         """
-        self.messages.append({"role": "user", "content": user_input})
-
-        if len(self.messages)>10:
-            system_msgs=[msg for msg in self.messages if msg["role"]=="system"]
-            recent_messages=self.messages[-10:]
-            self.messages=system_msgs+recent_messages
+        answer=self._route(user_input)
+        if answer is not None:
+            return answer
+        self.last_source="llm"
+        self._add_user_message(user_input)
 
         try:
-            response=ollama.chat(
-                model=self.model,
-                messages=self.messages
-            )
+            messages=self._request_messages()
+            response=self.llm.post("/api/chat", {"model": self.model, "messages": messages}, priority=CHAT)
+            self._record_prompt_tokens(response, messages)
+            return self._add_assistant_message(response)
+        
+        except Exception as e:
+            self.memory.pop()
+            raise CustomException(f"Failed to query llm for chat", e)
 
-            assistant_message=response['message']['content']
+    async def achat(self, user_input: str)-> str:
+        """
+        Async version of chat, for use from the event loop without blocking it
+        """
+        answer=self._route(user_input)
+        if answer is not None:
+            return answer
+        self.last_source="llm"
+        self._add_user_message(user_input)
+
+        try:
+            messages=self._request_messages()
+            response=await self.llm.apost("/api/chat", {"model": self.model, "messages": messages}, priority=CHAT)
+            self._record_prompt_tokens(response, messages)
+            return self._add_assistant_message(response)
 
-            if not assistant_message:
-                raise ValueError(f"Failed to receive assistant message in chatbot class")
-            self.messages.append({"role": "assistant", "content": assistant_message})
+        except asyncio.CancelledError:
+            # the client went away while the question was queued or answered
+            self.memory.pop()
+            raise
 
-            return assistant_message
-        
         except Exception as e:
-            self.messages.pop()
+            self.memory.pop()
             raise CustomException(f"Failed to query llm for chat", e)
             
+    async def astream_chat(self, user_input: str)-> AsyncIterator[str]:
+        """
+        Stream the response to a message piece by piece
+
+        Chat history is updated once the stream ends: with the full answer when it completes, with the
+        partial answer if the consumer stops early (e.g. the client disconnected), and the question is
+        dropped again if no answer was received at all.
+
+        Args:
+            user_input: user's question
+
+        Output:
+            async generator: pieces of the LLM response
+        """
+        answer=self._route(user_input)
+        if answer is not None:
+            yield answer
+            return
+        self.last_source="llm"
+        self._add_user_message(user_input)
+        pieces=[]
+
+        try:
+            messages=self._request_messages()
+            async for chunk in self.llm.astream("/api/chat", {"model": self.model, "messages": messages},
+                                                priority=CHAT):
+                if chunk.get("done"):
+                    self._record_prompt_tokens(chunk, messages)
+                piece=chunk.get("message", {}).get("content")
+                if piece:
+                    pieces.append(piece)
+                    yield piece
+
+        except Exception as e:
+            if not pieces:
+                raise CustomException(f"Failed to query llm for chat", e)
+            raise
+
+        finally:
+            if pieces:
+                self.memory.add({"role": "assistant", "content": "".join(pieces)})
+            elif len(self.memory) and self.memory.turns[-1]["role"]=="user":
+                self.memory.pop()
+
     def clear_conversation(self):
         """
         clear conversation memory without removing system prompt
         """
-        self.messages=[msg for msg in self.messages if msg["role"]=="system"]
+        self.memory.clear()
 
     def get_conversation_history(self, system_prompt: str):
         """
         Get current conversation history
         """
-        return self.messages.copy()
+        return self.messages
     
     def set_system_prompt(self, system_prompt: str):
         """
@@ -66,6 +213,12 @@ class ChatBot:
         """
         self.clear_conversation()
         if system_prompt:
-            self.messages.insert(0, {"role": "system", "content": system_prompt})
+            self.memory.system_prompt=system_prompt
 
-            
\ No newline at end of file
+    def update_system_prompt(self, system_prompt: str):
+        """
+        Replace the system prompt, e.g. after the analysis was updated, keeping the conversation
+        """
+        if not system_prompt:
+            raise ValueError("No system prompt received in chatbot class")
+        self.memory.system_prompt=system_prompt
@@ -0,0 +1,115 @@
+#src/config.py
+import os
+
+# Ollama server and model used for every LLM call
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b-instruct-q4_K_M")
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "8192"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "600"))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+OLLAMA_MAX_RETRIES = int(os.getenv("OLLAMA_MAX_RETRIES", "2"))
+OLLAMA_RETRY_BACKOFF = float(os.getenv("OLLAMA_RETRY_BACKOFF", "0.5"))
+# How long Ollama keeps the model loaded after a call ("30m", seconds, or -1 for ever), and whether the backend loads it at startup
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") == "1"
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+# Map-reduce log analysis
+ANALYSIS_CHUNK_TOKENS = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "6000"))
+ANALYSIS_MAX_CONCURRENCY = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "2"))
+ANALYSIS_REDUCE_STRATEGY = os.getenv("ANALYSIS_REDUCE_STRATEGY", "llm")
+
+# Statistical summary sent to the LLM instead of raw lines
+ANALYSIS_SUMMARIZE = os.getenv("ANALYSIS_SUMMARIZE", "1") == "1"
+SUMMARY_TOP_N = int(os.getenv("SUMMARY_TOP_N", "10"))
+SUMMARY_SAMPLE_SIZE = int(os.getenv("SUMMARY_SAMPLE_SIZE", "50"))
+
+# Rule-based anomaly prefilter run before the LLM anomaly pass
+ANOMALY_PREFILTER = os.getenv("ANOMALY_PREFILTER", "1") == "1"
+ANOMALY_ZSCORE_THRESHOLD = float(os.getenv("ANOMALY_ZSCORE_THRESHOLD", "4.0"))
+ANOMALY_MIN_SPIKE_COUNT = int(os.getenv("ANOMALY_MIN_SPIKE_COUNT", "5"))
+ANOMALY_BRUTE_FORCE_THRESHOLD = int(os.getenv("ANOMALY_BRUTE_FORCE_THRESHOLD", "5"))
+ANOMALY_BRUTE_FORCE_WINDOW = os.getenv("ANOMALY_BRUTE_FORCE_WINDOW", "5min")
+ANOMALY_RARE_EVENT_SHARE = float(os.getenv("ANOMALY_RARE_EVENT_SHARE", "0.005"))
+ANOMALY_BUSINESS_HOURS = (int(os.getenv("ANOMALY_BUSINESS_START", "8")), int(os.getenv("ANOMALY_BUSINESS_END", "20")))
+ANOMALY_MAX_ESCALATED_LINES = int(os.getenv("ANOMALY_MAX_ESCALATED_LINES", "200"))
+
+# Content-addressed cache of analysis results and prompt completions
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "llm_cache.sqlite"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Background analysis jobs in the backend
+JOBS_MAX_WORKERS = int(os.getenv("JOBS_MAX_WORKERS", "2"))
+JOBS_MAX_HISTORY = int(os.getenv("JOBS_MAX_HISTORY", "1000"))
+JOBS_MAX_HISTORY_BYTES = int(os.getenv("JOBS_MAX_HISTORY_BYTES", str(64 * 1024 * 1024)))
+
+# Per-session analyses and chatbots in the backend
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "3600"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Retrieval-augmented chat over an in-process index of the uploaded logs
+CHAT_RETRIEVAL_TOP_K = int(os.getenv("CHAT_RETRIEVAL_TOP_K", "20"))
+CHAT_ANALYSIS_TOKENS = int(os.getenv("CHAT_ANALYSIS_TOKENS", "800"))
+LOG_INDEX_MAX_LINES = int(os.getenv("LOG_INDEX_MAX_LINES", "2000000"))
+
+# Token-budgeted chat history; older turns are folded into a running summary
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "3000"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "500"))
+CHAT_SUMMARY_NOTE_TOKENS = int(os.getenv("CHAT_SUMMARY_NOTE_TOKENS", "40"))
+# share of CHAT_HISTORY_TOKENS kept when it is exceeded; evicting in blocks keeps the prompt prefix stable across turns
+CHAT_HISTORY_EVICT_TO = float(os.getenv("CHAT_HISTORY_EVICT_TO", "0.5"))
+
+# Columnar on-disk store of normalized events, one directory per upload
+EVENT_STORE_PATH = os.getenv("EVENT_STORE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "events"))
+EVENT_STORE_MAX_BYTES = int(os.getenv("EVENT_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+# Explicit count and top-N chat questions ("how many", "top 5 ... by") answered from an indexed event table instead of the LLM
+CHAT_QUERY_ROUTER = os.getenv("CHAT_QUERY_ROUTER", "1") == "1"
+QUERY_MAX_LIMIT = int(os.getenv("QUERY_MAX_LIMIT", "1000"))
+
+# Logs appended to a session (live tailing): the LLM only sees new rows, once enough have arrived
+LIVE_ANALYSIS_MIN_ROWS = int(os.getenv("LIVE_ANALYSIS_MIN_ROWS", "1000"))
+LIVE_ANOMALY_HISTORY_TOKENS = int(os.getenv("LIVE_ANOMALY_HISTORY_TOKENS", "800"))
+LIVE_TAIL_INTERVAL = float(os.getenv("LIVE_TAIL_INTERVAL", "2"))
+LIVE_TAIL_MAX_BATCH_BYTES = int(os.getenv("LIVE_TAIL_MAX_BATCH_BYTES", str(8 * 1024 * 1024)))
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+
+# Command-line batch analysis of a directory (python -m src.batch_analysis)
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", str(OLLAMA_MAX_CONCURRENCY)))
+
+# Uploads are spooled to disk in pieces and decompressed (gzip, zstd) on the fly; the request body is
+# checked against UPLOAD_MAX_BYTES before it is parsed, the decompressed size while it is inflated
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(4 * 1024 * 1024 * 1024)))
+UPLOAD_MAX_DECOMPRESSED_BYTES = int(os.getenv("UPLOAD_MAX_DECOMPRESSED_BYTES", str(16 * 1024 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# Prometheus-style /metrics and per-job stage timings; cProfile of single requests sent with X-Profile: 1
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "profiles"))
+
+# Drain-style template mining: repeated log lines reach the LLM as "count x template | variable ranges"
+LOG_TEMPLATES = os.getenv("LOG_TEMPLATES", "1") == "1"
+LOG_TEMPLATE_DEPTH = int(os.getenv("LOG_TEMPLATE_DEPTH", "4"))
+LOG_TEMPLATE_SIMILARITY = float(os.getenv("LOG_TEMPLATE_SIMILARITY", "0.5"))
+LOG_TEMPLATE_MAX_TEMPLATES = int(os.getenv("LOG_TEMPLATE_MAX_TEMPLATES", "5000"))
+LOG_TEMPLATE_TOP_N = int(os.getenv("LOG_TEMPLATE_TOP_N", "10"))
+
+# IP enrichment: internal vs external addresses, asset-inventory subnets and local blocklists, in the analysis and anomaly findings
+IP_ENRICHMENT = os.getenv("IP_ENRICHMENT", "1") == "1"
+IP_INTERNAL_NETWORKS = tuple(filter(None, os.getenv("IP_INTERNAL_NETWORKS", "10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,127.0.0.0/8,169.254.0.0/16").split(",")))
+IP_ASSET_INVENTORY_PATHS = tuple(filter(None, os.getenv("IP_ASSET_INVENTORY_PATHS", "").split(",")))
+IP_BLOCKLIST_PATHS = tuple(filter(None, os.getenv("IP_BLOCKLIST_PATHS", "").split(",")))
+IP_BLOCKLIST_MAX_FINDINGS = int(os.getenv("IP_BLOCKLIST_MAX_FINDINGS", "50"))
+
+# Streamlit frontend: pooled backend connections, cached health probes and analysis results
+FRONTEND_POOL_SIZE = int(os.getenv("FRONTEND_POOL_SIZE", "32"))
+FRONTEND_REQUEST_TIMEOUT = float(os.getenv("FRONTEND_REQUEST_TIMEOUT", "30"))
+HEALTH_CHECK_TTL = float(os.getenv("HEALTH_CHECK_TTL", "15"))
+
+# LLM calls queue for OLLAMA_MAX_CONCURRENCY slots: chat first, then anomaly passes, then bulk analysis; 0 is first come, first served
+LLM_PRIORITY_SCHEDULING = os.getenv("LLM_PRIORITY_SCHEDULING", "1") == "1"
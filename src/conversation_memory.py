@@ -0,0 +1,104 @@
+#src/conversation_memory.py
+from src.tokens import CHARS_PER_TOKEN, estimate_tokens, truncate_to_tokens
+from src import config
+from typing import Callable, Dict, List, Optional
+from prompt_templates.templates import conversation_summary
+
+def extractive_summarizer(summary: str, evicted: List[Dict])-> str:
+    """
+    Fold evicted turns into the running summary without a model call, keeping the start of each message
+    """
+    notes=[
+        f"{'User asked' if message['role']=='user' else 'Assistant answered'}: "
+        f"{truncate_to_tokens(' '.join(message['content'].split()), config.CHAT_SUMMARY_NOTE_TOKENS)}"
+        for message in evicted
+    ]
+    return "\n".join(filter(None, [summary]+notes))
+
+class ConversationMemory:
+    """
+    Token-budgeted chat history
+
+    The system prompt stays pinned. When the turns exceed the token budget, the oldest ones are
+    evicted and folded into a compact running summary, which is itself capped in size. Eviction
+    goes down to a fraction of the budget at once, so the system prompt, summary and older turns
+    are sent unchanged for the next several turns and the model server can reuse their cached
+    prompt evaluation, instead of the summary changing on every turn.
+    """
+
+    def __init__(self, system_prompt: str, token_budget: Optional[int]=None, summary_budget: Optional[int]=None,
+                 summarizer: Optional[Callable[[str, List[Dict]], str]]=None, evict_to: Optional[float]=None):
+        """
+        Args:
+            system_prompt: pinned first message
+            token_budget: estimated tokens allowed for the turns after the system prompt and summary
+            summary_budget: estimated tokens allowed for the running summary
+            summarizer: summarizer(summary, evicted_messages) -> new summary, extractive by default
+            evict_to: share of the token budget kept once it is exceeded, between 0 and 1
+        """
+        self.system_prompt=system_prompt
+        self.token_budget=token_budget or config.CHAT_HISTORY_TOKENS
+        self.evict_to=config.CHAT_HISTORY_EVICT_TO if evict_to is None else evict_to
+        if not 0<=self.evict_to<=1:
+            raise ValueError(f"evict_to must be between 0 and 1, got {self.evict_to}")
+        self.summary_budget=summary_budget or config.CHAT_SUMMARY_TOKENS
+        self.summarizer=summarizer or extractive_summarizer
+        self.summary=""
+        self.turns=[]
+        self._turn_tokens=[]
+
+    def __len__(self):
+        return len(self.turns)
+
+    @property
+    def turn_tokens(self)-> int:
+        return sum(self._turn_tokens)
+
+    def add(self, message: Dict):
+        """
+        Append a message and evict the oldest turns beyond the token budget
+        """
+        self.turns.append(message)
+        self._turn_tokens.append(estimate_tokens(message["content"]))
+        self._evict()
+
+    def pop(self)-> Dict:
+        self._turn_tokens.pop()
+        return self.turns.pop()
+
+    def _evict(self):
+        if self.turn_tokens<=self.token_budget:
+            return
+        evicted=[]
+        # always keep the latest message, even if it alone exceeds the budget
+        while len(self.turns)>1 and self.turn_tokens>self.token_budget*self.evict_to:
+            evicted.append(self.turns.pop(0))
+            self._turn_tokens.pop(0)
+        # never start the kept history with an orphaned assistant answer
+        while len(self.turns)>1 and self.turns[0]["role"]=="assistant":
+            evicted.append(self.turns.pop(0))
+            self._turn_tokens.pop(0)
+        if evicted:
+            summary=self.summarizer(self.summary, evicted)
+            if estimate_tokens(summary)>self.summary_budget:
+                # drop the oldest notes first, cutting at a line boundary where possible
+                summary=summary[-self.summary_budget*CHARS_PER_TOKEN:]
+                summary=summary.split("\n", 1)[-1] if "\n" in summary else summary
+            self.summary=summary
+
+    def messages(self)-> List[Dict]:
+        """
+        Messages to send: pinned system prompt, running summary, then the kept turns
+        """
+        messages=[{"role": "system", "content": self.system_prompt}]
+        if self.summary:
+            messages.append({"role": "system", "content": conversation_summary(self.summary)})
+        return messages+self.turns
+
+    def clear(self):
+        """
+        Forget turns and summary, keeping the system prompt
+        """
+        self.summary=""
+        self.turns=[]
+        self._turn_tokens=[]
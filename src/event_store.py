@@ -0,0 +1,489 @@
+#src/event_store.py
+from src import config
+from src import metrics
+from src.cache import make_key
+from src.ip_utils import ipv4_to_int, int_to_ipv4
+from src.log_parsers import EVENT_COLUMNS, LogParser
+from src.timestamps import parse_timestamps, SYSLOG_TIMESTAMP_FORMAT
+import glob
+import json
+import os
+import shutil
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+
+CATEGORICAL_COLUMNS = ("log_type", "event_type", "severity", "host", "user")
+IP_COLUMNS = ("source_ip", "destination_ip")
+# typed column -> column keeping the original text of the values the type cannot hold
+TEXT_COLUMNS = {"timestamp": "timestamp_text", "source_ip": "source_ip_text", "destination_ip": "destination_ip_text"}
+TEXT_SOURCES = {text: column for column, text in TEXT_COLUMNS.items()}
+MANIFEST_NAME = "manifest.json"
+UNKNOWN_DAY = "unknown"
+
+def event_schema(extras=()):
+    """
+    Arrow schema of stored events: typed timestamps, IPv4 addresses as integers, dictionary-encoded
+    low-cardinality columns, the original text of typed values that do not fit their type, then the
+    format-specific extra columns
+
+    Args:
+        extras: (name, arrow type) pairs of extra columns
+    """
+    fields = [pa.field("timestamp", pa.timestamp("ms"))]
+    for column in EVENT_COLUMNS[1:]:
+        if column in CATEGORICAL_COLUMNS:
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        elif column in IP_COLUMNS:
+            fields.append(pa.field(column, pa.uint32()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    fields += [pa.field(name, pa.string()) for name in TEXT_COLUMNS.values()]
+    return pa.schema(fields + [pa.field(name, type) for name, type in extras])
+
+def extra_columns(schema):
+    """
+    Names of the format-specific extra columns of a stored schema
+    """
+    return [name for name in schema.names if name not in EVENT_COLUMNS and name not in TEXT_COLUMNS.values()]
+
+def infer_extra_type(values):
+    """
+    Arrow type of an extra column from its non-null values: integers and floats stay numeric, anything
+    else, and a column without any value yet, is stored as text
+    """
+    numbers = values.dropna()
+    if not len(numbers) or pd.api.types.is_bool_dtype(numbers):
+        return pa.string()
+    if not pd.api.types.is_numeric_dtype(numbers):
+        if pd.api.types.infer_dtype(numbers, skipna=True) not in ("integer", "floating", "mixed-integer-float"):
+            return pa.string()
+        numbers = numbers.astype("float64")
+    return pa.int64() if (numbers == numbers.round()).all() else pa.float64()
+
+def widen_schema(schema, chunk):
+    """
+    The schema with every numeric extra column widened to hold the chunk's values: integers to floats
+    when fractions appear, numbers to text when anything else does. Columns without values in the
+    chunk keep their type.
+    """
+    for name in extra_columns(schema):
+        stored = schema.field(name).type
+        if pa.types.is_string(stored) or name not in chunk.columns or not chunk[name].notna().any():
+            continue
+        seen = infer_extra_type(chunk[name])
+        if pa.types.is_string(seen):
+            wider = pa.string()
+        elif pa.types.is_floating(seen) and pa.types.is_integer(stored):
+            wider = pa.float64()
+        else:
+            continue
+        schema = schema.set(schema.get_field_index(name), pa.field(name, wider))
+    return schema
+
+def fallback_text(original, typed_missing):
+    """
+    Original text of the values that did not fit their typed column, null everywhere else
+    """
+    text = pd.Series(pd.NA, index=original.index, dtype="string")
+    mask = typed_missing & original.notna()
+    if mask.any():
+        values = original[mask].astype(str).str.strip()
+        text[values[values != ""].index] = values[values != ""]
+    return pa.array(text, type=pa.string(), from_pandas=True)
+
+def to_arrow(chunk, schema):
+    """
+    Convert a normalized event chunk to an Arrow table of the given schema
+
+    Values that do not fit their column type are stored as nulls: for timestamps and addresses (IPv6,
+    hostnames) the original text is kept in the matching TEXT_COLUMNS column and read back by
+    to_events, numbers in text extra columns are stored as text.
+    """
+    timestamps = parse_timestamps(chunk["timestamp"])
+    if getattr(timestamps.dt, "tz", None) is not None:
+        timestamps = timestamps.dt.tz_convert(None)
+
+    typed = {}
+    arrays = []
+    for field in schema:
+        values = timestamps if field.name == "timestamp" else chunk.get(field.name)
+        if field.name in TEXT_SOURCES:
+            source = TEXT_SOURCES[field.name]
+            array = fallback_text(chunk[source], typed[source].is_null().to_pandas().set_axis(chunk.index))
+        elif field.name == "timestamp":
+            array = pa.array(values.astype("datetime64[ms]"), type=field.type, from_pandas=True)
+        elif field.name in IP_COLUMNS:
+            array = pa.array(ipv4_to_int(values), type=field.type)
+        elif pa.types.is_dictionary(field.type):
+            array = pa.array(values.astype("string"), type=pa.string(), from_pandas=True).dictionary_encode()
+        elif pa.types.is_integer(field.type):
+            array = pa.array(pd.to_numeric(values, errors="coerce").round().astype("Int64"), type=field.type)
+        elif pa.types.is_floating(field.type):
+            array = pa.array(pd.to_numeric(values, errors="coerce"), type=field.type, from_pandas=True)
+        else:
+            array = pa.array(values.astype("string"), type=field.type, from_pandas=True)
+        typed[field.name] = array
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def to_events(table):
+    """
+    Convert a stored Arrow table back to a normalized event chunk, IPs as dotted strings again
+    """
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if name in IP_COLUMNS:
+            columns[name] = int_to_ipv4(column.to_pandas())
+        elif pa.types.is_dictionary(column.type):
+            columns[name] = column.cast(pa.string()).to_pandas()
+        elif pa.types.is_integer(column.type):
+            columns[name] = column.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+        else:
+            columns[name] = column.to_pandas()
+
+    timestamps = columns.get("timestamp")
+    if timestamps is not None and len(timestamps.dropna()) and (timestamps.dropna().dt.year == 1900).all():
+        # year-less syslog timestamps are rendered the way they were logged
+        columns["timestamp"] = timestamps.dt.strftime(SYSLOG_TIMESTAMP_FORMAT)
+
+    # values the typed columns could not hold come back as their original text
+    for name, text_name in TEXT_COLUMNS.items():
+        text = columns.pop(text_name, None)
+        if text is None or name not in columns or not text.notna().any():
+            continue
+        typed = pd.Series(columns[name])
+        if pd.api.types.is_datetime64_any_dtype(typed):
+            typed = typed.astype(str).where(typed.notna(), None)
+        columns[name] = typed.where(typed.notna(), text).to_numpy(dtype=object)
+    return pd.DataFrame(columns)
+
+def chunk_days(table):
+    """
+    Day partition of every row of a table, "unknown" for rows without a timestamp
+    """
+    days = table.column("timestamp").to_pandas().dt.strftime("%Y-%m-%d")
+    return days.fillna(UNKNOWN_DAY)
+
+def write_table(path, table):
+    """
+    Write an uncompressed Arrow IPC file, atomically so readers never see a partial part
+    """
+    temp_path = path + ".tmp"
+    with pa.OSFile(temp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp_path, path)
+
+class EventStore:
+    """
+    Normalized events of every upload, stored as Arrow IPC files partitioned by upload and day
+
+    Layout: {root}/{upload_id}/day={YYYY-MM-DD}/part-{n}.arrow plus a manifest.json per upload.
+    Files are uncompressed so reads are memory-mapped and zero-copy, and column projections only
+    touch the pages of the selected columns.
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        """
+        Args:
+            root: directory holding the uploads
+            max_bytes: total size above which the oldest uploads are deleted
+        """
+        self.root = root or config.EVENT_STORE_PATH
+        self.max_bytes = max_bytes or config.EVENT_STORE_MAX_BYTES
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        # upload_id -> (bytes, rows), oldest upload first, so stats and pruning do not walk the disk
+        self._sizes = {
+            manifest["upload_id"]: (self.size_bytes(manifest["upload_id"]), manifest["rows"])
+            for manifest in self.uploads()
+        }
+
+    def path(self, upload_id):
+        return os.path.join(self.root, upload_id)
+
+    def _write_chunks(self, upload_id, chunks, schema=None, first_part=0):
+        """
+        Write normalized event chunks as day-partitioned part files, numbered from first_part
+
+        Extra columns are typed from the first chunk's values and widened when a later chunk does
+        not fit; part files written before keep their type and are cast on read, see iter_tables.
+
+        Output:
+            tuple: (schema, rows written, rows per day, parts written)
+        """
+        directory = self.path(upload_id)
+        os.makedirs(directory, exist_ok=True)
+        rows = 0
+        days = {}
+        part = first_part
+        for chunk in chunks:
+            if schema is None:
+                extras = [name for name in chunk.columns if name not in EVENT_COLUMNS]
+                schema = event_schema([(name, infer_extra_type(chunk[name])) for name in extras])
+            else:
+                schema = widen_schema(schema, chunk)
+            chunk = chunk.reindex(columns=schema.names)
+            table = to_arrow(chunk, schema)
+            row_days = chunk_days(table)
+            for day, indices in row_days.groupby(row_days).indices.items():
+                day_dir = os.path.join(directory, f"day={day}")
+                os.makedirs(day_dir, exist_ok=True)
+                write_table(os.path.join(day_dir, f"part-{part:05d}.arrow"), table.take(indices))
+                days[day] = days.get(day, 0) + len(indices)
+            rows += len(chunk)
+            part += 1
+        return schema, rows, days, part - first_part
+
+    def _save_manifest(self, manifest):
+        upload_id = manifest["upload_id"]
+        path = os.path.join(self.path(upload_id), MANIFEST_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self._sizes.pop(upload_id, None)
+            self._sizes[upload_id] = (self.size_bytes(upload_id), manifest["rows"])
+
+    def ingest(self, file_path, parser, upload_id, chunksize=50_000):
+        """
+        Parse a log file once and store its normalized events
+
+        Args:
+            file_path: uploaded log file
+            parser: LogParser of the file
+            upload_id: id of the upload, e.g. the analysis job id
+            chunksize: events parsed and written per chunk
+
+        Output:
+            dict: manifest of the upload
+        """
+        with metrics.span("store_events") as span:
+            chunks = metrics.timed_chunks("parse", parser.iter_chunks(file_path, chunksize))
+            schema, rows, days, parts = self._write_chunks(upload_id, chunks)
+            span.rows = rows
+        manifest = {
+            "upload_id": upload_id,
+            "format": parser.name,
+            "source_digest": parser.digest(file_path),
+            "rows": rows,
+            "days": dict(sorted(days.items())),
+            "parts": parts,
+            "batches": 0,
+            "schema": schema.serialize().to_pybytes().hex() if schema is not None else None,
+            "created_at": time.time(),
+        }
+        self._save_manifest(manifest)
+        self.prune(keep=upload_id)
+        return manifest
+
+    def append(self, upload_id, chunks, digest):
+        """
+        Add a batch of normalized events to a stored upload, e.g. new lines of a tailed log
+
+        Only the batch is converted and written, as new part files after the existing ones; columns
+        missing from the upload's schema are dropped and extra columns are widened as in _write_chunks. Appends to one upload must not run concurrently.
+
+        Args:
+            upload_id: stored upload to extend
+            chunks: normalized event chunks of the batch
+            digest: content hash of the batch, folded into the upload's source digest
+
+        Output:
+            dict: updated manifest of the upload
+        """
+        manifest = self.manifest(upload_id)
+        if manifest is None:
+            raise FileNotFoundError(f"No stored upload {upload_id}")
+        stored_schema = self.schema(upload_id) if manifest["schema"] else None
+        first_part = manifest.get("parts", len(self.parts(upload_id)))
+        with metrics.span("store_events") as span:
+            schema, rows, days, parts = self._write_chunks(upload_id, chunks, stored_schema, first_part)
+            span.rows = rows
+
+        for day, count in days.items():
+            manifest["days"][day] = manifest["days"].get(day, 0) + count
+        manifest.update({
+            "source_digest": make_key(manifest["source_digest"], digest),
+            "rows": manifest["rows"] + rows,
+            "days": dict(sorted(manifest["days"].items())),
+            "parts": first_part + parts,
+            "batches": manifest.get("batches", 0) + 1,
+            "schema": schema.serialize().to_pybytes().hex() if schema is not None else None,
+            "appended_at": time.time(),
+        })
+        self._save_manifest(manifest)
+        self.prune(keep=upload_id)
+        return manifest
+
+    def manifest(self, upload_id):
+        """
+        Manifest of a stored upload, or None if it is not (or no longer) stored
+        """
+        try:
+            with open(os.path.join(self.path(upload_id), MANIFEST_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def schema(self, upload_id):
+        manifest = self.manifest(upload_id)
+        if not manifest or not manifest["schema"]:
+            return event_schema()
+        return pa.ipc.read_schema(pa.py_buffer(bytes.fromhex(manifest["schema"])))
+
+    def parts(self, upload_id, days=None):
+        """
+        Part files of an upload in ingestion order, optionally restricted to some days
+        """
+        paths = glob.glob(os.path.join(self.path(upload_id), "day=*", "part-*.arrow"))
+        if days is not None:
+            wanted = {f"day={day}" for day in days}
+            paths = [path for path in paths if os.path.basename(os.path.dirname(path)) in wanted]
+        return sorted(paths, key=lambda path: (os.path.basename(path), path))
+
+    def iter_tables(self, upload_id, columns=None, days=None):
+        """
+        Memory-mapped Arrow tables of the upload's part files
+
+        Parts written before an extra column was widened are cast to the upload's current schema.
+
+        Args:
+            columns: columns to read, all when omitted
+            days: "YYYY-MM-DD" partitions to read, all when omitted
+        """
+        schema = self.schema(upload_id)
+        for path in self.parts(upload_id, days):
+            table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+            table = table.select(columns) if columns else table
+            target = pa.schema([schema.field(name) for name in table.column_names])
+            yield table if table.schema.equals(target) else table.cast(target)
+
+    def read_table(self, upload_id, columns=None, days=None):
+        """
+        All selected events of an upload as one Arrow table over the memory-mapped files
+
+        Plain columns are zero-copy; dictionary columns get one shared dictionary across parts so the
+        table can be grouped and filtered directly.
+        """
+        tables = list(self.iter_tables(upload_id, columns, days))
+        if not tables:
+            schema = self.schema(upload_id)
+            return schema.empty_table().select(columns) if columns else schema.empty_table()
+        return pa.concat_tables(tables).unify_dictionaries()
+
+    def iter_chunks(self, upload_id, chunksize=50_000, columns=None, days=None):
+        """
+        Stream stored events as normalized DataFrames of about chunksize rows
+
+        Output:
+            generator: DataFrames in the layout produced by the log parsers
+        """
+        if columns:
+            stored = self.schema(upload_id).names
+            columns = list(columns) + [TEXT_COLUMNS[name] for name in columns
+                                       if name in TEXT_COLUMNS and TEXT_COLUMNS[name] in stored]
+        pending, pending_rows = [], 0
+        for table in self.iter_tables(upload_id, columns, days):
+            pending.append(table)
+            pending_rows += len(table)
+            if pending_rows >= chunksize:
+                yield to_events(pa.concat_tables(pending))
+                pending, pending_rows = [], 0
+        if pending_rows:
+            yield to_events(pa.concat_tables(pending))
+
+    def uploads(self):
+        """
+        Manifests of every stored upload, oldest first
+        """
+        manifests = []
+        for entry in os.listdir(self.root):
+            manifest = self.manifest(entry)
+            if manifest:
+                manifests.append(manifest)
+        return sorted(manifests, key=lambda manifest: manifest["created_at"])
+
+    def size_bytes(self, upload_id=None):
+        directories = [self.path(upload_id)] if upload_id else [self.path(entry) for entry in os.listdir(self.root)]
+        return sum(
+            os.path.getsize(os.path.join(dirpath, name))
+            for directory in directories for dirpath, _, names in os.walk(directory) for name in names
+        )
+
+    def delete(self, upload_id):
+        with self._lock:
+            self._sizes.pop(upload_id, None)
+        directory = self.path(upload_id)
+        if not os.path.isdir(directory):
+            return False
+        # files still memory-mapped by a reader cannot be removed on Windows; prune retries later
+        shutil.rmtree(directory, ignore_errors=True)
+        return True
+
+    def prune(self, keep=None):
+        """
+        Delete the oldest uploads until the store fits max_bytes, never deleting keep
+        """
+        with self._lock:
+            sizes = {upload_id: size for upload_id, (size, _) in self._sizes.items()}
+        total = sum(sizes.values())
+        for upload_id, size in sizes.items():
+            if total <= self.max_bytes:
+                break
+            if upload_id != keep:
+                self.delete(upload_id)
+                total -= size
+
+    def stats(self):
+        with self._lock:
+            sizes = list(self._sizes.values())
+        return {
+            "uploads": len(sizes),
+            "rows": sum(rows for _, rows in sizes),
+            "bytes": sum(size for size, _ in sizes),
+            "max_bytes": self.max_bytes,
+        }
+
+    def parser(self):
+        """
+        LogParser that reads stored uploads, for DocumentAnalysis(store.path(upload_id), parser=...)
+        """
+        return StoredEventsParser(self)
+
+class StoredEventsParser(LogParser):
+    """
+    Reads events back from the event store instead of parsing a file; file_path is the upload directory
+    """
+    name = "event_store"
+
+    def __init__(self, store):
+        self.store = store
+
+    def sniff(self, header, lines):
+        return False
+
+    def iter_chunks(self, file_path, chunksize):
+        yield from self.store.iter_chunks(os.path.basename(os.path.normpath(file_path)), chunksize)
+
+    def digest(self, file_path):
+        manifest = self.store.manifest(os.path.basename(os.path.normpath(file_path)))
+        if manifest is None:
+            raise FileNotFoundError(f"No stored events at {file_path}")
+        return manifest["source_digest"]
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+def get_event_store():
+    """
+    Process-wide EventStore configured from src/config.py
+    """
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = EventStore()
+        return _shared_store
@@ -0,0 +1,374 @@
+#src/event_table.py
+from src.event_store import CATEGORICAL_COLUMNS, IP_COLUMNS, event_schema, to_arrow
+from src.ip_utils import ipv4_to_int_scalar, int_to_ipv4
+from src import metrics
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+TIME_BUCKETS = {"minute": 60_000, "hour": 3_600_000, "day": 86_400_000}
+MISSING_TIME = np.iinfo(np.int64).min
+
+class EventTable:
+    """
+    In-memory, indexed table of events for structured count/filter/group-by queries
+
+    Low-cardinality columns (severity, user, event type...) are held as dictionary codes with a
+    posting list per value; IPs and timestamps are held as integers with a sorted index, which
+    also serves CIDR and time range lookups. Indexes are built on first use of a column.
+    """
+    COLUMNS = ("timestamp",) + CATEGORICAL_COLUMNS + IP_COLUMNS
+
+    def __init__(self, codes, categories, ips, timestamps):
+        """
+        Args:
+            codes: column -> int32 array of dictionary codes, -1 where missing
+            categories: column -> array of the dictionary values
+            ips: column -> uint32 array of IPv4 addresses, 0 where missing
+            timestamps: int64 array of epoch milliseconds, MISSING_TIME where missing
+        """
+        self.codes = codes
+        self.categories = categories
+        self.ips = ips
+        self.timestamps = timestamps
+        self._postings = {}
+        self._sorted = {}
+        self._buffers = {}
+        # append() runs on a job thread while chat requests query the table: both hold the lock,
+        # reentrant as queries build indexes under it
+        self._lock = threading.RLock()
+        self._lookup = {
+            column: {str(value).lower(): code for code, value in enumerate(values)}
+            for column, values in categories.items()
+        }
+
+    @classmethod
+    def from_arrow(cls, table):
+        """
+        Build the table from an Arrow table in the event store schema
+        """
+        codes, categories, ips = {}, {}, {}
+        for column in CATEGORICAL_COLUMNS:
+            if column not in table.column_names:
+                continue
+            array = table.column(column).combine_chunks() if table.num_rows else pa.array([], pa.dictionary(pa.int32(), pa.string()))
+            if not pa.types.is_dictionary(array.type):
+                array = array.dictionary_encode()
+            codes[column] = pc.fill_null(array.indices, -1).to_numpy().astype(np.int32)
+            categories[column] = np.asarray(array.dictionary.to_pylist(), dtype=object)
+        for column in IP_COLUMNS:
+            if column in table.column_names:
+                ips[column] = pc.fill_null(table.column(column), 0).to_numpy().astype(np.uint32)
+        if "timestamp" in table.column_names:
+            timestamps = pc.fill_null(table.column("timestamp").cast(pa.int64()), MISSING_TIME).to_numpy()
+        else:
+            timestamps = np.full(table.num_rows, MISSING_TIME, dtype=np.int64)
+        return cls(codes, categories, ips, timestamps)
+
+    @classmethod
+    def from_store(cls, store, upload_id):
+        """
+        Build the table from a stored upload, reading only the indexed columns
+        """
+        with metrics.span("build_event_table") as span:
+            schema = store.schema(upload_id)
+            columns = [column for column in cls.COLUMNS if column in schema.names]
+            table = cls.from_arrow(store.read_table(upload_id, columns=columns))
+            span.rows = len(table)
+        return table
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Build the table from a normalized event DataFrame
+        """
+        schema = event_schema()
+        return cls.from_arrow(to_arrow(df.reindex(columns=schema.names), schema))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def _extend(self, key, current, values):
+        """
+        current followed by values, written into a buffer that grows geometrically so appends
+        cost amortized time proportional to the new values only
+        """
+        buffer = self._buffers.get(key)
+        size = len(current) + len(values)
+        if buffer is None or len(buffer) < size:
+            buffer = np.empty(max(2 * size, 1024), dtype=current.dtype)
+            buffer[:len(current)] = current
+            self._buffers[key] = buffer
+        buffer[len(current):size] = values
+        return buffer[:size]
+
+    def append(self, other):
+        """
+        Add the events of another EventTable, e.g. a batch appended to a tailed log
+
+        Dictionary codes of the batch are remapped onto this table's dictionaries. Indexes are
+        dropped and rebuilt by the next query that needs them.
+        """
+        with self._lock:
+            rows = len(self)
+            for column in set(self.codes) | set(other.codes):
+                values = self.categories.get(column, np.empty(0, dtype=object))
+                other_values = other.categories.get(column, np.empty(0, dtype=object))
+                other_codes = other.codes.get(column, np.full(len(other), -1, dtype=np.int32))
+                positions = {value: code for code, value in enumerate(values)}
+                # the trailing -1 maps missing values (code -1) to missing
+                remap = np.full(len(other_values) + 1, -1, dtype=np.int32)
+                added = []
+                for i, value in enumerate(other_values):
+                    if value not in positions:
+                        positions[value] = len(values) + len(added)
+                        added.append(value)
+                        self._lookup.setdefault(column, {}).setdefault(str(value).lower(), positions[value])
+                    remap[i] = positions[value]
+                if added:
+                    self.categories[column] = np.concatenate([values, np.asarray(added, dtype=object)])
+                current = self.codes.get(column, np.full(rows, -1, dtype=np.int32))
+                self.codes[column] = self._extend(("codes", column), current, remap[other_codes])
+            for column in set(self.ips) | set(other.ips):
+                current = self.ips.get(column, np.zeros(rows, dtype=np.uint32))
+                self.ips[column] = self._extend(("ips", column), current, other.ips.get(column, np.zeros(len(other), dtype=np.uint32)))
+            self.timestamps = self._extend(("timestamps",), self.timestamps, other.timestamps)
+            self._postings.clear()
+            self._sorted.clear()
+
+    def size_bytes(self):
+        """
+        Approximate memory held by the columns and built indexes
+        """
+        with self._lock:
+            arrays = list(self.codes.values()) + list(self.ips.values()) + [self.timestamps]
+            arrays += [array for index in self._postings.values() for array in index]
+            arrays += [array for index in self._sorted.values() for array in index]
+            return sum(array.nbytes for array in arrays)
+
+    def _posting_index(self, column):
+        """
+        Row ids grouped by dictionary code: rows of code c are order[offsets[c]:offsets[c + 1]]
+        """
+        with self._lock:
+            if column not in self._postings:
+                codes = self.codes[column]
+                # a stable argsort of 16-bit keys is a radix sort, several times faster than on int32
+                keys = codes.astype(np.int16) if len(self.categories[column]) < np.iinfo(np.int16).max else codes
+                order = np.argsort(keys, kind="stable").astype(np.int64)
+                counts = np.bincount(codes + 1, minlength=len(self.categories[column]) + 1)
+                # code -1 (missing) sorts first and occupies the first counts[0] rows
+                self._postings[column] = (order, np.concatenate([[0], np.cumsum(counts)]))
+            return self._postings[column]
+
+    def _sorted_index(self, column):
+        """
+        Row ids ordered by value, with the sorted values, for equality and range lookups
+        """
+        with self._lock:
+            if column not in self._sorted:
+                values = self.timestamps if column == "timestamp" else self.ips[column]
+                order = np.argsort(values, kind="stable").astype(np.int64)
+                self._sorted[column] = (order, values[order])
+            return self._sorted[column]
+
+    def _column_values(self, column):
+        return self.timestamps if column == "timestamp" else self.ips[column]
+
+    def _range_bounds(self, column, low, high):
+        """
+        Positions in the sorted index of the values in [low, high)
+        """
+        order, values = self._sorted_index(column)
+        info = np.iinfo(values.dtype)
+        # search with the column's own dtype, a Python int would upcast the whole array first
+        bound = lambda value: 0 if value <= info.min else len(values) if value > info.max else \
+            int(np.searchsorted(values, values.dtype.type(value), "left"))
+        return order, bound(low), bound(high)
+
+    def _range_predicate(self, column, ranges):
+        """
+        Estimated size, row ids and row mask of the rows whose value lies in any of the [low, high) ranges
+        """
+        spans = [self._range_bounds(column, low, high) for low, high in ranges]
+
+        def rows():
+            parts = [order[start:end] for order, start, end in spans]
+            return np.unique(np.concatenate(parts)) if len(parts) > 1 else np.sort(parts[0])
+
+        def mask(selected):
+            values = self._column_values(column)[selected]
+            return np.logical_or.reduce([(values >= low) & (values < high) for low, high in ranges])
+
+        return sum(end - start for _, start, end in spans), rows, mask
+
+    def _category_predicate(self, column, values):
+        postings, offsets = self._posting_index(column)
+        lookup = self._lookup[column]
+        codes = sorted({lookup[str(value).lower()] for value in values if str(value).lower() in lookup})
+
+        def rows():
+            parts = [postings[offsets[code + 1]:offsets[code + 2]] for code in codes]
+            if len(parts) == 1:
+                return parts[0]
+            return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+        def mask(selected):
+            return np.isin(self.codes[column][selected], codes)
+
+        return sum(int(offsets[code + 2] - offsets[code + 1]) for code in codes), rows, mask
+
+    def _ip_ranges(self, column, values):
+        ranges = []
+        for value in values:
+            low, high = parse_ip_range(value)
+            if low is None:
+                raise ValueError(f"Invalid IPv4 address or CIDR block for {column}: {value!r}")
+            # 0 marks a missing address
+            ranges.append((max(low, 1), high))
+        return ranges
+
+    def select(self, filters=None, start=None, end=None):
+        """
+        Row ids matching every filter, in table order
+
+        Args:
+            filters: column -> value or list of values; values of categorical columns match
+                     case-insensitively, IP columns also accept CIDR blocks such as "10.0.0.0/8"
+            start: inclusive lower bound of the time range, anything pandas can parse
+            end: exclusive upper bound of the time range
+
+        Output:
+            NumPy array of row ids, or None when nothing restricts the rows
+        """
+        predicates = []
+        for column, values in (filters or {}).items():
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            if column in self.codes:
+                predicates.append(self._category_predicate(column, values))
+            elif column in self.ips:
+                predicates.append(self._range_predicate(column, self._ip_ranges(column, values)))
+            else:
+                raise ValueError(f"Unknown filter column '{column}', expected one of {self.filter_columns()}")
+        if start is not None or end is not None:
+            low = to_epoch_ms(start) if start is not None else MISSING_TIME + 1
+            high = to_epoch_ms(end) if end is not None else np.iinfo(np.int64).max
+            predicates.append(self._range_predicate("timestamp", [(low, high)]))
+        if not predicates:
+            return None
+
+        # materialize only the most selective filter from its index, then check the others
+        # directly on the few rows it leaves
+        predicates.sort(key=lambda predicate: predicate[0])
+        rows = predicates[0][1]()
+        for _, _, mask in predicates[1:]:
+            if not len(rows):
+                break
+            rows = rows[mask(rows)]
+        return rows
+
+    def filter_columns(self):
+        return sorted(self.codes) + sorted(self.ips)
+
+    def _decode(self, column, keys):
+        if column in self.codes:
+            # code -1 (missing) picks the trailing None
+            return np.append(self.categories[column], None)[keys]
+        if column in self.ips:
+            return np.where(keys > 0, int_to_ipv4(keys), None)
+        return pd.to_datetime(keys, unit="ms").astype(str).to_numpy()
+
+    def _group_keys(self, column, rows):
+        """
+        Group keys of the selected rows and the mask of rows that have a value
+        """
+        if column in self.codes:
+            keys = self.codes[column] if rows is None else self.codes[column][rows]
+            return keys, keys >= 0
+        if column in self.ips:
+            keys = self.ips[column] if rows is None else self.ips[column][rows]
+            return keys, keys > 0
+        if column in TIME_BUCKETS:
+            timestamps = self.timestamps if rows is None else self.timestamps[rows]
+            valid = timestamps != MISSING_TIME
+            return timestamps // TIME_BUCKETS[column] * TIME_BUCKETS[column], valid
+        raise ValueError(f"Unknown group_by column '{column}', expected one of {self.filter_columns() + list(TIME_BUCKETS)}")
+
+    def group_counts(self, group_by, rows=None, limit=10):
+        """
+        Largest groups of the selected rows as (values, count) pairs
+
+        Args:
+            group_by: columns (or "minute", "hour", "day" time buckets) to group on
+            rows: selected row ids, None for all rows
+            limit: number of groups returned
+        """
+        keys, valid = zip(*(self._group_keys(column, rows) for column in group_by))
+        valid = np.logical_and.reduce(valid)
+        if len(group_by) == 1 and group_by[0] in self.codes:
+            counts = np.bincount(keys[0][valid], minlength=len(self.categories[group_by[0]]))
+            top = np.argsort(-counts, kind="stable")[:limit]
+            top = top[counts[top] > 0]
+            return [((value,), int(count)) for value, count in zip(self._decode(group_by[0], top), counts[top])]
+
+        if len(group_by) == 1:
+            values, counts = np.unique(keys[0][valid], return_counts=True)
+            top = np.argsort(-counts, kind="stable")[:limit]
+            return [((value,), int(count)) for value, count in zip(self._decode(group_by[0], values[top]), counts[top])]
+
+        frame = pd.DataFrame({column: key[valid] for column, key in zip(group_by, keys)})
+        counts = frame.value_counts(sort=True).head(limit)
+        decoded = [self._decode(column, counts.index.get_level_values(i).to_numpy()) for i, column in enumerate(group_by)]
+        return [(tuple(values), int(count)) for values, count in zip(zip(*decoded), counts.to_numpy())]
+
+    def records(self, rows, limit=10):
+        """
+        The first matching events, decoded, as dicts
+        """
+        rows = np.arange(min(limit, len(self))) if rows is None else rows[:limit]
+        columns = {"timestamp": self._decode("timestamp", self.timestamps[rows])}
+        columns.update({column: self._decode(column, self.codes[column][rows]) for column in self.codes})
+        columns.update({column: self._decode(column, self.ips[column][rows]) for column in self.ips})
+        return [
+            {column: (None if value is None or value == "NaT" else value) for column, value in zip(columns, values)}
+            for values in zip(*columns.values())
+        ]
+
+    def query(self, filters=None, start=None, end=None, group_by=None, limit=10):
+        """
+        Count, group and list the events matching the filters
+
+        Output:
+            dict: count, groups (when group_by is given) and the first matching events
+        """
+        with self._lock:
+            rows = self.select(filters, start, end)
+            result = {"count": len(self) if rows is None else int(len(rows))}
+            if group_by:
+                result["groups"] = [
+                    {**dict(zip(group_by, values)), "count": count}
+                    for values, count in self.group_counts(list(group_by), rows, limit)
+                ]
+            else:
+                result["events"] = self.records(rows, limit)
+            return result
+
+def to_epoch_ms(value):
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(None)
+    return int(timestamp.value // 1_000_000)
+
+def parse_ip_range(value):
+    """
+    [low, high) integer range of an IPv4 address or CIDR block, (None, None) if invalid
+    """
+    address, _, prefix = str(value).strip().partition("/")
+    start = ipv4_to_int_scalar(address)
+    if start is None or (prefix and not (prefix.isdigit() and int(prefix) <= 32)):
+        return None, None
+    size = 1 << (32 - int(prefix)) if prefix else 1
+    start = start // size * size
+    return start, start + size
@@ -0,0 +1,264 @@
+#src/ip_enrichment.py
+from src import config
+from src.anomaly_detection import COUNT_ENTRY_BYTES, remember
+from src.cache import make_key
+from src.event_store import IP_COLUMNS
+from src.ip_utils import CIDRIndex, factorize_ipv4, int_to_ipv4, parse_ipv4, read_network_list
+from collections import Counter
+import os
+import threading
+import numpy as np
+
+INTERNAL = "internal"
+EXTERNAL = "external"
+DIRECTIONS = {
+    (EXTERNAL, INTERNAL): "inbound (external to internal)",
+    (INTERNAL, EXTERNAL): "outbound (internal to external)",
+    (INTERNAL, INTERNAL): "internal",
+    (EXTERNAL, EXTERNAL): "external",
+}
+
+def list_name(path):
+    """
+    Name of a blocklist in tags and findings: its file name without extension
+    """
+    return os.path.splitext(os.path.basename(path))[0]
+
+class IPTagger:
+    """
+    Internal networks, asset-inventory subnets and local blocklists, as CIDR indexes
+
+    An address is internal when it is in one of the internal networks or asset subnets, and external
+    otherwise. Tags of an address are "internal" or "external", "asset:<subnet label>" for the most
+    specific asset subnet holding it and "blocklist:<list name>" for every blocklist listing it.
+    """
+
+    def __init__(self, internal_networks=None, asset_paths=None, blocklist_paths=None):
+        """
+        Args:
+            internal_networks: CIDR networks of the organization, e.g. the private ranges
+            asset_paths: asset inventory files of "network, label" lines, see read_network_list
+            blocklist_paths: blocklist files of one address or network per line
+        """
+        internal_networks = config.IP_INTERNAL_NETWORKS if internal_networks is None else internal_networks
+        asset_paths = config.IP_ASSET_INVENTORY_PATHS if asset_paths is None else asset_paths
+        blocklist_paths = config.IP_BLOCKLIST_PATHS if blocklist_paths is None else blocklist_paths
+
+        asset_networks = [(network, label or list_name(path))
+                          for path in asset_paths for network, label in read_network_list(path)]
+        self.assets = CIDRIndex(asset_networks)
+        self.internal = CIDRIndex((network, INTERNAL)
+                                  for network in list(internal_networks) + [network for network, _ in asset_networks])
+        self.blocklists = {}
+        for path in blocklist_paths:
+            if list_name(path) in self.blocklists:
+                raise ValueError(f"Two blocklists are named '{list_name(path)}': {path}")
+            self.blocklists[list_name(path)] = CIDRIndex((network, list_name(path)) for network, _ in read_network_list(path))
+
+    def digest(self):
+        """
+        Hash of every network and label, part of the cache key of analyses using the tags
+        """
+        return make_key(self.internal.digest(), self.assets.digest(),
+                        *(f"{name}:{index.digest()}" for name, index in self.blocklists.items()))
+
+    def tag(self, addresses):
+        """
+        Vectorized lookup of IPv4 addresses in every index
+
+        Args:
+            addresses: array of IPv4 addresses as integers
+
+        Output:
+            dict: "internal" bool array, "asset" codes into assets.labels (-1 for none) and, per
+                  blocklist name, a bool array of the listed addresses
+        """
+        return {
+            "internal": self.internal.lookup(addresses) >= 0,
+            "asset": self.assets.lookup(addresses),
+            "blocklists": {name: index.lookup(addresses) >= 0 for name, index in self.blocklists.items()},
+        }
+
+    def tags(self, values):
+        """
+        Tags of dotted addresses, an empty list for each value that is not an IPv4 address
+        """
+        addresses, valid = parse_ipv4(np.asarray(values, dtype=object).astype(str))
+        tagged = self.tag(addresses)
+        result = []
+        for position in range(len(addresses)):
+            if not valid[position]:
+                result.append([])
+                continue
+            tags = [INTERNAL if tagged["internal"][position] else EXTERNAL]
+            if tagged["asset"][position] >= 0:
+                tags.append(f"asset:{self.assets.labels[tagged['asset'][position]]}")
+            tags.extend(f"blocklist:{name}" for name, listed in tagged["blocklists"].items() if listed[position])
+            result.append(tags)
+        return result
+
+_tagger = None
+_tagger_files = None
+_tagger_lock = threading.Lock()
+
+def _list_files():
+    paths = config.IP_ASSET_INVENTORY_PATHS + config.IP_BLOCKLIST_PATHS
+    return tuple((path, os.path.getmtime(path)) for path in paths)
+
+def get_ip_tagger():
+    """
+    Process-wide IPTagger configured from src/config.py, reloaded when a list file changes
+    """
+    global _tagger, _tagger_files
+    with _tagger_lock:
+        files = _list_files()
+        if _tagger is None or files != _tagger_files:
+            _tagger, _tagger_files = IPTagger(), files
+        return _tagger
+
+class IPEnrichment:
+    """
+    Incremental counts of the IP tags over log chunks
+
+    Per address column, events from or to internal and external addresses and per asset subnet,
+    the traffic direction when both columns are present, and every blocklisted address with its
+    event count. Only the distinct addresses of a chunk are parsed and looked up, so tagging costs
+    little more than factorizing the columns.
+    """
+
+    def __init__(self, tagger=None, top_n=10):
+        """
+        Args:
+            tagger: IPTagger with the networks and lists, defaults to the process-wide one
+            top_n: asset subnets and blocklisted addresses listed in the summary
+        """
+        self.tagger = tagger or get_ip_tagger()
+        self.top_n = top_n
+        self.scopes = {column: Counter() for column in IP_COLUMNS}
+        self.assets = {column: Counter() for column in IP_COLUMNS}
+        self.directions = Counter()
+        # events per blocklisted address, by column
+        self.blocklisted = {column: Counter() for column in IP_COLUMNS}
+
+    def update(self, chunk, undo=None):
+        """
+        Fold the address columns of a chunk of raw log rows into the counts
+
+        Args:
+            chunk: DataFrame of raw log rows
+            undo: optional undo log of the replaced counts, see anomaly_detection.rollback
+        """
+        row_scopes = {}
+        for column in IP_COLUMNS:
+            if column not in chunk.columns:
+                continue
+            codes, addresses, valid = factorize_ipv4(chunk[column])
+            counts = np.bincount(codes[codes >= 0], minlength=len(addresses))
+            tagged = self.tagger.tag(addresses)
+            internal = tagged["internal"] & valid
+            remember(undo, self.scopes[column], (INTERNAL, EXTERNAL))
+
+            self.scopes[column][INTERNAL] += int(counts[internal].sum())
+            self.scopes[column][EXTERNAL] += int(counts[valid & ~internal].sum())
+            in_asset = valid & (tagged["asset"] >= 0)
+            asset_counts = np.bincount(tagged["asset"][in_asset], weights=counts[in_asset],
+                                       minlength=len(self.tagger.assets.labels))
+            remember(undo, self.assets[column], [self.tagger.assets.labels[code] for code in np.flatnonzero(asset_counts)])
+            for code in np.flatnonzero(asset_counts):
+                self.assets[column][self.tagger.assets.labels[code]] += int(asset_counts[code])
+
+            listed = np.zeros(len(addresses), dtype=bool)
+            for listed_here in tagged["blocklists"].values():
+                listed |= listed_here
+            positions = np.flatnonzero(valid & listed)
+            if len(positions):
+                hits = dict(zip(int_to_ipv4(addresses[positions]), counts[positions].tolist()))
+                remember(undo, self.blocklisted[column], hits)
+                self.blocklisted[column].update(hits)
+
+            # per row: 1 internal, 0 external, -1 missing or not an address; code -1 picks the trailing -1
+            row_scopes[column] = np.append(np.where(valid, internal.astype(np.int8), -1), -1).astype(np.int8)[codes]
+
+        if len(row_scopes) == len(IP_COLUMNS):
+            source, destination = row_scopes["source_ip"], row_scopes["destination_ip"]
+            both = (source >= 0) & (destination >= 0)
+            pairs = np.bincount(source[both] * 2 + destination[both], minlength=4)
+            remember(undo, self.directions, DIRECTIONS)
+            for (source_scope, destination_scope), count in zip(
+                    [(EXTERNAL, EXTERNAL), (EXTERNAL, INTERNAL), (INTERNAL, EXTERNAL), (INTERNAL, INTERNAL)], pairs):
+                self.directions[(source_scope, destination_scope)] += int(count)
+
+    def size_bytes(self):
+        """
+        Approximate memory held by the counts, dominated by the blocklisted addresses
+        """
+        counts = [self.directions, *self.scopes.values(), *self.assets.values(), *self.blocklisted.values()]
+        return COUNT_ENTRY_BYTES * sum(len(totals) for totals in counts)
+
+    def render(self):
+        """
+        Render the counts as a compact text section, empty if no addresses were seen
+        """
+        lines = []
+        for column in IP_COLUMNS:
+            total = sum(self.scopes[column].values())
+            if not total:
+                continue
+            line = (f"{column}: {self.scopes[column][INTERNAL]} events internal "
+                    f"({self.scopes[column][INTERNAL] / total:.0%}), {self.scopes[column][EXTERNAL]} external")
+            if self.assets[column]:
+                line += "; asset subnets: " + ", ".join(
+                    f"{label} ({count})" for label, count in self.assets[column].most_common(self.top_n))
+            lines.append(line)
+        if sum(self.directions.values()):
+            lines.append("Traffic direction: " + ", ".join(
+                f"{DIRECTIONS[pair]} {self.directions[pair]}" for pair in DIRECTIONS))
+        if self.tagger.blocklists:
+            hits = self.top_blocklisted(self.top_n)
+            total = sum(len(counts) for counts in self.blocklisted.values())
+            listed = ", ".join(f"{address} as {column} ({count} events, {', '.join(lists)})"
+                               for column, address, count, lists in hits)
+            more = f", +{total - len(hits)} more" if total > len(hits) else ""
+            lines.append(f"Blocklisted addresses ({total}): {listed or 'none'}{more}")
+        if not lines:
+            return ""
+        return "IP enrichment (internal networks, asset inventory, local blocklists):\n" + "\n".join(lines)
+
+    def top_blocklisted(self, n):
+        """
+        The n blocklisted addresses with the most events, over both columns
+
+        Output:
+            list: (column, address, events, names of the blocklists listing it) tuples
+        """
+        top = sorted(((int(count), column, address) for column, counts in self.blocklisted.items()
+                      for address, count in counts.most_common(n)), reverse=True)[:n]
+        tags = self.tagger.tags([address for _, _, address in top])
+        return [(column, address, count, [tag.split(":", 1)[1] for tag in address_tags if tag.startswith("blocklist:")])
+                for (count, column, address), address_tags in zip(top, tags)]
+
+    def findings(self):
+        """
+        A blocklist_hit finding per blocklisted address and column, in the AnomalyDetector format,
+        for the IP_BLOCKLIST_MAX_FINDINGS addresses with the most events
+        """
+        return [{
+            "rule": "blocklist_hit",
+            "severity": "High",
+            "column": column,
+            "value": address,
+            "window_start": None,
+            "window_end": None,
+            "count": count,
+            "score": float(count),
+            "description": f"{count} events with {address} as {column}, listed in {', '.join(lists)}",
+        } for column, address, count, lists in self.top_blocklisted(config.IP_BLOCKLIST_MAX_FINDINGS)]
+
+    def annotate(self, findings):
+        """
+        Add the ip_tags of their address to the findings about an address column
+        """
+        tagged = [finding for finding in findings if finding["column"] in IP_COLUMNS]
+        for finding, tags in zip(tagged, self.tagger.tags([finding["value"] for finding in tagged])):
+            finding["ip_tags"] = tags
+        return findings
@@ -0,0 +1,219 @@
+#src/ip_utils.py
+from src.cache import make_key
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+IPV4_PATTERN = r"^[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}$"
+# a list line: address or CIDR, then an optional label after a comma, semicolon or whitespace
+LIST_LINE = re.compile(r"^\s*([^\s,;#]+)(?:[\s,;]+([^#]*?))?\s*(?:#.*)?$")
+
+def ipv4_to_int_scalar(value):
+    """
+    Convert one dotted IPv4 string to an integer, or None if it is not a valid address
+    """
+    parts = str(value).split(".")
+    if len(parts) != 4 or not all(part.isdigit() and int(part) <= 255 for part in parts):
+        return None
+    return (int(parts[0]) << 24) | (int(parts[1]) << 16) | (int(parts[2]) << 8) | int(parts[3])
+
+def parse_ipv4(strings):
+    """
+    Vectorized parse of dotted IPv4 strings with pyarrow
+
+    Args:
+        strings: array of strings
+
+    Output:
+        tuple: (uint32 NumPy array of the addresses, bool NumPy array, False where the string is not an IPv4 address)
+    """
+    array = pa.array(strings, pa.string())
+    valid = pc.fill_null(pc.match_substring_regex(array, IPV4_PATTERN), False)
+    octets = pc.list_flatten(pc.split_pattern(pc.if_else(valid, array, "0.0.0.0"), "."))
+    octets = pc.cast(octets, pa.uint32()).to_numpy().reshape(-1, 4)
+    valid = valid.to_numpy(zero_copy_only=False) & (octets <= 255).all(axis=1)
+    addresses = (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+    return np.where(valid, addresses, 0).astype(np.uint32), valid
+
+def factorize_ipv4(values):
+    """
+    Distinct values of an address column as IPv4 integers, and the position of every row among them
+
+    Logs repeat a small set of addresses, so only the distinct values are parsed.
+
+    Args:
+        values: Series or array of IP strings
+
+    Output:
+        tuple: (codes, -1 where the row is missing; uint32 addresses of the distinct values;
+                bool array, False where a distinct value is not a valid IPv4 address)
+    """
+    # string columns are factorized as they are, without a copy to Python objects
+    values = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    addresses, valid = parse_ipv4(np.asarray(uniques, dtype=object).astype(str))
+    return codes, addresses, valid
+
+def ipv4_to_int(values):
+    """
+    Vectorized conversion of dotted IPv4 strings to unsigned 32-bit integers
+
+    Args:
+        values: Series or array of IP strings
+
+    Output:
+        pandas Series of UInt32, missing where the value is not a valid IPv4 address
+    """
+    codes, addresses, valid = factorize_ipv4(values)
+    converted = np.append(np.where(valid, addresses, np.nan), np.nan)
+    # code -1 (missing) picks the trailing NaN
+    return pd.Series(converted[codes], index=values.index if isinstance(values, pd.Series) else None).astype("UInt32")
+
+def int_to_ipv4(values):
+    """
+    Vectorized conversion of unsigned 32-bit integers back to dotted IPv4 strings
+
+    Output:
+        NumPy object array, None where the input is missing
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype="float64"), use_na_sentinel=True)
+    ints = np.asarray(uniques, dtype=np.uint32)
+    dotted = [f"{value >> 24}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}" for value in ints.tolist()]
+    return np.array(dotted + [None], dtype=object)[codes]
+
+def parse_networks(texts):
+    """
+    Vectorized parse of IPv4 addresses and CIDR networks, e.g. "10.0.0.0/8"; host bits are cleared
+
+    Args:
+        texts: array of strings
+
+    Output:
+        tuple: (prefix lengths, first and last addresses as uint32 NumPy arrays, bool array, False
+                where the string is not an IPv4 address or CIDR network)
+    """
+    parts = pc.split_pattern(pa.array(texts, pa.string()), "/", max_splits=1)
+    starts, valid = parse_ipv4(pc.list_element(parts, 0))
+    lengths = pc.list_value_length(parts).to_numpy(zero_copy_only=False)
+    prefixes = pc.list_element(pc.if_else(pc.equal(pc.list_value_length(parts), 2), parts, pa.scalar(["", "32"])), 1)
+    digits = pc.match_substring_regex(prefixes, r"^[0-9]{1,2}$").to_numpy(zero_copy_only=False)
+    prefixes = pc.cast(pc.if_else(digits, prefixes, "33"), pa.int64()).to_numpy()
+    valid &= (lengths >= 1) & (prefixes <= 32)
+    prefixes = np.where(valid, prefixes, 32)
+    sizes = np.left_shift(np.uint64(1), (32 - prefixes).astype(np.uint64))
+    starts = starts.astype(np.uint64) & (np.uint64(0xFFFFFFFF) ^ (sizes - np.uint64(1)))
+    return prefixes, starts.astype(np.uint32), (starts + sizes - np.uint64(1)).astype(np.uint32), valid
+
+def read_network_list(path):
+    """
+    Networks of a list file, e.g. a blocklist or an asset inventory
+
+    One address or CIDR network per line, optionally followed by a label after a comma, a semicolon
+    or whitespace; blank lines and text after # are ignored, and so are IPv6 networks, since
+    addresses are only kept as IPv4 integers. A first line that is not a network is taken for a
+    CSV header.
+
+    Output:
+        list: (network, label or None) pairs
+    """
+    networks, numbers = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            match = LIST_LINE.match(line)
+            if match and ":" not in match.group(1):
+                networks.append((match.group(1), match.group(2) or None))
+                numbers.append(number)
+    if not networks:
+        return networks
+    valid = parse_networks([network for network, _ in networks])[3]
+    if not valid[0] and numbers[0] == 1:
+        networks, numbers, valid = networks[1:], numbers[1:], valid[1:]
+    if not valid.all():
+        position = int(np.argmin(valid))
+        raise ValueError(f"Invalid network '{networks[position][0]}' on line {numbers[position]} of {path}")
+    return networks
+
+class CIDRIndex:
+    """
+    Longest-prefix lookup of IPv4 addresses in a set of labelled networks, vectorized with NumPy
+
+    CIDR networks are either nested or disjoint, so they flatten into sorted, disjoint intervals,
+    each labelled with the most specific network covering it. A lookup is then one binary search
+    per address (np.searchsorted), whatever the number of networks.
+    """
+
+    def __init__(self, networks=()):
+        """
+        Args:
+            networks: (network, label) pairs, networks as addresses or CIDR strings
+        """
+        self.labels = []
+        self._label_codes = {}
+        self._prefixes, self._starts, self._ends, self._codes = [], [], [], []
+        self._bounds = self._bound_codes = None
+        networks = list(networks)
+        if networks:
+            self.extend([network for network, _ in networks], [label for _, label in networks])
+
+    def __len__(self):
+        return sum(len(prefixes) for prefixes in self._prefixes)
+
+    def extend(self, networks, labels):
+        """
+        Add networks with their labels; a ValueError is raised if one is not an IPv4 address or CIDR network
+        """
+        prefixes, starts, ends, valid = parse_networks(networks)
+        if not valid.all():
+            raise ValueError(f"Not an IPv4 address or CIDR network: {networks[int(np.argmin(valid))]}")
+        for label in labels:
+            if label not in self._label_codes:
+                self._label_codes[label] = len(self.labels)
+                self.labels.append(label)
+        self._prefixes.append(prefixes)
+        self._starts.append(starts.astype(np.uint64))
+        self._ends.append(ends.astype(np.uint64))
+        self._codes.append(np.array([self._label_codes[label] for label in labels], dtype=np.int32))
+        self._bounds = self._bound_codes = None
+
+    def add(self, network, label):
+        self.extend([network], [label])
+
+    def _build(self):
+        prefixes, starts, ends, codes = (np.concatenate(parts) for parts in
+                                         (self._prefixes, self._starts, self._ends, self._codes))
+        # painted from the widest to the most specific network, so the most specific one wins
+        order = np.lexsort((starts, prefixes))
+        starts, ends, codes = starts[order], ends[order] + 1, codes[order]
+        bounds = np.unique(np.concatenate([starts, ends]))
+        bound_codes = np.full(len(bounds), -1, dtype=np.int32)
+        for low, high, code in zip(np.searchsorted(bounds, starts).tolist(), np.searchsorted(bounds, ends).tolist(),
+                                   codes.tolist()):
+            bound_codes[low:high] = code
+        self._bounds, self._bound_codes = bounds, bound_codes
+
+    def lookup(self, addresses):
+        """
+        Label code (index into labels) of the most specific network of each address
+
+        Args:
+            addresses: array of IPv4 addresses as integers
+
+        Output:
+            int32 NumPy array, -1 for addresses outside every network
+        """
+        addresses = np.asarray(addresses, dtype=np.uint64)
+        if not len(self):
+            return np.full(len(addresses), -1, dtype=np.int32)
+        if self._bounds is None:
+            self._build()
+        positions = np.searchsorted(self._bounds, addresses, side="right") - 1
+        return np.where(positions >= 0, self._bound_codes[np.maximum(positions, 0)], -1)
+
+    def digest(self):
+        """
+        Hash of the networks and their labels
+        """
+        return make_key(self.labels, *(np.concatenate(parts).tobytes() if parts else b""
+                                       for parts in (self._prefixes, self._starts, self._codes)))
@@ -0,0 +1,186 @@
+#src/jobs.py
+from src import config
+from src import metrics
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import threading
+import time
+import uuid
+
+class Job:
+    """
+    A unit of background work with progress reporting
+    """
+    QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+
+    def __init__(self, name, owner=None):
+        self.id = str(uuid.uuid4())
+        self.name = name
+        self.owner = owner
+        self.status = Job.QUEUED
+        self.stage = "queued"
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.streams = {}
+        self.closed_streams = set()
+        self.trace = None
+        self.profile = metrics.profiling_requested()
+        self.profile_path = None
+        # size_bytes() when the job finished, part of the manager's history total
+        self.measured_bytes = 0
+
+    def size_bytes(self):
+        """
+        Approximate memory held by the job's result and streamed text
+        """
+        return len(str(self.result)) + sum(len(text) for texts in self.streams.values() for text in texts)
+
+    def update(self, stage, progress=None):
+        """
+        Report the current stage and, optionally, overall progress between 0 and 1
+        """
+        self.stage = stage
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+
+    def emit(self, field, text):
+        """
+        Append streamed text to one of the job's output fields; None marks the field complete
+        """
+        if text is None:
+            self.closed_streams.add(field)
+        else:
+            self.streams.setdefault(field, []).append(text)
+
+    @property
+    def done(self):
+        return self.status in (Job.COMPLETED, Job.FAILED)
+
+    def to_dict(self, include_result=True):
+        data = {
+            "job_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.trace is not None:
+            data["trace"] = self.trace.to_dict()
+        if self.profile_path:
+            data["profile_path"] = self.profile_path
+        if include_result:
+            data["result"] = self.result
+        return data
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and keeps a bounded history of their states
+    """
+
+    def __init__(self, max_workers=None, max_history=None, max_history_bytes=None):
+        """
+        Args:
+            max_workers: jobs running at once, further jobs wait in the queue
+            max_history: finished jobs kept for lookup; the oldest are dropped first
+            max_history_bytes: cap on the approximate memory held by the results and streams of finished jobs
+        """
+        self.max_workers = max_workers or config.JOBS_MAX_WORKERS
+        self.max_history = max_history or config.JOBS_MAX_HISTORY
+        self.max_history_bytes = max_history_bytes or config.JOBS_MAX_HISTORY_BYTES
+        # sum of measured_bytes over the finished jobs
+        self._history_bytes = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args, owner=None, **kwargs):
+        """
+        Queue fn(job, *args, **kwargs) and return the Job immediately
+
+        fn reports progress through job.update() and its return value becomes job.result.
+        owner tags the job, e.g. with the session that started it.
+        """
+        job = Job(name, owner)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = self._call(job, fn, args, kwargs)
+            job.status = Job.COMPLETED
+            job.update("done", 1.0)
+        except Exception as e:
+            job.error = str(e)
+            job.status = Job.FAILED
+            job.update("failed")
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                # a job pruned as soon as it was done is not part of the history anymore
+                if job.id in self._jobs:
+                    job.measured_bytes = job.size_bytes()
+                    self._history_bytes += job.measured_bytes
+                    self._prune(keep=job.id)
+
+    def _call(self, job, fn, args, kwargs):
+        """
+        fn(job, *args, **kwargs), traced by stage and, if the submitting request asked for it, profiled
+        """
+        token = None
+        if config.METRICS_ENABLED:
+            job.trace, token = metrics.start_trace()
+        # requested by the request that submitted the job, see metrics.request_profiling()
+        profiler = metrics.start_profile() if job.profile else None
+        started = time.perf_counter()
+        try:
+            return fn(job, *args, **kwargs)
+        finally:
+            if profiler is not None:
+                job.profile_path = metrics.stop_profile(profiler, f"job-{job.id}")
+            if token is not None:
+                metrics.end_trace(token)
+                metrics.record_stage("job", time.perf_counter() - started)
+
+    def _prune(self, keep=None):
+        # the job that just finished is kept, so its client can still collect the result
+        finished = [job_id for job_id, job in self._jobs.items() if job.done and job_id != keep]
+        excess = len(self._jobs) - self.max_history
+        for job_id in finished:
+            if excess <= 0 and self._history_bytes <= self.max_history_bytes:
+                break
+            self._history_bytes -= self._jobs.pop(job_id).measured_bytes
+            excess -= 1
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, owner=None):
+        with self._lock:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+
+    def stats(self):
+        jobs = self.list()
+        counts = {status: 0 for status in (Job.QUEUED, Job.RUNNING, Job.COMPLETED, Job.FAILED)}
+        for job in jobs:
+            counts[job.status] += 1
+        with self._lock:
+            history_bytes = self._history_bytes
+        return {"max_workers": self.max_workers, **counts, "history_bytes": history_bytes,
+                "max_history_bytes": self.max_history_bytes}
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
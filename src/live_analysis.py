@@ -0,0 +1,206 @@
+#src/live_analysis.py
+from src.custom_exception import CustomException
+from src.anomaly_detection import COUNT_ENTRY_BYTES, SEVERITY_ORDER, rollback
+from src.logs_analysis import DocumentAnalysis, LogStatistics
+from src.event_table import EventTable
+from src.timestamps import parse_timestamps
+from src.tokens import truncate_to_tokens
+from src import config
+from prompt_templates.templates import incremental_analysis
+import sys
+import threading
+import pandas as pd
+
+# approximate memory of a finding dict with its rule, value, window and count
+FINDING_BYTES = 1024
+
+def batch_bytes(batch):
+    """
+    Approximate memory of (chunk, lines) pairs held back for the next model call
+    """
+    return sum(int(chunk.memory_usage(deep=True).sum()) + sum(sys.getsizeof(line) for line in lines)
+               for chunk, lines in batch)
+
+def finding_key(finding):
+    return finding["rule"], finding["column"], finding["value"], finding["window_start"]
+
+class LiveAnalysis:
+    """
+    Incremental analysis of an upload that keeps growing, e.g. a tailed log
+
+    Appended batches are folded into running state that the full analysis would otherwise rebuild
+    from scratch: the statistics summary, the anomaly prefilter counters, the chat retrieval index
+    and the event table. The LLM only sees the new rows: their statistics and sampled lines update
+    the previous analysis, and only findings first flagged in the new rows are escalated. Small
+    batches are held back until enough rows have arrived to be worth a model call.
+
+    The anomaly rules are evaluated for the counters the batch touched only, so a batch costs time
+    proportional to its own rows. Findings of untouched counters are kept as last evaluated.
+    """
+
+    def __init__(self, doc_analysis, statistics, detector, results, index=None, event_table=None, min_rows=None):
+        """
+        Args:
+            doc_analysis: DocumentAnalysis of the upload, used for formatting and model calls
+            statistics: LogStatistics over everything analyzed so far
+            detector: AnomalyDetector over everything analyzed so far
+            results: latest analysis results of the upload
+            index: LogIndex of the chatbot, extended with the new lines
+            event_table: EventTable of the chatbot, extended with the new events
+            min_rows: new rows needed before the analysis is updated by the LLM, unless new anomalies are flagged
+        """
+        self.analysis = doc_analysis
+        self.statistics = statistics
+        self.detector = detector
+        self.results = dict(results)
+        self.index = index
+        self.event_table = event_table
+        self.min_rows = min_rows or config.LIVE_ANALYSIS_MIN_ROWS
+        self.upload_id = results.get("upload_id")
+        self.batches = 0
+        # (chunk, lines) of appended rows the LLM has not seen yet, fewer than min_rows
+        self.pending_chunks = []
+        self.pending_bytes = 0
+        self.reported = {finding_key(finding) for finding in results.get("anomaly_findings", [])}
+        # every finding so far by key, the latest evaluation of each
+        self.findings = {finding_key(finding): finding for finding in results.get("anomaly_findings", [])}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store, upload_id, results, index=None, event_table=None):
+        """
+        Rebuild the running state of a stored upload with one scan, before its first append
+        """
+        doc_analysis = DocumentAnalysis(store.path(upload_id), parser=store.parser())
+        statistics, detector = doc_analysis.scan()
+        return cls(doc_analysis, statistics, detector, results, index, event_table)
+
+    def size_bytes(self):
+        """
+        Approximate memory held by the running state besides the index and event table, which the
+        chatbot shares; it grows with every batch
+        """
+        return (self.statistics.size_bytes() + self.detector.size_bytes() + self.pending_bytes
+                + FINDING_BYTES * len(self.findings) + COUNT_ENTRY_BYTES * len(self.reported))
+
+    def _new_findings(self, findings, batch_start):
+        """
+        Findings not reported before whose window overlaps the appended rows
+        """
+        new = []
+        for finding in findings:
+            if finding_key(finding) in self.reported:
+                continue
+            if finding["window_end"] and batch_start is not None and pd.Timestamp(finding["window_end"]) <= batch_start:
+                continue
+            new.append(finding)
+        return new
+
+    def append(self, chunks, progress=None, on_token=None, commit=None):
+        """
+        Fold a batch of normalized event chunks into the analysis
+
+        The running state only takes the batch in once the model calls have succeeded: if one
+        fails, the state is as before the call and the same batch can be appended again.
+
+        Args:
+            chunks: list of normalized event DataFrames of the batch
+            progress: optional callback progress(stage, fraction)
+            on_token: optional callback on_token(field, text), as in DocumentAnalysis.run
+            commit: optional callback run after the model calls and before the state is updated,
+                    e.g. storing the batch; if it raises, the batch is not taken in either
+
+        Output:
+            dict: updated results, with a "live" entry describing the batch
+        """
+        progress = progress or (lambda stage, fraction: None)
+        stream = (lambda field: (lambda text: on_token(field, text))) if on_token else (lambda field: None)
+        with self._lock:
+            try:
+                progress("updating aggregates", 0.1)
+                batch = [(chunk, self.analysis.format_logs(chunk)) for chunk in chunks]
+                # the rows not analysed yet, rebuilt from their chunks so nothing changes until the batch is committed
+                pending_chunks = self.pending_chunks + batch
+                pending = LogStatistics(top_n=config.SUMMARY_TOP_N, sample_size=config.SUMMARY_SAMPLE_SIZE)
+                for chunk, lines in pending_chunks:
+                    pending.update(chunk, lines)
+                batch_rows, batch_start = 0, None
+                touched = {}
+                # the detector and IP counts are needed for the findings of the batch: they are updated now,
+                # with an undo log, and rolled back if the model calls fail
+                undo = []
+                try:
+                    for chunk, _ in batch:
+                        if self.statistics.ip_enrichment is not None:
+                            self.statistics.ip_enrichment.update(chunk, undo)
+                        for counter, keys in self.detector.update(chunk, undo).items():
+                            touched.setdefault(counter, {}).update(dict.fromkeys(keys))
+                        batch_rows += len(chunk)
+                        if "timestamp" in chunk.columns:
+                            first = parse_timestamps(chunk["timestamp"]).min()
+                            if not pd.isna(first):
+                                batch_start = first if batch_start is None else min(batch_start, first)
+
+                    evaluated = self.detector.findings({counter: list(keys) for counter, keys in touched.items()}) \
+                        if config.ANOMALY_PREFILTER else []
+                    new_findings = self._new_findings(evaluated, batch_start)
+                    logs_analysis = self.results["logs_analysis"]
+                    anomalies = self.results["anomalies"]
+                    analysed = pending.total_rows >= self.min_rows or bool(new_findings)
+                    if analysed:
+                        progress("analysing new logs", 0.4)
+                        prompt = incremental_analysis(logs_analysis, pending.render(), "\n".join(pending.samples()))
+                        logs_analysis = self.analysis.generate(prompt, stream("logs_analysis"))
+                    elif on_token:
+                        on_token("logs_analysis", logs_analysis)
+                    if on_token:
+                        on_token("logs_analysis", None)
+
+                    if new_findings:
+                        progress("identifying anomalies", 0.7)
+                        report = self.analysis.identify_anomalies(logs_analysis, new_findings, stream("anomalies"), chunks=chunks)
+                        anomalies = f"{report}\n\nEarlier report:\n{truncate_to_tokens(anomalies, config.LIVE_ANOMALY_HISTORY_TOKENS)}"
+                    elif on_token:
+                        on_token("anomalies", anomalies)
+                    if on_token:
+                        on_token("anomalies", None)
+                    if commit is not None:
+                        commit()
+                except Exception:
+                    rollback(undo)
+                    raise
+
+                # the model calls succeeded: fold the batch into the rest of the running state
+                progress("updating indexes", 0.9)
+                for chunk, lines in batch:
+                    self.statistics.update(chunk, lines, enrich=False)
+                    if self.index is not None:
+                        self.index.add(lines)
+                    if self.event_table is not None:
+                        self.event_table.append(EventTable.from_frame(chunk))
+                self.batches += 1
+                self.pending_chunks = [] if analysed else pending_chunks
+                self.pending_bytes = 0 if analysed else self.pending_bytes + batch_bytes(batch)
+                self.findings.update((finding_key(finding), finding) for finding in evaluated)
+                self.reported.update(finding_key(finding) for finding in new_findings)
+                findings = sorted(self.findings.values(),
+                                  key=lambda finding: (SEVERITY_ORDER[finding["severity"]], -finding["count"]))
+
+                self.results = {
+                    **self.results,
+                    "logs_analysis": logs_analysis,
+                    "anomalies": anomalies,
+                    "anomaly_findings": findings,
+                    "live": {
+                        "batches": self.batches,
+                        "batch_rows": batch_rows,
+                        "total_rows": self.statistics.total_rows,
+                        "pending_rows": 0 if analysed else pending.total_rows,
+                        "new_findings": new_findings,
+                        "llm_invoked": analysed or bool(new_findings),
+                    },
+                }
+                return self.results
+
+            except Exception as e:
+                raise CustomException("Failed to analyse appended logs", e)
@@ -0,0 +1,244 @@
+#src/llm_client.py
+from src import config
+from src import metrics
+from src.llm_scheduler import LLMScheduler
+import asyncio
+import json
+import threading
+import time
+import weakref
+import httpx
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+def parse_keep_alive(value):
+    """
+    Ollama keep_alive from a setting: seconds as a number (-1 keeps the model loaded), else a duration such as "30m"
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+class LLMClient:
+    """
+    Shared client for all Ollama traffic
+
+    Keeps pooled keep-alive connections, queues requests by priority for a bounded number of
+    in-flight slots (src/llm_scheduler.py), applies per-call timeouts and retries transient
+    failures with exponential backoff.
+    Every call asks for the same num_ctx and keep_alive unless it overrides them: Ollama reloads the
+    model whenever the context size changes, and unloads it once keep_alive has passed without calls.
+    Offers a sync API for worker threads and an async API for the FastAPI event loop.
+    """
+
+    def __init__(self, base_url=None, model=None, timeout=None, max_concurrency=None, max_retries=None,
+                 retry_backoff=None, keep_alive=None):
+        """
+        Args:
+            base_url: Ollama server URL, or a local stand-in
+            model: model name used when a call does not name one
+            timeout: default read timeout in seconds for a single request
+            max_concurrency: requests in flight at once, over all threads and event loops
+            max_retries: retries after the first attempt for connection errors and 429/5xx responses
+            retry_backoff: initial backoff in seconds, doubled after each retry
+            keep_alive: how long the model stays loaded after a call, e.g. "30m", or seconds
+        """
+        self.base_url = (base_url or config.OLLAMA_URL).rstrip("/")
+        self.model = model or config.OLLAMA_MODEL
+        self.timeout = timeout or config.OLLAMA_TIMEOUT
+        self.max_concurrency = max_concurrency or config.OLLAMA_MAX_CONCURRENCY
+        self.max_retries = config.OLLAMA_MAX_RETRIES if max_retries is None else max_retries
+        self.retry_backoff = config.OLLAMA_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        self.keep_alive = parse_keep_alive(config.OLLAMA_KEEP_ALIVE if keep_alive is None else keep_alive)
+
+        self._limits = httpx.Limits(
+            max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency
+        )
+        self._client = httpx.Client(base_url=self.base_url, timeout=self._timeout(), limits=self._limits)
+        self.scheduler = LLMScheduler(self.max_concurrency)
+        # httpx.AsyncClient is bound to one event loop
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _timeout(self, timeout=None):
+        return httpx.Timeout(timeout or self.timeout, connect=config.OLLAMA_CONNECT_TIMEOUT)
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            self._async_clients[loop] = httpx.AsyncClient(base_url=self.base_url, timeout=self._timeout(),
+                                                          limits=self._limits)
+        return self._async_clients[loop]
+
+    def _payload(self, payload):
+        options = {"num_ctx": config.OLLAMA_NUM_CTX, **(payload.get("options") or {})}
+        return {"model": self.model, "stream": False, "keep_alive": self.keep_alive, **payload, "options": options}
+
+    def _retryable(self, response=None, error=None):
+        if error is not None:
+            return isinstance(error, httpx.TransportError)
+        return response.status_code in RETRY_STATUS_CODES
+
+    def post(self, path, payload, timeout=None, priority=None):
+        """
+        POST a JSON payload and return the decoded JSON response
+
+        Args:
+            path: API path such as "/api/generate"
+            payload: request body; model and stream default to this client's model and False
+            timeout: read timeout for this call, overriding the client default
+            priority: scheduler priority, defaults to the calling context's (see llm_priority)
+        """
+        payload = self._payload(payload)
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.scheduler.slot(priority):
+                    response = self._client.post(path, json=payload, timeout=self._timeout(timeout))
+                if attempt < self.max_retries and self._retryable(response=response):
+                    time.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                response.raise_for_status()
+                result = response.json()
+                metrics.record_llm_call(path, payload["model"], time.perf_counter() - started, result)
+                return result
+            except httpx.HTTPError as e:
+                if attempt >= self.max_retries or not self._retryable(error=e):
+                    raise
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+    async def apost(self, path, payload, timeout=None, priority=None):
+        """
+        Async counterpart of post()
+        """
+        client = self._async_client()
+        payload = self._payload(payload)
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.scheduler.aslot(priority):
+                    response = await client.post(path, json=payload, timeout=self._timeout(timeout))
+                if attempt < self.max_retries and self._retryable(response=response):
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                response.raise_for_status()
+                result = response.json()
+                metrics.record_llm_call(path, payload["model"], time.perf_counter() - started, result)
+                return result
+            except httpx.HTTPError as e:
+                if attempt >= self.max_retries or not self._retryable(error=e):
+                    raise
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+    def warm_up(self, timeout=None):
+        """
+        Load the model with the default options, without generating anything
+
+        Output:
+            float: seconds taken, mostly the model load if it was not loaded yet
+        """
+        started = time.perf_counter()
+        # Ollama only loads the model for a generate request without a prompt
+        self.post("/api/generate", {}, timeout)
+        return time.perf_counter() - started
+
+    def generate(self, prompt, options=None, timeout=None):
+        """
+        Single completion from /api/generate, returning Ollama's full JSON response
+        """
+        return self.post("/api/generate", {"prompt": prompt, "options": options or {}}, timeout)
+
+    async def agenerate(self, prompt, options=None, timeout=None):
+        return await self.apost("/api/generate", {"prompt": prompt, "options": options or {}}, timeout)
+
+    def chat(self, messages, options=None, timeout=None):
+        """
+        Chat completion from /api/chat, returning Ollama's full JSON response
+        """
+        return self.post("/api/chat", {"messages": messages, "options": options or {}}, timeout)
+
+    async def achat(self, messages, options=None, timeout=None):
+        return await self.apost("/api/chat", {"messages": messages, "options": options or {}}, timeout)
+
+    def stream(self, path, payload, timeout=None, priority=None):
+        """
+        POST with stream enabled and yield each decoded NDJSON chunk as it arrives
+
+        Streams are not retried, since part of the answer may already have been consumed.
+        """
+        payload = {**self._payload(payload), "stream": True}
+        started = time.perf_counter()
+        with self.scheduler.slot(priority):
+            with self._client.stream("POST", path, json=payload, timeout=self._timeout(timeout)) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line:
+                        chunk = json.loads(line)
+                        if chunk.get("done"):
+                            metrics.record_llm_call(path, payload["model"], time.perf_counter() - started, chunk)
+                        yield chunk
+
+    async def astream(self, path, payload, timeout=None, priority=None):
+        """
+        Async counterpart of stream()
+        """
+        client = self._async_client()
+        payload = {**self._payload(payload), "stream": True}
+        started = time.perf_counter()
+        async with self.scheduler.aslot(priority):
+            async with client.stream("POST", path, json=payload, timeout=self._timeout(timeout)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        chunk = json.loads(line)
+                        if chunk.get("done"):
+                            metrics.record_llm_call(path, payload["model"], time.perf_counter() - started, chunk)
+                        yield chunk
+
+    def stream_generate(self, prompt, options=None, timeout=None):
+        """
+        Yield response text pieces from /api/generate as the model produces them
+        """
+        for chunk in self.stream("/api/generate", {"prompt": prompt, "options": options or {}}, timeout):
+            if chunk.get("response"):
+                yield chunk["response"]
+
+    async def astream_chat(self, messages, options=None, timeout=None, model=None):
+        """
+        Yield assistant message pieces from /api/chat as the model produces them
+        """
+        payload = {"messages": messages, "options": options or {}}
+        if model:
+            payload["model"] = model
+        async for chunk in self.astream("/api/chat", payload, timeout):
+            content = chunk.get("message", {}).get("content")
+            if content:
+                yield content
+
+    def close(self):
+        self._client.close()
+
+_shared_clients = {}
+_shared_lock = threading.Lock()
+
+def get_llm_client(base_url=None):
+    """
+    Process-wide LLMClient per base URL, configured from src/config.py
+    """
+    base_url = (base_url or config.OLLAMA_URL).rstrip("/")
+    with _shared_lock:
+        if base_url not in _shared_clients:
+            _shared_clients[base_url] = LLMClient(base_url=base_url)
+        return _shared_clients[base_url]
+
+_http_client = None
+
+def get_http_client():
+    """
+    Pooled plain HTTP client with short timeouts, for health probes
+    """
+    global _http_client
+    with _shared_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(timeout=httpx.Timeout(config.HEALTH_CHECK_TIMEOUT))
+        return _http_client
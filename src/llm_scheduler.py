@@ -0,0 +1,211 @@
+#src/llm_scheduler.py
+from src import config
+from src import metrics
+from collections import Counter
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+
+# Priorities of LLM work, lowest rank first: interactive chat, then anomaly passes, then bulk analysis
+CHAT = "chat"
+ANOMALIES = "anomalies"
+ANALYSIS = "analysis"
+PRIORITIES = {CHAT: 0, ANOMALIES: 1, ANALYSIS: 2}
+
+_current_priority = contextvars.ContextVar("llm_priority", default=ANALYSIS)
+
+@contextlib.contextmanager
+def llm_priority(priority):
+    """
+    Run the LLM calls of the block, and of work it submits with a copied context, at a priority
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority '{priority}', expected one of {list(PRIORITIES)}")
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+def current_priority():
+    return _current_priority.get()
+
+class _Ticket:
+    """
+    A request waiting for a slot, woken through a threading.Event or an event loop future
+    """
+    __slots__ = ("priority", "granted", "cancelled", "event", "loop", "future")
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.granted = False
+        self.cancelled = False
+        self.event = self.loop = self.future = None
+
+class LLMScheduler:
+    """
+    Priority queue in front of one model server, shared by worker threads and event loops
+
+    At most max_in_flight requests run at once. When a slot frees up it goes to the waiting request
+    of the highest priority, in arrival order within a priority, so a chat question only waits for
+    requests already running, not for a queue of bulk analysis chunks. A request waiting in an async
+    task that is cancelled, e.g. because its client disconnected, leaves the queue without reaching
+    the model.
+    """
+
+    def __init__(self, max_in_flight=None, prioritize=None):
+        """
+        Args:
+            max_in_flight: requests running on the model server at once
+            prioritize: order the queue by priority; False serves requests first come, first served
+        """
+        self.max_in_flight = max_in_flight or config.OLLAMA_MAX_CONCURRENCY
+        self.prioritize = config.LLM_PRIORITY_SCHEDULING if prioritize is None else prioritize
+        self.in_flight = 0
+        self.cancelled = 0
+        self._queue = []
+        self._queued = Counter()
+        self._waits = {priority: [0, 0.0, 0.0] for priority in PRIORITIES}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, ticket):
+        """
+        Take a free slot right away, or queue the ticket; called with the lock held
+        """
+        if self.in_flight < self.max_in_flight and not self._queue:
+            self.in_flight += 1
+            return True
+        rank = PRIORITIES[ticket.priority] if self.prioritize else 0
+        heapq.heappush(self._queue, (rank, next(self._order), ticket))
+        self._queued[ticket.priority] += 1
+        return False
+
+    def _dispatch(self):
+        """
+        Hand free slots to the queued tickets; called with the lock held
+        """
+        while self.in_flight < self.max_in_flight and self._queue:
+            ticket = heapq.heappop(self._queue)[2]
+            if ticket.cancelled:
+                continue
+            self._queued[ticket.priority] -= 1
+            ticket.granted = True
+            self.in_flight += 1
+            if ticket.event is not None:
+                ticket.event.set()
+                continue
+            try:
+                ticket.loop.call_soon_threadsafe(self._resolve, ticket)
+            except RuntimeError:
+                # the waiting task's event loop is closed, nobody will use the slot
+                self.in_flight -= 1
+
+    def _resolve(self, ticket):
+        # runs on the waiting task's event loop
+        if ticket.future.cancelled():
+            self.release()
+        else:
+            ticket.future.set_result(None)
+
+    def _record_wait(self, priority, seconds):
+        with self._lock:
+            waits = self._waits[priority]
+            waits[0] += 1
+            waits[1] += seconds
+            waits[2] = max(waits[2], seconds)
+        metrics.record_llm_wait(priority, seconds)
+
+    def acquire(self, priority=None):
+        """
+        Block until a slot is free for a request of this priority; pair with release()
+        """
+        priority = priority or current_priority()
+        ticket = _Ticket(priority)
+        started = time.perf_counter()
+        with self._lock:
+            if not self._try_acquire(ticket):
+                ticket.event = threading.Event()
+        if ticket.event is not None:
+            ticket.event.wait()
+        self._record_wait(priority, time.perf_counter() - started)
+
+    async def aacquire(self, priority=None):
+        """
+        Async counterpart of acquire(); cancelling the waiting task removes it from the queue
+        """
+        priority = priority or current_priority()
+        ticket = _Ticket(priority)
+        started = time.perf_counter()
+        with self._lock:
+            if not self._try_acquire(ticket):
+                ticket.loop = asyncio.get_running_loop()
+                ticket.future = ticket.loop.create_future()
+        if ticket.future is not None:
+            try:
+                await ticket.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if not ticket.granted:
+                        ticket.cancelled = True
+                        self._queued[priority] -= 1
+                        self.cancelled += 1
+                        raise
+                # granted meanwhile: the slot is released here, or by _resolve if the future was cancelled first
+                if not ticket.future.cancelled():
+                    self.release()
+                raise
+        self._record_wait(priority, time.perf_counter() - started)
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._dispatch()
+
+    @contextlib.contextmanager
+    def slot(self, priority=None):
+        """
+        Hold a slot for the duration of the block
+        """
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextlib.asynccontextmanager
+    async def aslot(self, priority=None):
+        """
+        Async counterpart of slot()
+        """
+        await self.aacquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def queue_depth(self):
+        """
+        Requests waiting for a slot, by priority
+        """
+        with self._lock:
+            return {priority: self._queued[priority] for priority in PRIORITIES}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "prioritize": self.prioritize,
+                "queued": {priority: self._queued[priority] for priority in PRIORITIES},
+                "cancelled": self.cancelled,
+                "waits": {
+                    priority: {"requests": count, "mean_seconds": round(total / count, 4) if count else 0.0,
+                               "max_seconds": round(longest, 4)}
+                    for priority, (count, total, longest) in self._waits.items()
+                },
+            }
@@ -0,0 +1,142 @@
+#src/log_index.py
+from src import config
+from collections import Counter, defaultdict
+import re
+import sys
+import threading
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_\-]+(?:[.:][a-z0-9_\-]+)*")
+# a posting entry not frozen yet holds two list slots (the doc id's int is shared by the line's
+# tokens), a frozen one an int32 doc id and a float32 frequency
+PENDING_POSTING_BYTES = 8 + 8
+FROZEN_POSTING_BYTES = 4 + 4
+# per token and form: its text, dict slot and the two lists or arrays with their headers
+POSTING_LIST_BYTES = 320
+
+def tokenize(text: str):
+    """
+    Lowercase word tokens; dotted and colon separated values such as IPs and times stay whole
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+class LogIndex:
+    """
+    In-process BM25 inverted index over formatted log lines
+
+    Lines are added in a streaming fashion while the upload is scanned; postings are frozen
+    into NumPy arrays on the first search so queries score whole posting lists at once. Lines
+    added later are kept in lists until the next search appends them to the arrays.
+    """
+
+    def __init__(self, max_lines=None, k1=1.2, b=0.75, max_df=0.5):
+        """
+        Args:
+            max_lines: lines indexed at most, later lines are ignored to bound memory
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            max_df: query terms found in more than this share of lines are skipped as stopwords
+        """
+        self.max_lines = max_lines or config.LOG_INDEX_MAX_LINES
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self.lines = []
+        self._bytes = 0
+        self._lengths = []
+        # postings of the lines added since the last freeze, by token
+        self._building = defaultdict(lambda: ([], []))
+        self._pending_entries = 0
+        self._postings = {}
+        self._frozen_entries = 0
+        self._frozen = False
+        # a live append adds lines from a job thread while chat requests search
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add(self, lines):
+        """
+        Index an iterable of log lines
+        """
+        with self._lock:
+            for line in lines:
+                if len(self.lines) >= self.max_lines:
+                    return
+                doc_id = len(self.lines)
+                tokens = tokenize(line)
+                self.lines.append(line)
+                self._lengths.append(len(tokens))
+                # the line object and its slots in lines and _lengths
+                self._bytes += sys.getsizeof(line) + 16
+
+                counts = Counter(tokens)
+                for token, count in counts.items():
+                    doc_ids, freqs = self._building[token]
+                    doc_ids.append(doc_id)
+                    freqs.append(count)
+                self._pending_entries += len(counts)
+                self._frozen = False
+
+    def _freeze(self):
+        # called with the lock held; only postings that grew since the last freeze are converted, and the lists are freed
+        # once appended to the arrays
+        for token, (doc_ids, freqs) in self._building.items():
+            doc_ids, freqs = np.asarray(doc_ids, dtype=np.int32), np.asarray(freqs, dtype=np.float32)
+            if token in self._postings:
+                frozen_ids, frozen_freqs = self._postings[token]
+                doc_ids, freqs = np.concatenate((frozen_ids, doc_ids)), np.concatenate((frozen_freqs, freqs))
+            self._postings[token] = (doc_ids, freqs)
+        self._building.clear()
+        self._frozen_entries += self._pending_entries
+        self._pending_entries = 0
+        self._lengths_array = np.asarray(self._lengths, dtype=np.float32)
+        self._avg_length = float(self._lengths_array.mean()) if self.lines else 0.0
+        self._frozen = True
+
+    def search(self, query, top_k=None):
+        """
+        Rank indexed lines against a query with BM25
+
+        Args:
+            query: free text question
+            top_k: number of lines returned
+
+        Output:
+            list: (line, score) pairs, best first
+        """
+        with self._lock:
+            top_k = top_k or config.CHAT_RETRIEVAL_TOP_K
+            if not self.lines:
+                return []
+            if not self._frozen:
+                self._freeze()
+
+            scores = np.zeros(len(self.lines), dtype=np.float32)
+            n = len(self.lines)
+            norm = self.k1 * (1 - self.b + self.b * self._lengths_array / max(self._avg_length, 1e-9))
+            for token in set(tokenize(query)):
+                posting = self._postings.get(token)
+                if posting is None or len(posting[0]) > self.max_df * n:
+                    continue
+                doc_ids, freqs = posting
+                idf = np.log(1 + (n - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                scores[doc_ids] += idf * freqs * (self.k1 + 1) / (freqs + norm[doc_ids])
+
+            candidates = np.flatnonzero(scores)
+            if not len(candidates):
+                return []
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self.lines[i], float(scores[i])) for i in ranked]
+
+    def size_bytes(self):
+        """
+        Approximate memory held by the index: lines, postings still in lists and frozen postings
+        """
+        with self._lock:
+            return (self._bytes + PENDING_POSTING_BYTES * self._pending_entries
+                    + FROZEN_POSTING_BYTES * self._frozen_entries
+                    + POSTING_LIST_BYTES * (len(self._building) + len(self._postings)))
@@ -0,0 +1,286 @@
+#src/log_parsers.py
+from src.cache import file_digest
+from itertools import islice
+import csv
+import re
+import pandas as pd
+
+# Columns of the normalized event table, in order; parsers may append format-specific extras after them
+EVENT_COLUMNS = ("timestamp", "log_type", "event_type", "severity", "host", "source_ip", "destination_ip", "user", "message")
+SNIFF_BYTES = 64 * 1024
+SNIFF_LINES = 20
+USER_PATTERN = re.compile(r"(?:for user|user:)\s+([^\s)]+)")
+
+def is_missing(value):
+    return value is None or value is pd.NA or value != value
+
+def format_event(timestamp, log_type, event_type, severity, host, source_ip, destination_ip, user, message, extras=()):
+    """
+    Render one normalized event as a log line
+
+    Segments whose fields are missing are left out, the leading timestamp, type and severity ones included,
+    so the network events of sample_gpt_logs.csv render exactly as they always have while other formats
+    do not show "None" or "nan" placeholders.
+
+    Args:
+        extras: (name, value) pairs of format-specific columns, appended when present
+    """
+    line = f"[{timestamp}] " if not is_missing(timestamp) else ""
+    kinds = [value for value in (log_type, event_type) if not is_missing(value)]
+    if kinds:
+        line += f"({', '.join(str(value) for value in kinds)}) "
+    if not is_missing(severity):
+        line += f"Severity: {severity} | "
+    if not is_missing(host):
+        line += f"Host: {host} | "
+    if not is_missing(source_ip) and not is_missing(destination_ip):
+        line += f"{event_type} from " if not is_missing(event_type) else "From "
+        line += f"{source_ip} to {destination_ip} "
+    if not is_missing(user):
+        line += f"using user '{user}'. "
+    line = line + f"Message: {message}" if not is_missing(message) else line.rstrip(" |")
+    details = ", ".join(f"{name}={value}" for name, value in extras if not is_missing(value))
+    return f"{line} [{details}]" if details else line
+
+def normalize(df, defaults=None):
+    """
+    Bring a parsed chunk into the event table layout: every EVENT_COLUMNS column first, missing ones as None,
+    followed by any extra columns of the format
+    """
+    for column, value in (defaults or {}).items():
+        if column not in df.columns:
+            df[column] = value
+    for column in EVENT_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+    extras = [column for column in df.columns if column not in EVENT_COLUMNS]
+    return df[list(EVENT_COLUMNS) + extras]
+
+def extract_users(messages):
+    """
+    Vectorized extraction of "for user root" / "(user: admin)" mentions from log messages
+    """
+    return messages.astype(str).str.extract(USER_PATTERN, expand=False)
+
+class LogParser:
+    """
+    Base class of the parser registry: recognizes a log format and streams it as normalized event chunks
+    """
+    name = "base"
+
+    def sniff(self, header, lines):
+        """
+        Args:
+            header: first line of the file
+            lines: first non-empty lines of the file, header included
+
+        Output:
+            bool: whether this parser handles the file
+        """
+        raise NotImplementedError
+
+    def iter_chunks(self, file_path, chunksize):
+        """
+        Output:
+            generator: normalized DataFrames of at most chunksize events
+        """
+        raise NotImplementedError
+
+    def digest(self, file_path):
+        """
+        Content hash of the source, used in cache keys
+        """
+        return file_digest(file_path)
+
+class CsvLogParser(LogParser):
+    """
+    CSV logs recognized by their header columns and mapped onto the event table
+    """
+
+    def __init__(self, name, columns, rename=None, defaults=None, extract_user=False):
+        """
+        Args:
+            name: format name
+            columns: header columns that identify the format
+            rename: mapping of CSV columns onto EVENT_COLUMNS
+            defaults: constant values of event columns the format does not carry, e.g. log_type
+            extract_user: fill the user column from "for user X" mentions in the message
+        """
+        self.name = name
+        self.columns = frozenset(columns)
+        self.rename = rename or {}
+        self.defaults = defaults or {}
+        self.extract_user = extract_user
+
+    @staticmethod
+    def header_columns(header):
+        return {column.strip().lower() for column in next(csv.reader([header]), [])}
+
+    def sniff(self, header, lines):
+        return self.columns <= self.header_columns(header)
+
+    def normalize_chunk(self, chunk):
+        chunk = chunk.rename(columns=lambda column: column.strip().lower()).rename(columns=self.rename)
+        if self.extract_user and "user" not in chunk.columns and "message" in chunk.columns:
+            chunk["user"] = extract_users(chunk["message"])
+        return normalize(chunk, self.defaults)
+
+    def iter_chunks(self, file_path, chunksize):
+        for chunk in pd.read_csv(file_path, chunksize=chunksize):
+            if not chunk.empty:
+                yield self.normalize_chunk(chunk)
+
+class GenericCsvLogParser(CsvLogParser):
+    """
+    Fallback for CSV files with an unknown header: columns named like event columns are kept as such,
+    everything else becomes an extra column
+    """
+
+    def __init__(self):
+        super().__init__("csv", columns=())
+
+    def sniff(self, header, lines):
+        return len(self.header_columns(header)) > 1
+
+    def normalize_chunk(self, chunk):
+        chunk = super().normalize_chunk(chunk)
+        if chunk["message"].isna().all():
+            extras = [column for column in chunk.columns if column not in EVENT_COLUMNS]
+            chunk["message"] = chunk[extras].agg(
+                lambda row: " ".join(str(value) for value in row if not is_missing(value)), axis=1) if extras else None
+        return chunk
+
+class RegexLogParser(LogParser):
+    """
+    Plain-text logs parsed with one precompiled regex with named groups, a chunk of lines at a time
+    """
+
+    def __init__(self, name, pattern, rename=None, defaults=None, extract_user=False, min_match_share=0.8):
+        """
+        Args:
+            name: format name
+            pattern: regex with named groups matching one full line
+            rename: mapping of group names onto EVENT_COLUMNS
+            defaults: constant values of event columns the format does not carry
+            extract_user: fill the user column from user mentions in the message
+            min_match_share: share of the sniffed lines that must match for the format to be recognized
+        """
+        self.name = name
+        self.pattern = re.compile(pattern)
+        # matching the whole chunk at once keeps the per-line work inside the regex engine
+        self.multiline_pattern = re.compile(pattern, re.MULTILINE)
+        self.groups = list(self.pattern.groupindex)
+        self.rename = rename or {}
+        self.defaults = defaults or {}
+        self.extract_user = extract_user
+        self.min_match_share = min_match_share
+
+    def sniff(self, header, lines):
+        matched = sum(1 for line in lines if self.pattern.fullmatch(line))
+        return bool(lines) and matched >= self.min_match_share * len(lines)
+
+    def parse_text(self, text):
+        """
+        Parse a block of lines into a normalized chunk; lines that do not match are skipped
+        """
+        rows = self.multiline_pattern.findall(text)
+        chunk = pd.DataFrame(rows, columns=self.groups).replace("", None).rename(columns=self.rename)
+        if self.extract_user and "user" not in chunk.columns:
+            chunk["user"] = extract_users(chunk["message"])
+        return normalize(chunk, self.defaults)
+
+    def iter_chunks(self, file_path, chunksize):
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            while True:
+                lines = list(islice(f, chunksize))
+                if not lines:
+                    break
+                chunk = self.parse_text("".join(lines))
+                if not chunk.empty:
+                    yield chunk
+
+SYSLOG_PATTERN = (
+    r"^(?P<timestamp>[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d) (?P<host>\S+) "
+    r"(?P<process>[^\s\[:]+)(?:\[(?P<pid>\d+)\])?: (?P<message>[^\r\n]*)"
+)
+FLOW_PATTERN = (
+    r"^(?P<timestamp>\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d) \[(?P<severity>[A-Z]+)\] (?P<protocol>[A-Z0-9]+) "
+    r"(?P<source_ip>[^\s:]+)(?::(?P<source_port>\d+))? -> (?P<destination_ip>[^\s:]+)(?::(?P<destination_port>\d+))? "
+    r"(?P<message>[^\r\n]*)"
+)
+
+# Tried in order; the first parser whose sniff() accepts the file wins, so the generic CSV fallback stays last
+PARSERS = [
+    CsvLogParser("network_events", ("timestamp", "log_type", "event_type", "source_ip", "destination_ip", "user",
+                                    "severity", "message")),
+    CsvLogParser("windows_events", ("timestamp", "event_id", "description", "computer", "account_name", "severity"),
+                 rename={"description": "event_type", "computer": "host", "account_name": "user"},
+                 defaults={"log_type": "Windows Security"}),
+    CsvLogParser("linux_syslog_csv", ("timestamp", "hostname", "process", "log_level", "message"),
+                 rename={"hostname": "host", "process": "event_type", "log_level": "severity"},
+                 defaults={"log_type": "syslog"}, extract_user=True),
+    RegexLogParser("syslog", SYSLOG_PATTERN, rename={"process": "event_type"}, defaults={"log_type": "syslog"},
+                   extract_user=True),
+    RegexLogParser("network_flow", FLOW_PATTERN, rename={"protocol": "event_type"},
+                   defaults={"log_type": "Network Flow"}, extract_user=True),
+    GenericCsvLogParser(),
+]
+
+def register_parser(parser, first=True):
+    """
+    Add a parser to the registry, by default ahead of the built-in ones
+    """
+    PARSERS.insert(0 if first else len(PARSERS), parser)
+
+def get_parser(name):
+    """
+    Registered parser with the given format name
+
+    Output:
+        LogParser
+    """
+    for parser in PARSERS:
+        if parser.name == name:
+            return parser
+    raise ValueError(f"Unknown log format '{name}', expected one of {[parser.name for parser in PARSERS]}")
+
+def sniff_file(file_path):
+    """
+    Read the first line and the first non-empty lines of a file for format detection
+    """
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        head = f.read(SNIFF_BYTES)
+    lines = [line.rstrip("\r") for line in head.split("\n")]
+    if len(head) == SNIFF_BYTES:
+        # the last line may be cut off by the read
+        lines = lines[:-1] or lines
+    lines = [line for line in lines if line.strip()]
+    return (lines[0] if lines else ""), lines[:SNIFF_LINES]
+
+def detect_parser(file_path):
+    """
+    Pick the registered parser for a log file from its header or first lines
+
+    Output:
+        LogParser
+    """
+    header, lines = sniff_file(file_path)
+    for parser in PARSERS:
+        if parser.sniff(header, lines):
+            return parser
+    raise ValueError(f"Unrecognized log format, no parser matches the first line: {header[:200]!r}")
+
+def iter_events(file_path, chunksize=50_000, parser=None):
+    """
+    Stream a log file of any supported format as normalized event chunks
+
+    Args:
+        file_path: path of the log file
+        chunksize: events per chunk
+        parser: parser to use, detected from the file when omitted
+
+    Output:
+        generator: DataFrames with the EVENT_COLUMNS columns first
+    """
+    parser = parser or detect_parser(file_path)
+    yield from parser.iter_chunks(file_path, chunksize)
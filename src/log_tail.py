@@ -0,0 +1,166 @@
+#src/log_tail.py
+"""
+Follow a growing log file and push its new lines to the backend as they are written.
+
+The file is uploaded once for a full analysis (unless the session already has one), then every
+new batch of complete lines is sent to /append-logs, which only analyzes the new lines. A batch
+is sent once the previous one has been processed, so lines written meanwhile are coalesced into
+the next batch instead of queueing up model calls.
+
+Usage:
+    python -m src.log_tail /var/log/network_events.csv --session-id soc-1
+"""
+from src.log_parsers import CsvLogParser, detect_parser
+from src import config
+import argparse
+import os
+import time
+import uuid
+import httpx
+
+SESSION_HEADER = "X-Session-ID"
+JOB_POLL_INTERVAL = 0.5
+# read size while looking for the end of a line longer than max_bytes
+SKIP_BLOCK_BYTES = 64 * 1024
+
+class LogTail:
+    """
+    Reads the complete lines appended to a file since the last read, across truncation and rotation
+    """
+
+    def __init__(self, path, from_start=False, has_header=False):
+        """
+        Args:
+            path: log file to follow
+            from_start: read the lines already in the file too, instead of only new ones
+            has_header: the first line is a header (CSV logs) that is sent with every batch instead
+        """
+        self.path = path
+        self.has_header = has_header
+        self.offset = 0 if from_start else os.path.getsize(path)
+        self.inode = os.stat(path).st_ino
+        self.header = self._read_header()
+
+    def _read_header(self):
+        if not self.has_header:
+            return b""
+        with open(self.path, "rb") as f:
+            return f.readline()
+
+    def read(self, max_bytes=None):
+        """
+        New complete lines since the last read; a partially written last line is left for the next read
+
+        Args:
+            max_bytes: read at most about this many bytes, the rest is returned by later reads;
+                       a longer line is returned cut to max_bytes
+
+        Output:
+            bytes: the new lines, empty if there are none
+        """
+        stat = os.stat(self.path)
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            # the file was rotated or truncated: start over at the beginning of the new file
+            self.inode, self.offset = stat.st_ino, 0
+            self.header = self._read_header()
+        if stat.st_size <= self.offset:
+            return b""
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(min(stat.st_size - self.offset, max_bytes or stat.st_size))
+            end = consumed = data.rfind(b"\n") + 1
+            if not end and len(data) < stat.st_size - self.offset:
+                # a single line longer than max_bytes: it is sent cut to max_bytes and skipped past,
+                # once it is complete
+                rest = self._skip_line(f)
+                if rest is None:
+                    return b""
+                data, end, consumed = data + b"\n", len(data) + 1, len(data) + rest
+        if self.offset == 0 and self.header and data.startswith(self.header):
+            # the header is not an event; batches get it prepended by batch()
+            data, end, consumed = data[len(self.header):], end - len(self.header), consumed - len(self.header)
+            self.offset = len(self.header)
+        self.offset += consumed
+        return data[:end]
+
+    @staticmethod
+    def _skip_line(f):
+        """
+        Bytes from the file position up to and including the next newline, None if there is none yet
+        """
+        skipped = 0
+        while True:
+            block = f.read(SKIP_BLOCK_BYTES)
+            if not block:
+                return None
+            newline = block.find(b"\n")
+            if newline >= 0:
+                return skipped + newline + 1
+            skipped += len(block)
+
+    def batch(self, lines):
+        """
+        Lines as an uploadable batch, with the file's header line if it has one
+        """
+        return self.header + lines
+
+def wait_for_job(client, job_id):
+    while True:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(JOB_POLL_INTERVAL)
+
+def follow(path, backend_url, session_id, interval=None, max_batch_bytes=None, from_start=False):
+    """
+    Upload a log file if the session has no analysis yet, then stream its new lines to /append-logs
+    until interrupted
+    """
+    interval = interval or config.LIVE_TAIL_INTERVAL
+    max_batch_bytes = max_batch_bytes or config.LIVE_TAIL_MAX_BATCH_BYTES
+    has_header = isinstance(detect_parser(path), CsvLogParser)
+    name = os.path.basename(path)
+    tail = LogTail(path, from_start=True, has_header=has_header)
+    with httpx.Client(base_url=backend_url, headers={SESSION_HEADER: session_id}, timeout=60) as client:
+        if from_start or not client.get("/status").json()["analysis_available"]:
+            lines = tail.read()
+            response = client.post("/upload-logs", files={"file": (name, tail.batch(lines))})
+            response.raise_for_status()
+            job = wait_for_job(client, response.json()["job_id"])
+            print(f"uploaded {name}: {job['status']}")
+        else:
+            tail = LogTail(path, has_header=has_header)
+
+        while True:
+            lines = tail.read(max_batch_bytes)
+            if not lines:
+                time.sleep(interval)
+                continue
+            response = client.post("/append-logs", files={"file": (name, tail.batch(lines))})
+            response.raise_for_status()
+            job = wait_for_job(client, response.json()["job_id"])
+            live = (job.get("result") or {}).get("live", {})
+            count = lines.count(b"\n")
+            print(f"appended {count} lines: {job['status']}, "
+                  f"{len(live.get('new_findings', []))} new findings, LLM {'called' if live.get('llm_invoked') else 'skipped'}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="log file to follow")
+    parser.add_argument("--backend-url", default=config.BACKEND_URL)
+    parser.add_argument("--session-id", default=str(uuid.uuid4()))
+    parser.add_argument("--interval", type=float, default=config.LIVE_TAIL_INTERVAL,
+                        help="seconds between checks for new lines")
+    parser.add_argument("--max-batch-bytes", type=int, default=config.LIVE_TAIL_MAX_BATCH_BYTES)
+    parser.add_argument("--from-start", action="store_true",
+                        help="upload the whole file again even if the session already has an analysis")
+    args = parser.parse_args()
+    print(f"following {args.path} in session {args.session_id}")
+    try:
+        follow(args.path, args.backend_url, args.session_id, args.interval, args.max_batch_bytes, args.from_start)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
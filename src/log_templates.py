@@ -0,0 +1,363 @@
+#src/log_templates.py
+from src.anomaly_detection import COUNT_ENTRY_BYTES
+from src import config
+from collections import Counter
+import sys
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Variables masked before clustering, in this order; each keeps its own kind of slot in the template.
+# The patterns run in RE2 (pyarrow) over whole chunks, so no lookarounds
+VARIABLE_PATTERNS = [
+    ("TIME", r"\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(?:\.\d+)?|[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d"),
+    ("IP", r"\b\d{1,3}(?:\.\d{1,3}){3}\b"),
+    ("HEX", r"\b0x[0-9a-fA-F]+\b"),
+    ("NUM", r"\b\d+(?:\.\d+)?\b"),
+]
+PLACEHOLDERS = {kind: f"<{kind}>" for kind, _ in VARIABLE_PATTERNS}
+WILDCARD = "<*>"
+# marks the values of a line while they are masked
+SEPARATOR = "\x1f"
+MONTHS = {month: i for i, month in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])}
+# distinct masked lines remembered to skip the tree, a cache that is reset when full
+KNOWN_LINES_LIMIT = 200_000
+# approximate memory of a known line besides its text and tokens: the dict slot and the (template, tokens) pair
+KNOWN_ENTRY_BYTES = 120
+# approximate memory of a VariableRange with its two values and sort keys
+VARIABLE_RANGE_BYTES = 400
+
+def mask_variables(lines):
+    """
+    Replace timestamps, IPs and numbers by typed placeholders, vectorized over an Arrow string array
+
+    Output:
+        tuple: (masked lines, list of (kind, rows, ordinals, values) with every masked value of that
+               kind, the line it was found in and its ordinal among that line's values of the kind)
+    """
+    variables = []
+    # SEPARATOR around each match splits a line into text, value, text, value, ..., text
+    lines = pc.replace_substring(lines, pattern=SEPARATOR, replacement=" ")
+    for kind, pattern in VARIABLE_PATTERNS:
+        marked = pc.replace_substring_regex(lines, pattern=pattern, replacement=f"{SEPARATOR}\\0{SEPARATOR}")
+        found = pc.split_pattern(marked, SEPARATOR)
+        offsets = found.offsets.to_numpy()
+        lengths = np.diff(offsets)
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        positions = np.arange(offsets[-1] - offsets[0]) - np.repeat(offsets[:-1] - offsets[0], lengths)
+        keep = positions % 2 == 1
+        values = pc.list_flatten(found).filter(pa.array(keep))
+        variables.append((kind, rows[keep], positions[keep] // 2, values))
+        # the same items with the values replaced, joined back
+        masked = pc.if_else(pa.array(keep), PLACEHOLDERS[kind], pc.list_flatten(found))
+        lines = pc.binary_join(pa.ListArray.from_arrays(found.offsets, masked, mask=found.is_null()), "")
+    return lines, variables
+
+def _ranks(columns):
+    """
+    Rank of every row when sorted by the columns in order
+    """
+    order = pc.sort_indices(pa.table(columns), sort_keys=[(name, "ascending") for name in columns]).to_numpy()
+    ranks = np.empty(len(order))
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+def sort_keys(kind, values):
+    """
+    Numeric keys of masked values that order them like VariableRange.KEYS
+    """
+    if kind == "NUM":
+        return pc.cast(values, pa.float64()).to_numpy(zero_copy_only=False)
+    if kind == "IP":
+        # octets of the pattern have up to three digits, so base 1000 keeps the tuple order
+        octets = pc.cast(pc.list_flatten(pc.split_pattern(values, ".")), pa.float64())
+        return octets.to_numpy().reshape(-1, 4) @ np.array([1e9, 1e6, 1e3, 1.0])
+    if kind == "TIME":
+        # ISO timestamps (no month name) first, by their text; "Aug 01 08:41:41" by month number, then text
+        month = pc.index_in(pc.utf8_slice_codeunits(values, 0, 3), value_set=pa.array(list(MONTHS)))
+        rest = pc.if_else(pc.is_null(month), values, pc.utf8_slice_codeunits(values, 3))
+        month = pc.fill_null(month, -1)
+        return _ranks({"month": month, "rest": rest})
+    # hex values by their digits without leading zeros: the shorter the smaller, then by text
+    digits = pc.utf8_ltrim(pc.utf8_lower(pc.utf8_slice_codeunits(values, 2)), characters="0")
+    return _ranks({"length": pc.utf8_length(digits), "digits": digits})
+
+def _time_key(value):
+    # "Aug 01 08:41:41" sorts by month number, ISO timestamps sort as text
+    month = MONTHS.get(value[:3])
+    return (month, value[3:]) if month is not None else (-1, value)
+
+def _ip_key(value):
+    return tuple(int(part) for part in value.split("."))
+
+def _hex_key(value):
+    return int(value, 16)
+
+class VariableRange:
+    """
+    Lowest and highest value seen in one masked variable slot of a template
+    """
+    __slots__ = ("kind", "low", "high", "low_key", "high_key")
+
+    KEYS = {
+        "TIME": _time_key,
+        "IP": _ip_key,
+        "HEX": _hex_key,
+        "NUM": float,
+    }
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.low = self.high = self.low_key = self.high_key = None
+
+    def add(self, value):
+        key = self.KEYS[self.kind](value)
+        if self.low is None or key < self.low_key:
+            self.low, self.low_key = value, key
+        if self.high is None or key > self.high_key:
+            self.high, self.high_key = value, key
+
+    def render(self):
+        return self.low if self.low == self.high else f"{self.low} .. {self.high}"
+
+class LogTemplate:
+    """
+    A cluster of log lines sharing a template, with its line count and the values of its variable parts
+    """
+
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+        self.count = 0
+        # values of the positions merged into wildcards, e.g. user names, by token position
+        self.wildcards = {}
+        # ranges of the masked variables, e.g. ("IP", 1) for the second IP of the line
+        self.ranges = {}
+
+    @property
+    def template(self):
+        """
+        Template text, with numbered wildcards <*1>, <*2>... matching the rendered value lists
+        """
+        tokens, ordinal = [], 0
+        for token in self.tokens:
+            if token == WILDCARD:
+                ordinal += 1
+                token = f"<*{ordinal}>"
+            tokens.append(token)
+        return " ".join(tokens)
+
+    def similarity(self, tokens):
+        """
+        Share of positions where the line has the template's token; wildcards match anything
+        """
+        same = sum(1 for mine, theirs in zip(self.tokens, tokens) if mine == theirs or mine == WILDCARD)
+        return same / len(tokens)
+
+    def merge(self, tokens, count):
+        """
+        Add count lines with these (masked) tokens, turning the positions that differ into wildcards
+        """
+        for i, (mine, theirs) in enumerate(zip(self.tokens, tokens)):
+            if mine != theirs and mine != WILDCARD:
+                # the values seen so far at this position are the template's token, count times
+                self.wildcards[i] = Counter({mine: self.count})
+                self.tokens[i] = WILDCARD
+            if self.tokens[i] == WILDCARD:
+                self.wildcards[i][theirs] += count
+        self.count += count
+
+    def variable(self, kind, ordinal):
+        """
+        Range of the ordinal-th masked variable of a kind, created when first seen
+        """
+        if (kind, ordinal) not in self.ranges:
+            self.ranges[kind, ordinal] = VariableRange(kind)
+        return self.ranges[kind, ordinal]
+
+    def render(self, max_values=3):
+        """
+        The template with its count and the ranges of its variable parts, as a single line
+        """
+        details = []
+        for (kind, ordinal), variable in sorted(self.ranges.items()):
+            details.append(f"{kind}{ordinal + 1 if (kind, 1) in self.ranges else ''}: {variable.render()}")
+        for ordinal, (_, counts) in enumerate(sorted(self.wildcards.items()), 1):
+            top = ", ".join(f"{value} ({count})" for value, count in counts.most_common(max_values))
+            more = f", +{len(counts) - max_values} more" if len(counts) > max_values else ""
+            details.append(f"<*{ordinal}>: {top}{more}")
+        line = f"{self.count} x {self.template}"
+        return f"{line} | {'; '.join(details)}" if details else line
+
+class TemplateMiner:
+    """
+    Online, Drain-style log template mining
+
+    Lines are masked (timestamps, IPs, numbers), then grouped by their masked text, so each
+    distinct masked line is clustered once per chunk however often it occurs. Clustering walks a
+    fixed-depth tree keyed by token count and leading tokens and joins the most similar template
+    of the leaf, if similar enough, turning the tokens that differ into wildcards. The variable
+    ranges are the lowest and highest value over every line, found with a grouped min/max.
+    """
+
+    def __init__(self, depth=None, similarity=None, max_children=100, max_templates=None):
+        """
+        Args:
+            depth: leading tokens used to route a line through the tree
+            similarity: share of equal tokens needed to join a template, between 0 and 1
+            max_children: children per tree node; further distinct tokens share a wildcard branch
+            max_templates: templates kept; once reached, lines that match none are only counted
+        """
+        self.depth = depth or config.LOG_TEMPLATE_DEPTH
+        self.similarity = similarity or config.LOG_TEMPLATE_SIMILARITY
+        self.max_children = max_children
+        self.max_templates = max_templates or config.LOG_TEMPLATE_MAX_TEMPLATES
+        self.templates = []
+        self.total_lines = 0
+        self.total_chars = 0
+        self.unmatched_lines = 0
+        self._tree = {}
+        # masked line -> template, so repeated lines skip the tree
+        self._known = {}
+        # approximate memory held by _known
+        self._known_bytes = 0
+
+    def _leaf(self, tokens):
+        node = self._tree.setdefault(len(tokens), {})
+        for token in tokens[:self.depth]:
+            if any(char.isdigit() for char in token):
+                token = WILDCARD
+            if token not in node:
+                token = token if len(node) < self.max_children else WILDCARD
+            node = node.setdefault(token, {})
+        return node.setdefault(None, [])
+
+    def _match(self, masked):
+        """
+        Template of a masked line and the line's tokens, creating a template if none is similar
+        enough; None once max_templates is reached
+        """
+        tokens = masked.split() or [""]
+        leaf = self._leaf(tokens)
+        best, best_similarity = None, self.similarity
+        for candidate in leaf:
+            similarity = candidate.similarity(tokens)
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is None:
+            if len(self.templates) >= self.max_templates:
+                return None
+            best = LogTemplate(tokens)
+            leaf.append(best)
+            self.templates.append(best)
+        if len(self._known) >= KNOWN_LINES_LIMIT:
+            self._known.clear()
+            self._known_bytes = 0
+        self._known[masked] = (best, tokens)
+        self._known_bytes += sys.getsizeof(masked) + sys.getsizeof(tokens) + sum(map(sys.getsizeof, tokens)) + KNOWN_ENTRY_BYTES
+        return best, tokens
+
+    def add(self, lines):
+        """
+        Cluster a chunk of log lines
+
+        Args:
+            lines: list of log lines
+        """
+        if not len(lines):
+            return
+        array = pa.array(lines, pa.string())
+        self.total_lines += len(lines)
+        self.total_chars += pc.sum(pc.utf8_length(array)).as_py()
+        masked_lines, variables = mask_variables(array)
+        encoded = masked_lines.dictionary_encode()
+        codes = encoded.indices.to_numpy(zero_copy_only=False)
+        counts = np.bincount(codes)
+        # template of every masked line, as an index into chunk_templates, -1 when unmatched
+        chunk_templates = {}
+        template_of_code = np.full(len(counts), -1, dtype=np.int64)
+        for code, masked in enumerate(encoded.dictionary.to_pylist()):
+            match = self._known.get(masked) or self._match(masked)
+            if match is None:
+                self.unmatched_lines += int(counts[code])
+                continue
+            template, tokens = match
+            template.merge(tokens, int(counts[code]))
+            template_of_code[code] = chunk_templates.setdefault(template, len(chunk_templates))
+        self._add_ranges(variables, template_of_code[codes], list(chunk_templates))
+
+    def _add_ranges(self, variables, line_templates, templates):
+        """
+        Fold the lowest and highest value of every variable slot of every template into its ranges
+
+        Args:
+            variables: masked values of the chunk's lines, from mask_variables
+            line_templates: index into templates of every line, -1 for unmatched lines
+            templates: LogTemplates of the chunk
+        """
+        for kind, rows, ordinals, values in variables:
+            templates_of_values = line_templates[rows]
+            keys = sort_keys(kind, values)
+            positions = np.flatnonzero(templates_of_values >= 0)
+            if not len(positions):
+                continue
+            # sorted by slot, then key: the first and last value of each slot are its min and max
+            order = positions[np.lexsort((keys[positions], templates_of_values[positions], ordinals[positions]))]
+            slots = np.stack([ordinals[order], templates_of_values[order]])
+            starts = np.flatnonzero(np.r_[True, (slots[:, 1:] != slots[:, :-1]).any(axis=0)])
+            ends = np.r_[starts[1:], len(order)] - 1
+            lows = values.take(pa.array(order[starts])).to_pylist()
+            highs = values.take(pa.array(order[ends])).to_pylist()
+            for ordinal, template, low, high in zip(*slots[:, starts].tolist(), lows, highs):
+                variable = templates[template].variable(kind, ordinal)
+                variable.add(low)
+                variable.add(high)
+
+    def size_bytes(self):
+        """
+        Approximate memory held by the templates, their values and the cache of known lines
+        """
+        size = self._known_bytes
+        for template in self.templates:
+            # the tokens, once in the template and once as keys of the tree
+            size += 2 * (sys.getsizeof(template.tokens) + sum(map(sys.getsizeof, template.tokens)))
+            size += COUNT_ENTRY_BYTES * sum(len(values) for values in template.wildcards.values())
+            size += VARIABLE_RANGE_BYTES * len(template.ranges)
+        return size
+
+    def top(self, n=None):
+        """
+        Templates by decreasing line count
+        """
+        ranked = sorted(self.templates, key=lambda template: template.count, reverse=True)
+        return ranked[:n] if n else ranked
+
+    def lines(self, n=None):
+        """
+        Rendered templates, most frequent first, in place of the raw lines
+        """
+        rendered = [template.render() for template in self.top(n)]
+        if self.unmatched_lines:
+            rendered.append(f"{self.unmatched_lines} x lines of other, rarer templates")
+        return rendered
+
+    def stats(self):
+        """
+        Lines and templates seen, and how much smaller the rendered templates are than the raw lines
+        """
+        rendered_chars = sum(len(line) + 1 for line in self.lines())
+        return {
+            "lines": self.total_lines,
+            "templates": len(self.templates),
+            "line_compression": round(self.total_lines / max(len(self.templates), 1), 1),
+            "char_compression": round(self.total_chars / max(rendered_chars, 1), 1),
+        }
+
+    def render(self, n=None):
+        """
+        Top templates as a text block, with the compression achieved
+        """
+        stats = self.stats()
+        header = (f"{stats['lines']} lines in {stats['templates']} templates "
+                  f"({stats['line_compression']}x fewer lines). Format: count x template | variable ranges")
+        return "\n".join([header] + self.lines(n))
@@ -1,17 +1,203 @@
 #src/logs_analysis.py
 from src.custom_exception import CustomException
-from prompt_templates.templates import logs_analysis, identify_anomalies
-from difflib import SequenceMatcher
-import requests
-from difflib import HtmlDiff
+from src.tokens import pack_by_tokens
+from src.timestamps import parse_timestamps
+from src.anomaly_detection import COUNT_ENTRY_BYTES, AnomalyDetector
+from src.ip_enrichment import IPEnrichment, get_ip_tagger
+from src.cache import get_cache, make_key
+from src.llm_client import get_llm_client
+from src.llm_scheduler import ANOMALIES, llm_priority
+from src.log_parsers import EVENT_COLUMNS, detect_parser, format_event
+from src.log_templates import TemplateMiner
+from src import config
+from src import metrics
+from prompt_templates.templates import logs_analysis, identify_anomalies, merge_analyses, logs_statistics_analysis, escalate_anomalies
+from prompt_templates.templates import TEMPLATE_VERSION
+import contextvars
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, deque
 import os
+import sys
+import numpy as np
 import pandas as pd
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NO_ANOMALIES_MESSAGE = "No anomalies were flagged by the rule-based prefilter."
+# approximate memory of one per-minute count, keyed by a Timestamp
+MINUTE_ENTRY_BYTES = 220
+
+class LogStatistics:
+    """
+    Incremental, vectorized aggregates over log chunks, rendered as a compact text summary for the LLM
+
+    Counts are kept in Counters updated with each chunk's value counts, so a chunk costs time
+    proportional to its own distinct values rather than to everything counted before.
+    """
+    GROUP_COLUMNS = ("severity", "log_type", "event_type", "host", "source_ip", "destination_ip", "user")
+    RARE_COLUMNS = ("event_type",)
+
+    def __init__(self, top_n=10, rare_max_count=2, sample_size=50, seed=0):
+        """
+        Args:
+            top_n: number of values listed per aggregate
+            rare_max_count: values seen at most this many times are reported as rare
+            sample_size: number of raw log lines kept as a uniform random sample
+            seed: seed for the sampling RNG, so summaries are reproducible
+        """
+        self.top_n = top_n
+        self.rare_max_count = rare_max_count
+        self.sample_size = sample_size
+        self.total_rows = 0
+        self.counts = {}
+        self.per_minute = Counter()
+        self._rng = np.random.default_rng(seed)
+        self._sample_keys = np.empty(0)
+        self._sample_lines = np.empty(0, dtype=object)
+        # lines clustered into templates, when template mining is enabled
+        self.templates = TemplateMiner() if config.LOG_TEMPLATES else None
+        # internal/external, asset subnet and blocklist tags of the addresses, when IP enrichment is enabled
+        self.ip_enrichment = IPEnrichment(top_n=top_n) if config.IP_ENRICHMENT else None
+
+    def update(self, chunk, lines, enrich=True):
+        """
+        Fold a chunk of logs into the running aggregates
+
+        Args:
+            chunk: DataFrame of raw log rows
+            lines: formatted log lines of the same rows
+            enrich: also update ip_enrichment; False when the caller already did
+        """
+        self.total_rows += len(chunk)
+
+        for column in self.GROUP_COLUMNS:
+            if column in chunk.columns:
+                self.counts.setdefault(column, Counter()).update(chunk[column].value_counts().to_dict())
+
+        if "timestamp" in chunk.columns:
+            timestamps = parse_timestamps(chunk["timestamp"]).dropna()
+            self.per_minute.update(timestamps.dt.floor("min").value_counts().to_dict())
+
+        # uniform sample over the whole stream: keep the lines with the smallest random keys
+        keys = np.concatenate([self._sample_keys, self._rng.random(len(lines))])
+        pool = np.concatenate([self._sample_lines, np.asarray(lines, dtype=object)])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            keys, pool = keys[keep], pool[keep]
+        self._sample_keys, self._sample_lines = keys, pool
+
+        if self.templates is not None:
+            with metrics.span("templates", len(lines)):
+                self.templates.add(lines)
+
+        if self.ip_enrichment is not None and enrich:
+            with metrics.span("ip_enrichment", len(chunk)):
+                self.ip_enrichment.update(chunk)
+
+    def size_bytes(self):
+        """
+        Approximate memory held by the aggregates, the sample, the templates and the IP counts
+        """
+        size = COUNT_ENTRY_BYTES * sum(len(counts) for counts in self.counts.values())
+        size += MINUTE_ENTRY_BYTES * len(self.per_minute)
+        size += sum(sys.getsizeof(line) for line in self._sample_lines)
+        if self.templates is not None:
+            size += self.templates.size_bytes()
+        if self.ip_enrichment is not None:
+            size += self.ip_enrichment.size_bytes()
+        return size
+
+    def top(self, column):
+        """
+        Most frequent values of a column as (value, count) pairs
+        """
+        # ties in value order, so the summary does not depend on the order chunks arrived in
+        top = sorted(self.counts.get(column, Counter()).items(), key=lambda item: (-item[1], str(item[0])))
+        return [(value, int(count)) for value, count in top[:self.top_n]]
+
+    def rare(self, column):
+        """
+        Values of a column seen at most rare_max_count times, as (value, count) pairs
+        """
+        rare = sorted(((value, count) for value, count in self.counts.get(column, Counter()).items()
+                       if count <= self.rare_max_count), key=lambda item: (item[1], str(item[0])))
+        return [(value, int(count)) for value, count in rare[:self.top_n]]
+
+    def samples(self):
+        """
+        Uniformly sampled raw log lines
+        """
+        return self._sample_lines.tolist()
+
+    def render(self):
+        """
+        Render the aggregates as a compact text summary
+        """
+        sections = [f"Total events: {self.total_rows}"]
+
+        if self.per_minute:
+            per_minute = pd.Series(self.per_minute).sort_index()
+            busiest = per_minute.nlargest(self.top_n)
+            sections.append(
+                f"Time range: {per_minute.index[0]} to {per_minute.index[-1]}\n"
+                f"Events per minute over {len(per_minute)} active minutes: "
+                f"mean {per_minute.mean():.2f}, max {int(per_minute.max())}\n"
+                "Busiest minutes: " + ", ".join(f"{minute} ({int(count)})" for minute, count in busiest.items())
+            )
+
+        for column in self.GROUP_COLUMNS:
+            if len(self.counts.get(column, ())):
+                distinct = len(self.counts[column])
+                top = ", ".join(f"{value} ({count})" for value, count in self.top(column))
+                sections.append(f"Top {column} ({distinct} distinct): {top}")
+
+        for column in self.RARE_COLUMNS:
+            rare = self.rare(column)
+            if rare:
+                listed = ", ".join(f"{value} ({count})" for value, count in rare)
+                sections.append(f"Rare {column} (seen at most {self.rare_max_count} times): {listed}")
+
+        if self.ip_enrichment is not None and self.ip_enrichment.render():
+            sections.append(self.ip_enrichment.render())
+
+        if self.templates is not None and self.templates.templates:
+            sections.append("Top log templates, " + self.templates.render(config.LOG_TEMPLATE_TOP_N))
+
+        return "\n".join(sections)
+
 
 class DocumentAnalysis:
-    def __init__(self, file_path):
+    REDUCE_STRATEGIES = ("llm", "concat")
+
+    def __init__(self, file_path, chunksize=50_000, chunk_tokens=None, max_concurrency=None, reduce_strategy=None,
+                 ollama_url=None, summarize=None, cache=None, llm_client=None, parser=None):
+        """
+        Args:
+            file_path: path of the logs file, in any format of the parser registry (src/log_parsers.py)
+            chunksize: events read from the file per chunk
+            chunk_tokens: token budget of each log chunk sent to the LLM
+            max_concurrency: number of chunk analyses in flight at once
+            reduce_strategy: "llm" merges partial analyses with the model, "concat" joins them as-is
+            ollama_url: base URL of the Ollama server, or a local stand-in
+            summarize: send aggregated statistics plus sampled lines instead of every log line
+            cache: ResultCache for analyses and prompt completions, defaults to the process-wide cache
+            llm_client: LLMClient used for every model call, defaults to the shared client for ollama_url
+            parser: LogParser of the file, detected from its header or first lines when omitted
+        """
         self.file_path = file_path
+        self.chunksize = chunksize
+        self.chunk_tokens = chunk_tokens or config.ANALYSIS_CHUNK_TOKENS
+        self.max_concurrency = max_concurrency or config.ANALYSIS_MAX_CONCURRENCY
+        self.reduce_strategy = reduce_strategy or config.ANALYSIS_REDUCE_STRATEGY
+        self.ollama_url = ollama_url or config.OLLAMA_URL
+        self.llm = llm_client or get_llm_client(self.ollama_url)
+        self.summarize = config.ANALYSIS_SUMMARIZE if summarize is None else summarize
+        self.cache = get_cache() if cache is None else cache
+        self._parser = parser
+
+        if self.reduce_strategy not in self.REDUCE_STRATEGIES:
+            raise ValueError(f"Unknown reduce strategy '{self.reduce_strategy}', expected one of {self.REDUCE_STRATEGIES}")
 
     def extract_text(self, txt_path):
         """
@@ -36,72 +222,405 @@ class DocumentAnalysis:
         Format a single log entry for better readability
         """
         try:
-            return (
-                f"[{row['timestamp']}] ({row['log_type']}, {row['event_type']}) "
-                f"Severity: {row['severity']} | "
-                f"{row['event_type']} from {row['source_ip']} to {row['destination_ip']} "
-                f"using user '{row['user']}'. Message: {row['message']}"
-            )
+            extras = [(name, value) for name, value in row.items() if name not in EVENT_COLUMNS]
+            return format_event(*(row.get(name) for name in EVENT_COLUMNS), extras=extras)
         except Exception as e:
             raise CustomException("Failed to format log entry", e)  
 
+    def format_logs(self, df):
+        """
+        Format every log entry of a DataFrame at once, byte-identical to format_log
+
+        Works column-wise over NumPy object arrays instead of building a Series per row.
+        df.to_numpy() applies the same dtype interleaving as df.apply(axis=1), so numbers
+        render exactly as they would in the row-wise path.
+
+        Args:
+            df: normalized event table, see src/log_parsers.py
+
+        Output:
+            list: formatted log lines
+        """
+        try:
+            values = df.to_numpy()
+            missing = np.full(len(df), None, dtype=object)
+            column = {name: values[:, i] for i, name in enumerate(df.columns)}
+            extra_names = [name for name in df.columns if name not in EVENT_COLUMNS]
+            host_missing = "host" not in df.columns or df["host"].isna().all()
+            present = ["timestamp", "log_type", "event_type", "severity", "source_ip", "destination_ip", "user", "message"]
+            if not extra_names and host_missing and set(present) <= set(df.columns) and df[present].notna().all().all():
+                # fast path for network events, where format_event always takes the same branches
+                return [
+                    f"[{timestamp}] ({log_type}, {event_type}) "
+                    f"Severity: {severity} | "
+                    f"{event_type} from {source_ip} to {destination_ip} "
+                    f"using user '{user}'. Message: {message}"
+                    for timestamp, log_type, event_type, severity, source_ip, destination_ip, user, message in zip(
+                        column['timestamp'], column['log_type'], column['event_type'], column['severity'],
+                        column['source_ip'], column['destination_ip'], column['user'], column['message'],
+                    )
+                ]
+            extra_rows = zip(*(column[name] for name in extra_names)) if extra_names else [()] * len(df)
+            return [
+                format_event(*event, extras=zip(extra_names, extras))
+                for *event, extras in zip(*(column.get(name, missing) for name in EVENT_COLUMNS), extra_rows)
+            ]
+        except Exception as e:
+            raise CustomException("Failed to format log entries", e)
+
+    @property
+    def parser(self):
+        """
+        LogParser of the file, detected on first use
+        """
+        if self._parser is None:
+            self._parser = detect_parser(self.file_path)
+        return self._parser
+
+    def iter_log_chunks(self):
+        """
+        Read the logs file as normalized event chunks, so peak memory depends on chunksize rather than file size
+
+        Output:
+            generator: DataFrames of at most chunksize events
+        """
+        try:
+            yield from metrics.timed_chunks("parse", self.parser.iter_chunks(self.file_path, self.chunksize))
+        except Exception as e:
+            raise CustomException("Failed to read logs file", e)
+
+    def iter_formatted_logs(self):
+        """
+        Stream formatted log lines chunk by chunk
+
+        Output:
+            generator: list of formatted log lines per chunk
+        """
+        for chunk in self.iter_log_chunks():
+            yield self.format_logs(chunk)
+
+    def iter_log_lines(self):
+        """
+        Stream formatted log lines one at a time
+        """
+        for lines in self.iter_formatted_logs():
+            yield from lines
+
+    def scan(self, index=None):
+        """
+        Single streaming pass that feeds both the statistics summary and the anomaly prefilter
+
+        Args:
+            index: optional LogIndex that is filled with the formatted lines in the same pass
+
+        Output:
+            tuple: (LogStatistics, AnomalyDetector)
+        """
+        statistics = LogStatistics(top_n=config.SUMMARY_TOP_N, sample_size=config.SUMMARY_SAMPLE_SIZE)
+        # the detector reports the blocklist hits counted by the statistics in the same pass
+        detector = AnomalyDetector(ip_enrichment=statistics.ip_enrichment)
+        for chunk in self.iter_log_chunks():
+            with metrics.span("format", len(chunk)):
+                lines = self.format_logs(chunk)
+            with metrics.span("aggregate", len(chunk)):
+                statistics.update(chunk, lines)
+                detector.update(chunk)
+            if index is not None:
+                with metrics.span("index", len(lines)):
+                    index.add(lines)
+        return statistics, detector
+
+    def build_index(self, index):
+        """
+        Fill a LogIndex with the formatted log lines
+        """
+        for lines in self.iter_formatted_logs():
+            with metrics.span("index", len(lines)):
+                index.add(lines)
+        return index
+
+    def compute_statistics(self):
+        """
+        Aggregate the whole file into a LogStatistics summary in a single streaming pass
+        """
+        return self.scan()[0]
+
+    def collect_flagged_lines(self, findings, limit=None, chunks=None):
+        """
+        Collect the formatted log lines that fall inside the windows flagged by the prefilter
+
+        Args:
+            findings: findings from AnomalyDetector.findings()
+            limit: maximum number of lines returned
+            chunks: event chunks to search, the whole file when omitted
+
+        Output:
+            list: formatted log lines, at most limit
+        """
+        with metrics.span("collect_flagged_lines"):
+            return self._collect_flagged_lines(findings, limit, chunks)
+
+    def _collect_flagged_lines(self, findings, limit, chunks):
+        limit = limit or config.ANOMALY_MAX_ESCALATED_LINES
+        targeted = [finding for finding in findings if finding["column"]]
+        collected = []
+        for chunk in (self.iter_log_chunks() if chunks is None else chunks):
+            timestamps = parse_timestamps(chunk["timestamp"]) if "timestamp" in chunk.columns else None
+            mask = pd.Series(False, index=chunk.index)
+            for finding in targeted:
+                if finding["column"] not in chunk.columns:
+                    continue
+                selected = chunk[finding["column"]].astype(str) == finding["value"]
+                if finding["window_start"] and timestamps is not None:
+                    selected &= (timestamps >= pd.Timestamp(finding["window_start"])) & \
+                                (timestamps < pd.Timestamp(finding["window_end"]))
+                mask |= selected
+            if mask.any():
+                collected.extend(self.format_logs(chunk[mask])[:limit - len(collected)])
+            if len(collected) >= limit:
+                break
+        return collected
+
+    def analysed_lines(self, statistics):
+        """
+        Log lines sent to the LLM when not summarizing: the mined templates, or else every formatted
+        line, after the IP enrichment summary
+
+        Args:
+            statistics: LogStatistics from scan()
+        """
+        enrichment = statistics.ip_enrichment.render().splitlines() if statistics.ip_enrichment is not None else []
+        if statistics.templates is not None:
+            return enrichment + statistics.templates.lines()
+        return itertools.chain(enrichment, self.iter_log_lines())
+
     def get_information_from_datasets(self):
         """
         Get information from datasets
         """
         try:
-            df=pd.read_csv(self.file_path)
-            df['formatted_log'] = df.apply(self.format_log, axis=1)
-            return "\n".join(df['formatted_log'].tolist())
+            return "\n".join(line for lines in self.iter_formatted_logs() for line in lines)
         except Exception as e:
-            raise CustomException("Failed to read CSV file", e)
+            raise CustomException("Failed to read logs file", e)
 
 
-    def analyse_logs(self, logs):
+    def generate(self, prompt, on_token=None):
+        """
+        Send a single prompt to the Ollama /api/generate endpoint
+
+        Args:
+            prompt: full prompt text
+            on_token: optional callback receiving response text pieces as the model streams them
+
+        Output:
+            string: model response
+        """
+        key = make_key(self.llm.model, config.OLLAMA_NUM_CTX, prompt)
+        if self.cache:
+            cached = self.cache.get("prompts", key)
+            if config.METRICS_ENABLED:
+                metrics.registry.inc("prompt_cache_lookups_total", help="Prompt cache lookups",
+                                     result="miss" if cached is None else "hit")
+            if cached is not None:
+                if on_token:
+                    on_token(cached)
+                return cached
+
+        options = {'num_ctx': config.OLLAMA_NUM_CTX}
+        if on_token:
+            pieces = []
+            for piece in self.llm.stream_generate(prompt, options=options):
+                pieces.append(piece)
+                on_token(piece)
+            result = "".join(pieces)
+        else:
+            result = self.llm.generate(prompt, options=options)['response']
+
+        if self.cache:
+            self.cache.set("prompts", key, result)
+        return result
+
+    def chunk_logs(self, logs):
+        """
+        Split logs into chunks that fit the chunk token budget
+
+        Args:
+            logs: string of newline separated logs, or an iterable of log lines
+
+        Output:
+            generator: newline joined log chunks
         """
-        Analyzes changes using llama 3.1
+        lines = logs.splitlines() if isinstance(logs, str) else logs
+        for batch in pack_by_tokens(lines, self.chunk_tokens):
+            yield "\n".join(batch)
+
+    def _generate_all(self, prompts):
+        """
+        Run prompts concurrently, at most max_concurrency in flight, returning responses in order
+        """
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            pending = deque()
+            for prompt in prompts:
+                # a copy of the context per call, so the calls are traced with the job that made them
+                pending.append(pool.submit(contextvars.copy_context().run, self.generate, prompt))
+                if len(pending) >= self.max_concurrency * 2:
+                    results.append(pending.popleft().result())
+            results.extend(future.result() for future in pending)
+        return results
+
+    def reduce_analyses(self, analyses, on_token=None):
+        """
+        Merge partial chunk analyses into a single analysis
+
+        With the "llm" strategy partials are merged in token-budgeted groups, level by level,
+        until a single analysis remains. Only the final merge is streamed to on_token.
+        """
+        if len(analyses) == 1 or self.reduce_strategy == "concat":
+            result = analyses[0] if len(analyses) == 1 else "\n\n".join(
+                f"Chunk {i}/{len(analyses)}:\n{analysis}" for i, analysis in enumerate(analyses, 1)
+            )
+            if on_token:
+                on_token(result)
+            return result
+
+        while len(analyses) > 1:
+            groups = list(pack_by_tokens(analyses, self.chunk_tokens, min_items=2))
+            if len(groups) == 1:
+                return self.generate(merge_analyses(groups[0]), on_token)
+            merged = self._generate_all(merge_analyses(group) for group in groups if len(group) > 1)
+            # a trailing single-item group has nothing to merge with and is carried to the next level
+            if len(groups[-1]) == 1:
+                merged.append(groups[-1][0])
+            analyses = merged
+        return analyses[0]
+
+    def analyse_logs(self, logs, on_token=None):
+        """
+        Analyzes logs using llama 3.1, map-reducing over token-budgeted chunks
         
         Args:
-            logs: String consisting network logs
+            logs: String consisting network logs, or an iterable of log lines
+            on_token: optional callback receiving the final analysis text as it is produced
 
         Output:
             string: Analysis of network logs
         """
-        prompt = logs_analysis(logs)
-        
-        response = requests.post('http://localhost:11434/api/generate',
-                                json={
-                                    'model': 'llama3.1:8b-instruct-q4_K_M',
-                                    'prompt': prompt,
-                                    'stream': False
-                                })
-        
-        return response.json()['response']
+        with metrics.span("analyse_logs"):
+            partials = self._generate_all(logs_analysis(chunk) for chunk in self.chunk_logs(logs))
+            if not partials:
+                raise ValueError("No logs to analyse")
+
+            return self.reduce_analyses(partials, on_token)
     
-    def identify_anomalies(self, logs_analysis):
+    def analyse_statistics(self, statistics, on_token=None):
+        """
+        Analyzes a compact statistical summary of the logs using llama 3.1
+
+        Args:
+            statistics: LogStatistics computed over the logs
+            on_token: optional callback receiving analysis text pieces as the model streams them
+
+        Output:
+            string: Analysis of network logs
+        """
+        with metrics.span("analyse_logs"):
+            prompt = logs_statistics_analysis(statistics.render(), "\n".join(statistics.samples()))
+
+            return self.generate(prompt, on_token)
+
+    def identify_anomalies(self, logs_analysis, findings=None, on_token=None, chunks=None, flagged_lines=None):
         """        
         Identifies anomalies in the logs analysis using llama 3.1
+
+        Args:
+            logs_analysis: analysis produced by analyse_logs / analyse_statistics
+            findings: prefilter findings; when given, the LLM only sees the flagged windows and
+                      is skipped entirely if nothing was flagged
+            on_token: optional callback receiving report text pieces as the model streams them
+            chunks: event chunks the flagged lines are taken from, the whole file when omitted
+            flagged_lines: lines inside the flagged windows when already collected, e.g. in a worker process
+
+        Output:
+            string: anomalies report
+        """
+        with metrics.span("identify_anomalies"), llm_priority(ANOMALIES):
+            if findings is None:
+                return self.generate(identify_anomalies(logs_analysis), on_token)
+
+            if not findings:
+                if on_token:
+                    on_token(NO_ANOMALIES_MESSAGE)
+                return NO_ANOMALIES_MESSAGE
+
+            if flagged_lines is None:
+                flagged_lines = self.collect_flagged_lines(findings, chunks=chunks)
+            prompt = escalate_anomalies(logs_analysis, json.dumps(findings, indent=1), "\n".join(flagged_lines))
+            return self.generate(prompt, on_token)
+
+    def result_key(self):
         """
-        prompt = identify_anomalies(logs_analysis)
+        Cache key of a full analysis: the file contents plus everything that shapes the prompts
+        """
+        return make_key(
+            self.parser.digest(self.file_path), self.parser.name, self.llm.model, TEMPLATE_VERSION, self.summarize,
+            self.reduce_strategy, self.chunk_tokens, config.ANOMALY_PREFILTER, config.LOG_TEMPLATES,
+            get_ip_tagger().digest() if config.IP_ENRICHMENT else None,
+        )
 
-        response = requests.post('http://localhost:11434/api/generate',
-                                json={
-                                    'model': 'llama3.1:8b-instruct-q4_K_M',
-                                    'prompt': prompt,
-                                    'stream': False
-                                })
+    def run(self, progress=None, on_token=None, index=None):
+        """
+        Run the full pipeline: scan, analyse the logs, then identify anomalies
 
-        return response.json()['response']
+        Args:
+            progress: optional callback progress(stage, fraction) invoked as each stage starts
+            on_token: optional callback on_token(field, text) streaming the "logs_analysis" and
+                      "anomalies" texts as they are generated; text is None once a field is complete
+            index: optional LogIndex filled with the formatted log lines for retrieval in chat
 
-    def run(self):
+        Output:
+            dict: logs_analysis, anomalies and anomaly_findings
+        """
+        progress = progress or (lambda stage, fraction: None)
+        stream = (lambda field: (lambda text: on_token(field, text))) if on_token else (lambda field: None)
         try:
-            logs= self.get_information_from_datasets()
-            logs_analysis_result = self.analyse_logs(logs)
-            anomalies = self.identify_anomalies(logs_analysis_result)
-            return {
+            progress("checking cache", 0.0)
+            with metrics.span("cache_lookup"):
+                key = self.result_key() if self.cache else None
+                cached = self.cache.get("results", key) if key else None
+            if key:
+                if cached is not None:
+                    if index is not None:
+                        progress("indexing logs", 0.5)
+                        self.build_index(index)
+                    if on_token:
+                        for field in ("logs_analysis", "anomalies"):
+                            on_token(field, cached[field])
+                            on_token(field, None)
+                    return cached
+
+            progress("scanning logs", 0.05)
+            statistics, detector = self.scan(index)
+            progress("analysing logs", 0.3)
+            if self.summarize:
+                logs_analysis_result = self.analyse_statistics(statistics, stream("logs_analysis"))
+            else:
+                logs_analysis_result = self.analyse_logs(self.analysed_lines(statistics), stream("logs_analysis"))
+            if on_token:
+                on_token("logs_analysis", None)
+            findings = detector.findings() if config.ANOMALY_PREFILTER else None
+            progress("identifying anomalies", 0.7)
+            anomalies = self.identify_anomalies(logs_analysis_result, findings, stream("anomalies"))
+            if on_token:
+                on_token("anomalies", None)
+            results = {
                 "logs_analysis": logs_analysis_result,
-                "anomalies": anomalies
+                "anomalies": anomalies,
+                "anomaly_findings": findings or []
             }
+            if key:
+                self.cache.set("results", key, results)
+            return results
         
         except Exception as e:
             raise CustomException("Failed to extract and process logs", e)
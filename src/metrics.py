@@ -0,0 +1,310 @@
+#src/metrics.py
+from src import config
+import contextvars
+import cProfile
+import os
+import re
+import threading
+import time
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+PROFILE_HEADER = "X-Profile"
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms with labels, rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, help="", **labels):
+        """
+        Add value to the counter name{labels}
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            self._help.setdefault(name, help)
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, help="", **labels):
+        """
+        Record one observation in the histogram name{labels}
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, (buckets, {}))[1]
+            counts = series.get(key)
+            if counts is None:
+                # per bucket counts, then the sum and count of all observations
+                counts = series[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += value
+            counts[-1] += 1
+            self._help.setdefault(name, help)
+
+    def register_gauge(self, name, fn, help=""):
+        """
+        Gauge read when metrics are rendered; fn returns a number, or a list of (labels dict, number) tuples
+        """
+        with self._lock:
+            self._gauges[name] = fn
+            self._help[name] = help
+
+    @staticmethod
+    def _labels(key, extra=()):
+        pairs = list(key) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: (buckets, {key: list(counts) for key, counts in series.items()})
+                          for name, (buckets, series) in self._histograms.items()}
+            gauges = dict(self._gauges)
+            help = dict(self._help)
+
+        for name, series in sorted(counters.items()):
+            lines += [f"# HELP {name} {help.get(name, '')}", f"# TYPE {name} counter"]
+            lines += [f"{name}{self._labels(key)} {value}" for key, value in sorted(series.items())]
+        for name, (buckets, series) in sorted(histograms.items()):
+            lines += [f"# HELP {name} {help.get(name, '')}", f"# TYPE {name} histogram"]
+            for key, counts in sorted(series.items()):
+                for bound, count in zip(buckets, counts):
+                    lines.append(f"{name}_bucket{self._labels(key, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{self._labels(key, [('le', '+Inf')])} {counts[-1]}")
+                lines.append(f"{name}_sum{self._labels(key)} {counts[-2]}")
+                lines.append(f"{name}_count{self._labels(key)} {counts[-1]}")
+        for name, fn in sorted(gauges.items()):
+            lines += [f"# HELP {name} {help.get(name, '')}", f"# TYPE {name} gauge"]
+            try:
+                value = fn()
+            except Exception:
+                continue
+            series = value if isinstance(value, list) else [({}, value)]
+            lines += [f"{name}{self._labels(self._key(labels))} {float(value)}" for labels, value in series]
+        return "\n".join(lines) + "\n"
+
+def escape_label(value):
+    return re.sub(r'(["\\])', r"\\\1", str(value)).replace("\n", "\\n")
+
+registry = MetricsRegistry()
+
+class Trace:
+    """
+    Time, rows and LLM tokens per stage of one piece of work, e.g. an analysis job
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, rows=0):
+        with self._lock:
+            calls, total, total_rows = self.stages.get(stage, (0, 0.0, 0))
+            self.stages[stage] = (calls + 1, total + seconds, total_rows + rows)
+
+    def add_tokens(self, prompt_tokens, completion_tokens):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {"calls": calls, "seconds": round(seconds, 4), "rows": rows}
+                    for stage, (calls, seconds, rows) in self.stages.items()
+                },
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_profile_requested = contextvars.ContextVar("profile_requested", default=False)
+
+def start_trace():
+    """
+    Collect the spans of the current thread or task into a new Trace, until end_trace(token)
+
+    Output:
+        tuple: (Trace, token)
+    """
+    trace = Trace()
+    return trace, _current_trace.set(trace)
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+def current_trace():
+    return _current_trace.get()
+
+class Span:
+    """
+    Times a pipeline stage; set .rows inside the block to count the rows it processed
+    """
+    __slots__ = ("stage", "rows", "started")
+
+    def __init__(self, stage, rows=0):
+        self.stage = stage
+        self.rows = rows
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_stage(self.stage, time.perf_counter() - self.started, self.rows)
+
+class NullSpan:
+    """
+    Span used while metrics are disabled
+    """
+    rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+NULL_SPAN = NullSpan()
+
+def span(stage, rows=0):
+    """
+    Context manager timing a stage into the stage_seconds histogram and the current trace
+    """
+    return Span(stage, rows) if config.METRICS_ENABLED else NULL_SPAN
+
+def record_stage(stage, seconds, rows=0):
+    registry.observe("stage_seconds", seconds, help="Time spent per pipeline stage", stage=stage)
+    if rows:
+        registry.inc("rows_processed_total", rows, help="Log rows processed per pipeline stage", stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds, rows)
+
+def timed_chunks(stage, chunks):
+    """
+    Time the production of each chunk of an iterator (e.g. parsing) and count its rows
+    """
+    if not config.METRICS_ENABLED:
+        yield from chunks
+        return
+    iterator = iter(chunks)
+    while True:
+        started = time.perf_counter()
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        record_stage(stage, time.perf_counter() - started, len(chunk))
+        yield chunk
+
+def record_llm_call(endpoint, model, seconds, response):
+    """
+    Record latency and Ollama's token counts and durations of one model call
+
+    Args:
+        endpoint: API path, e.g. "/api/generate"
+        model: model name
+        seconds: wall time of the call
+        response: final JSON response (or done chunk of a stream)
+    """
+    if not config.METRICS_ENABLED:
+        return
+    labels = {"endpoint": endpoint, "model": model}
+    registry.inc("llm_requests_total", help="Ollama calls", **labels)
+    registry.observe("llm_request_seconds", seconds, help="Wall time of Ollama calls", **labels)
+    prompt_tokens = response.get("prompt_eval_count") or 0
+    completion_tokens = response.get("eval_count") or 0
+    registry.inc("llm_prompt_tokens_total", prompt_tokens, help="Prompt tokens evaluated by Ollama", **labels)
+    registry.inc("llm_completion_tokens_total", completion_tokens, help="Tokens generated by Ollama", **labels)
+    # Ollama reports durations in nanoseconds
+    if completion_tokens and response.get("eval_duration"):
+        registry.observe("llm_completion_tokens_per_second", completion_tokens / (response["eval_duration"] / 1e9),
+                         buckets=TOKENS_PER_SECOND_BUCKETS, help="Generation speed reported by Ollama", **labels)
+    if prompt_tokens and response.get("prompt_eval_duration"):
+        registry.observe("llm_prompt_tokens_per_second", prompt_tokens / (response["prompt_eval_duration"] / 1e9),
+                         buckets=TOKENS_PER_SECOND_BUCKETS, help="Prompt evaluation speed reported by Ollama", **labels)
+    if response.get("prompt_eval_duration"):
+        registry.observe("llm_prompt_eval_seconds", response["prompt_eval_duration"] / 1e9,
+                         help="Prompt evaluation time reported by Ollama, lower when a cached prefix is reused", **labels)
+    if response.get("load_duration"):
+        registry.observe("llm_load_seconds", response["load_duration"] / 1e9,
+                         help="Model load time reported by Ollama", **labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add("llm", seconds)
+        trace.add_tokens(prompt_tokens, completion_tokens)
+
+def record_llm_wait(priority, seconds):
+    """
+    Record the time an LLM call waited in the scheduler's queue for a free slot
+    """
+    if not config.METRICS_ENABLED:
+        return
+    registry.observe("llm_queue_wait_seconds", seconds, help="Time LLM calls waited for a free slot", priority=priority)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add("llm_queue", seconds)
+
+def record_request(method, path, status, seconds):
+    if config.METRICS_ENABLED:
+        registry.inc("http_requests_total", help="HTTP requests", method=method, path=path, status=status)
+        registry.observe("http_request_seconds", seconds, help="Time to response start of HTTP requests",
+                         method=method, path=path)
+
+def request_profiling(requested):
+    """
+    Mark the current request as profiled, so work it starts (e.g. background jobs) is profiled too
+    """
+    return _profile_requested.set(bool(requested) and config.PROFILING_ENABLED)
+
+def profiling_requested():
+    return _profile_requested.get()
+
+def end_profiling_request(token):
+    _profile_requested.reset(token)
+
+def start_profile():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def stop_profile(profiler, label):
+    """
+    Stop a profiler and dump its stats for snakeviz/pstats
+
+    Output:
+        string: path of the .prof file
+    """
+    profiler.disable()
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    name = re.sub(r"[^\w.-]+", "_", label).strip("_")
+    path = os.path.join(config.PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{os.getpid()}-{id(profiler)}.prof")
+    profiler.dump_stats(path)
+    return path
@@ -0,0 +1,241 @@
+#src/query_router.py
+from src.anomaly_detection import FAILED_LOGIN_EVENT_TYPES
+from src.event_store import IP_COLUMNS
+from src.event_table import TIME_BUCKETS, MISSING_TIME
+from src import config
+import re
+import pandas as pd
+
+IP_OR_CIDR = r"\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?"
+DATE = r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?"
+
+COUNTING = r"how many|count of|(?:total )?number of|count(?: the| all)?"
+# only questions asking for an explicit count or a top-N ranking are routed
+COUNT_PATTERN = re.compile(rf"\b(?:{COUNTING})\b", re.I)
+RANKING_PATTERN = re.compile(r"\btop\b", re.I)
+EVENTS_COUNT_PATTERN = re.compile(rf"\b(?:{COUNTING})\s+(?:log\s+)?(?:events?|logs?|entries|lines|records)\b", re.I)
+# questions asking for a judgement or advice, or several questions at once, go to the LLM
+ANALYTICAL_PATTERN = re.compile(
+    r"\b(?:why|what should|should (?:i|we)|how (?:do|can|should) (?:i|we)|explain\w*|suspicious\w*|attack\w*|"
+    r"compromis\w*|malicious|threats?|investigat\w*|recommend\w*)\b", re.I
+)
+MULTI_CLAUSE_PATTERN = re.compile(
+    r"\?\s*\S|;|\band\s+(?:what|which|why|how|who|where|when|whether|is|are|was|were|do|does|did|should|can|could|"
+    r"would|list|show|tell|explain|describe|give)\b", re.I
+)
+DIMENSIONS = (
+    ("destination_ip", r"destination(?: ip)?s?|destination ip addresses|targets?|target ips?"),
+    ("source_ip", r"source(?: ip)?s?|source ip addresses|ips?|ip addresses|addresses"),
+    ("event_type", r"event types?|types? of events?|events? types?|alerts?"),
+    ("log_type", r"log types?|types? of logs?|log sources?"),
+    ("severity", r"severit(?:y|ies)|levels?"),
+    ("user", r"users?|accounts?|usernames?"),
+    ("host", r"hosts?|hostnames?|computers?|machines?|servers?"),
+    ("hour", r"hours?|hourly"),
+    ("day", r"days?|daily"),
+    ("minute", r"minutes?"),
+)
+GROUP_PATTERNS = [
+    (column, re.compile(rf"\b(?:top(?:\s+(?P<limit>\d+))?|per|by|each|for each)\s+(?:\w+\s+)?(?:{words})\b", re.I))
+    for column, words in DIMENSIONS
+]
+# "how many users" asks for a number of distinct values, which the table does not count
+ENTITY_WORDS = "|".join(words for column, words in DIMENSIONS if column in IP_COLUMNS + ("user", "host"))
+DISTINCT_COUNT_PATTERN = re.compile(rf"\b(?:{COUNTING})\s+(?:(?:distinct|unique|different)\s+)?(?:{ENTITY_WORDS})\b", re.I)
+SOURCE_IP_PATTERN = re.compile(rf"\b(?:from|source(?: ip)?|by|src)\s+({IP_OR_CIDR})", re.I)
+DESTINATION_IP_PATTERN = re.compile(rf"\b(?:to|towards|destination(?: ip)?|targeting|against|dst)\s+({IP_OR_CIDR})", re.I)
+ANY_IP_PATTERN = re.compile(rf"(?<![\d.])({IP_OR_CIDR})(?![\d.])")
+USER_PATTERN = re.compile(r"\b(?:user|account|username)\s+['\"]?([\w.@$-]+)", re.I)
+HOST_PATTERN = re.compile(r"\b(?:host|hostname|computer|machine|server)\s+['\"]?([\w.-]+)", re.I)
+# words after "user" or "host" that are not a name, as in "events per user in the last hour"
+NOT_NAMES = {
+    "a", "an", "the", "and", "or", "in", "on", "at", "for", "from", "to", "with", "by", "per", "over",
+    "during", "since", "after", "before", "until", "between", "last", "past", "is", "are", "was", "were",
+    "has", "had", "have", "name", "names", "account", "accounts",
+}
+FAILED_LOGIN_PATTERN = re.compile(r"\b(failed|failing|unsuccessful) log ?(in|on)s?\b|\blog ?(in|on) failures?\b|\bbrute[ -]?force\b", re.I)
+LAST_PATTERN = re.compile(r"\b(?:last|past)\s+(\d+)?\s*(minute|hour|day)s?\b", re.I)
+BETWEEN_PATTERN = re.compile(rf"\bbetween\s+({DATE})\s+and\s+({DATE})", re.I)
+SINCE_PATTERN = re.compile(rf"\b(?:since|after|from)\s+({DATE})", re.I)
+BEFORE_PATTERN = re.compile(rf"\b(?:before|until)\s+({DATE})", re.I)
+ON_PATTERN = re.compile(r"\bon\s+(\d{4}-\d{2}-\d{2})(?![ T]\d)", re.I)
+DATE_PATTERN = re.compile(DATE)
+# time terms time_range does not turn into a range; questions using them go to the LLM
+UNRESOLVED_TIME_PATTERN = re.compile(
+    r"\b(?:yesterday|today|tonight|now|recent(?:ly)?|this (?:morning|afternoon|evening|week|month|year)|"
+    r"(?:last|past|previous) (?:\d+\s*)?(?:night|weeks?|months?|years?|weekend)|"
+    r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.? \d{1,2}(?:st|nd|rd|th)?|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b", re.I
+)
+
+COLUMN_LABELS = {
+    "source_ip": "source IP", "destination_ip": "destination IP", "event_type": "event type",
+    "log_type": "log type", "severity": "severity", "user": "user", "host": "host",
+}
+GROUP_LABELS = {
+    "source_ip": "source IPs", "destination_ip": "destination IPs", "event_type": "event types",
+    "log_type": "log types", "severity": "severities", "user": "users", "host": "hosts",
+    "minute": "minutes", "hour": "hours", "day": "days",
+}
+WINDOWS_FAILED_LOGON = "An account failed to log on"
+
+def category_mentions(question, values):
+    """
+    Dictionary values mentioned in the question as whole words, longest first so that
+    "Login Failure" is preferred over "Login"
+    """
+    mentions = []
+    for value in sorted((str(value) for value in values if value is not None), key=len, reverse=True):
+        if len(value) < 2:
+            continue
+        pattern = rf"(?<![\w-]){re.escape(value)}(?![\w-])"
+        if re.search(pattern, question, re.I) and not any(value.lower() in mention.lower() for mention in mentions):
+            mentions.append(value)
+    return mentions
+
+def names(pattern, question):
+    """
+    Names following "user", "host"... in the question, leaving out ordinary words
+    """
+    return [name for name in pattern.findall(question) if name.lower() not in NOT_NAMES]
+
+def parse_question(question, table):
+    """
+    Turn a count/filter/group-by question into a structured EventTable query
+
+    Only a single question asking "how many", "count of" or "top [N] ... by" is parsed. Questions
+    asking why, what to do or whether something is suspicious, and several questions joined by
+    "and" or "?", are left to the LLM even when they also ask for a count. So are questions naming
+    a user, host or time the table cannot resolve, which would otherwise be counted unfiltered.
+
+    Output:
+        dict with filters, start, end, group_by and limit, or None if the question is not a pure aggregation
+    """
+    if ANALYTICAL_PATTERN.search(question) or MULTI_CLAUSE_PATTERN.search(question.rstrip(" ?!.")):
+        return None
+    counting = COUNT_PATTERN.search(question)
+    ranking = RANKING_PATTERN.search(question)
+    if (not counting and not ranking) or DISTINCT_COUNT_PATTERN.search(question):
+        return None
+
+    filters = {}
+    source_ips = SOURCE_IP_PATTERN.findall(question)
+    destination_ips = DESTINATION_IP_PATTERN.findall(question)
+    other_ips = [ip for ip in ANY_IP_PATTERN.findall(question) if ip not in source_ips + destination_ips]
+    if source_ips or other_ips:
+        filters["source_ip"] = source_ips + other_ips
+    if destination_ips:
+        filters["destination_ip"] = destination_ips
+
+    for column in ("severity", "log_type", "event_type", "host"):
+        if column in table.categories:
+            mentions = category_mentions(question, table.categories[column])
+            if mentions:
+                filters[column] = mentions
+    hosts = names(HOST_PATTERN, question)
+    if hosts and not all(any(host.lower() == str(value).lower() for value in filters.get("host", ())) for host in hosts):
+        return None
+    if FAILED_LOGIN_PATTERN.search(question) and "event_type" in table.categories:
+        known = {str(value).lower() for value in table.categories["event_type"] if value is not None}
+        failed = [value for value in FAILED_LOGIN_EVENT_TYPES + (WINDOWS_FAILED_LOGON,) if value.lower() in known]
+        filters["event_type"] = sorted(set(filters.get("event_type", [])) | set(failed))
+    users = names(USER_PATTERN, question)
+    if users:
+        if "user" not in table.categories or not all(category_mentions(user, table.categories["user"]) for user in users):
+            return None
+        filters["user"] = users
+
+    group_by, limit = [], config.SUMMARY_TOP_N
+    for column, pattern in GROUP_PATTERNS:
+        match = pattern.search(question)
+        # "events by user admin" filters on the user rather than ranking users
+        single_value = len(filters.get(column, ())) == 1
+        if match and not single_value and (column in TIME_BUCKETS or column in table.categories or column in table.ips):
+            group_by.append(column)
+            limit = int(match.group("limit")) if match.group("limit") else limit
+            break
+
+    if not counting and not group_by:
+        return None
+    start, end = time_range(question, table)
+    if UNRESOLVED_TIME_PATTERN.search(question) or (start is None and end is None and DATE_PATTERN.search(question)):
+        return None
+    # a bare "how many events" is answered with the total, "how many <anything else>" is not
+    if not filters and not group_by and start is None and end is None and not EVENTS_COUNT_PATTERN.search(question):
+        return None
+    return {"filters": filters, "start": start, "end": end, "group_by": group_by, "limit": limit}
+
+def time_range(question, table):
+    """
+    (start, end) of the time range mentioned in the question, each None when open
+    """
+    match = BETWEEN_PATTERN.search(question)
+    if match:
+        return match.group(1), match.group(2)
+    match = ON_PATTERN.search(question)
+    if match:
+        day = pd.Timestamp(match.group(1))
+        return str(day), str(day + pd.Timedelta(days=1))
+    match = LAST_PATTERN.search(question)
+    if match:
+        timestamps = table.timestamps
+        valid = timestamps[timestamps != MISSING_TIME]
+        if len(valid):
+            end = pd.Timestamp(int(valid.max()), unit="ms").floor("s") + pd.Timedelta(seconds=1)
+            amount = int(match.group(1) or 1)
+            return str(end - pd.Timedelta(**{f"{match.group(2).lower()}s": amount})), str(end)
+    start = SINCE_PATTERN.search(question)
+    end = BEFORE_PATTERN.search(question)
+    return (start.group(1) if start else None), (end.group(1) if end else None)
+
+def describe_scope(query):
+    """
+    " with severity Critical between ... and ..." description of the filters and time range
+    """
+    parts = [
+        f"{COLUMN_LABELS.get(column, column)} {' or '.join(str(value) for value in values)}"
+        for column, values in query["filters"].items()
+    ]
+    scope = f" with {' and '.join(parts)}" if parts else ""
+    if query["start"] and query["end"]:
+        scope += f" between {query['start']} and {query['end']}"
+    elif query["start"]:
+        scope += f" since {query['start']}"
+    elif query["end"]:
+        scope += f" before {query['end']}"
+    return scope
+
+def render_answer(query, result):
+    """
+    Plain-text answer to a routed question
+    """
+    scope_text = describe_scope(query)
+    if not query["group_by"]:
+        return f"There are {result['count']} events{scope_text}."
+
+    dimension = ", ".join(GROUP_LABELS.get(column, column) for column in query["group_by"])
+    if not result["groups"]:
+        return f"There are no events{scope_text}, so there is nothing to rank by {dimension}."
+    lines = [f"Top {dimension} by number of events{scope_text} ({result['count']} events in total):"]
+    for rank, group in enumerate(result["groups"], 1):
+        label = ", ".join(str(group[column]) for column in query["group_by"])
+        lines.append(f"{rank}. {label}: {group['count']}")
+    return "\n".join(lines)
+
+def route_question(question, table):
+    """
+    Answer count/filter/group-by questions straight from the event table, without the LLM
+
+    Output:
+        dict with answer, query and result, or None if the question should go to the LLM
+    """
+    if table is None or not len(table):
+        return None
+    query = parse_question(question, table)
+    if query is None:
+        return None
+    try:
+        result = table.query(**query)
+    except ValueError:
+        return None
+    return {"answer": render_answer(query, result), "query": query, "result": result}
@@ -0,0 +1,175 @@
+#src/session_store.py
+from src import config
+from collections import OrderedDict
+import threading
+import time
+import uuid
+
+class Session:
+    """
+    Per-analyst state: the latest analysis results and the chatbot seeded with them
+    """
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.analysis_results = {}
+        # changes whenever analysis_results are replaced; clients cache results by it (ETag)
+        self.analysis_version = None
+        self.chatbot = None
+        # LiveAnalysis of the latest upload, created on its first append
+        self.live = None
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        # size_bytes() when the store last measured the session, part of the store's running total
+        self.measured_bytes = 0
+
+    def size_bytes(self):
+        """
+        Approximate memory held by the session: analysis and chat texts, the chat index and event
+        table, and the running state of live appends
+        """
+        size = sum(len(str(value)) for value in self.analysis_results.values())
+        if self.chatbot is not None:
+            size += sum(len(message["content"]) for message in self.chatbot.messages)
+            if self.chatbot.index is not None:
+                size += self.chatbot.index.size_bytes()
+            if self.chatbot.event_table is not None:
+                size += self.chatbot.event_table.size_bytes()
+        if self.live is not None:
+            size += self.live.size_bytes()
+        return size
+
+class SessionStore:
+    """
+    Sessions keyed by the frontend's session_id, with idle-TTL and LRU eviction under a memory cap
+    """
+
+    def __init__(self, max_sessions=None, idle_ttl=None, max_bytes=None, on_evict=None):
+        """
+        Args:
+            max_sessions: sessions kept at most; least recently used ones are evicted first
+            idle_ttl: seconds without access after which a session is dropped
+            max_bytes: cap on the approximate memory held by all sessions together
+            on_evict: optional callback on_evict(session) for every evicted or expired session, e.g. to
+                      delete its stored events; called outside the store's lock
+        """
+        self.max_sessions = max_sessions or config.SESSION_MAX_SESSIONS
+        self.idle_ttl = idle_ttl or config.SESSION_IDLE_TTL
+        self.max_bytes = max_bytes or config.SESSION_MAX_BYTES
+        self.on_evict = on_evict
+        self.evictions = 0
+        # sessions evicted under the lock, handed to on_evict once it is released
+        self._evicted = []
+        # sum of measured_bytes over the sessions
+        self._bytes = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id, create=False):
+        """
+        Look up a session and mark it as recently used
+
+        Args:
+            session_id: id generated by the frontend
+            create: create the session if it does not exist yet
+
+        Output:
+            Session or None
+        """
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is None and create:
+                session = self._sessions[session_id] = Session(session_id)
+            if session is not None:
+                session.last_access = time.time()
+                self._sessions.move_to_end(session_id)
+                self._measure(session)
+            self._enforce_limits(keep=session_id)
+        self._notify_evicted()
+        return session
+
+    def update(self, session_id, analysis_results=None, chatbot=None, live=None):
+        """
+        Store new results, chatbot and/or live analysis for a session, then re-apply the memory cap
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id)
+            if analysis_results is not None:
+                session.analysis_results = analysis_results
+                session.analysis_version = uuid.uuid4().hex
+            if chatbot is not None:
+                session.chatbot = chatbot
+            if live is not None:
+                session.live = live
+            session.last_access = time.time()
+            self._sessions.move_to_end(session_id)
+            self._measure(session)
+            self._enforce_limits(keep=session_id)
+        self._notify_evicted()
+        return session
+
+    def delete(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._bytes -= session.measured_bytes
+            return session is not None
+
+    def _measure(self, session):
+        # sessions grow (chat messages, live appends) through the session handed out by get() or
+        # update(), so measuring it again on each access keeps the total close without walking the others
+        size = session.size_bytes()
+        self._bytes += size - session.measured_bytes
+        session.measured_bytes = size
+
+    def _expire(self):
+        deadline = time.time() - self.idle_ttl
+        # sessions are ordered by last access, so expired ones are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_access >= deadline:
+                break
+            del self._sessions[session_id]
+            self._bytes -= session.measured_bytes
+            self._evicted.append(session)
+            self.evictions += 1
+
+    def _enforce_limits(self, keep=None):
+        while len(self._sessions) > self.max_sessions:
+            self._evict_oldest(keep)
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            self._evict_oldest(keep)
+
+    def _evict_oldest(self, keep=None):
+        for session_id in self._sessions:
+            if session_id != keep:
+                session = self._sessions.pop(session_id)
+                self._bytes -= session.measured_bytes
+                self._evicted.append(session)
+                self.evictions += 1
+                return
+
+    def _notify_evicted(self):
+        with self._lock:
+            evicted, self._evicted = self._evicted, []
+        if self.on_evict is not None:
+            for session in evicted:
+                self.on_evict(session)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "idle_ttl": self.idle_ttl,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,34 @@
+#src/streaming.py
+import json
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+def sse_event(payload) -> str:
+    """
+    Encode a JSON payload as one server-sent event
+    """
+    return f"data: {json.dumps(payload)}\n\n"
+
+def iter_sse_tokens(response, on_done=None):
+    """
+    Yield the tokens of a server-sent event stream produced with sse_event
+
+    Args:
+        response: streaming requests.Response
+        on_done: optional callback receiving the final payload, e.g. the chat's prompt_tokens
+
+    Output:
+        generator: token strings, until the server sends done
+    """
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data: "):
+            continue
+        payload = json.loads(line[len("data: "):])
+        if payload.get("error"):
+            raise RuntimeError(payload["error"])
+        if payload.get("token"):
+            yield payload["token"]
+        if payload.get("done"):
+            if on_done:
+                on_done(payload)
+            return
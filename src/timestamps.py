@@ -0,0 +1,16 @@
+#src/timestamps.py
+import pandas as pd
+
+SYSLOG_TIMESTAMP_FORMAT = "%b %d %H:%M:%S"
+
+def parse_timestamps(values):
+    """
+    Vectorized timestamp parsing for the supported log formats
+
+    ISO-8601 timestamps are tried first; syslog style "Aug 01 08:41:41" is used as a fallback
+    (without a year, so those parse into 1900). Unparseable values become NaT.
+    """
+    parsed = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    if len(parsed) and parsed.isna().all():
+        parsed = pd.to_datetime(values, errors="coerce", format=SYSLOG_TIMESTAMP_FORMAT)
+    return parsed
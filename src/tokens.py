@@ -0,0 +1,42 @@
+#src/tokens.py
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate for llama-style tokenizers (~4 characters per token)
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def pack_by_tokens(texts, token_budget: int, min_items: int = 1):
+    """
+    Group texts into batches whose estimated size stays within token_budget
+
+    Args:
+        texts: iterable of strings
+        token_budget: maximum estimated tokens per batch
+        min_items: a batch is never closed with fewer items than this, even if it exceeds the budget
+
+    Output:
+        generator: lists of strings
+    """
+    batch, size = [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if len(batch) >= min_items and size + tokens > token_budget:
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += tokens
+    if batch:
+        yield batch
+
+
+def truncate_to_tokens(text: str, token_budget: int) -> str:
+    """
+    Cut text to roughly token_budget tokens, at a line break when there is one
+    """
+    limit = token_budget * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n", 0, limit)
+    return text[:cut if cut > 0 else limit].rstrip() + "\n..."
@@ -0,0 +1,132 @@
+#src/uploads.py
+from src import config
+import os
+import zlib
+
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+COMPRESSION_MAGIC = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+
+class UploadTooLargeError(ValueError):
+    pass
+
+def split_compression(filename):
+    """
+    Split "logs.csv.gz" into ("logs.csv", "gzip"); uncompressed names give (filename, None)
+    """
+    name, suffix = os.path.splitext(filename or "")
+    compression = COMPRESSION_SUFFIXES.get(suffix.lower())
+    return (name, compression) if compression else (filename, None)
+
+def detect_compression(head):
+    return next((compression for magic, compression in COMPRESSION_MAGIC.items() if head.startswith(magic)), None)
+
+class LimitedWriter:
+    """
+    Binary file wrapper that counts the bytes written and refuses to go past a limit
+    """
+
+    def __init__(self, f, max_bytes):
+        self.f = f
+        self.max_bytes = max_bytes
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+        if self.written > self.max_bytes:
+            raise UploadTooLargeError(f"Decompressed upload exceeds the limit of {self.max_bytes} bytes")
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+class UploadSpool:
+    """
+    Writes an upload to disk piece by piece as it arrives, decompressing gzip or zstd on the fly
+
+    Memory use is bounded by the piece size: compressed data is inflated in pieces of at most
+    chunk_bytes, so a small, highly compressed upload cannot expand in memory either.
+    """
+
+    def __init__(self, f, compression=None, max_bytes=None, max_decompressed_bytes=None, chunk_bytes=None):
+        """
+        Args:
+            f: binary file the (decompressed) upload is written to; closed by close()
+            compression: "gzip", "zstd", or None to detect it from the first bytes
+            max_bytes: limit on the bytes received
+            max_decompressed_bytes: limit on the bytes written after decompression
+            chunk_bytes: largest piece inflated at once
+        """
+        self.f = f
+        self.compression = compression
+        self.max_bytes = max_bytes or config.UPLOAD_MAX_BYTES
+        self.chunk_bytes = chunk_bytes or config.UPLOAD_CHUNK_BYTES
+        self.output = LimitedWriter(f, max_decompressed_bytes or config.UPLOAD_MAX_DECOMPRESSED_BYTES)
+        self.received = 0
+        self._decoder = None
+        self._started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.f.close()
+
+    @property
+    def written(self):
+        return self.output.written
+
+    def _start(self, head):
+        self.compression = self.compression or detect_compression(head)
+        self._started = True
+        if self.compression == "gzip":
+            # 16 + MAX_WBITS: expect a gzip header and trailer
+            self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise ValueError("zstd-compressed uploads need the zstandard package")
+            self._decoder = zstandard.ZstdDecompressor().stream_writer(self.output, write_size=self.chunk_bytes,
+                                                                       closefd=False)
+
+    def _inflate_gzip(self, data):
+        while data:
+            try:
+                self.output.write(self._decoder.decompress(data, self.chunk_bytes))
+            except zlib.error as e:
+                raise ValueError(f"Invalid gzip data: {e}")
+            data = self._decoder.unconsumed_tail
+            if self._decoder.eof and self._decoder.unused_data:
+                # concatenated gzip members, e.g. from rotated logs joined with cat
+                data = self._decoder.unused_data
+                self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def write(self, data):
+        """
+        Add the next piece of the upload as received
+        """
+        self.received += len(data)
+        if self.received > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the limit of {self.max_bytes} bytes")
+        if not self._started:
+            self._start(data[:4])
+        if self.compression == "gzip":
+            self._inflate_gzip(data)
+        elif self.compression == "zstd":
+            self._decoder.write(data)
+        else:
+            self.output.write(data)
+
+    def close(self):
+        try:
+            if self.compression == "gzip" and self._decoder is not None:
+                self.output.write(self._decoder.flush())
+                if not self._decoder.eof:
+                    raise ValueError("Upload ended in the middle of the gzip stream")
+            elif self.compression == "zstd" and self._decoder is not None:
+                self._decoder.flush()
+        finally:
+            self.f.close()
@@ -0,0 +1,81 @@
+#tests/test_query_router.py
+import pandas as pd
+import pytest
+
+from src import config
+from src.event_table import EventTable
+from src.query_router import parse_question, route_question
+
+@pytest.fixture(scope="module")
+def table():
+    rows = 1500
+    return EventTable.from_frame(pd.DataFrame({
+        "timestamp": pd.date_range("2024-05-01", periods=rows, freq="min").astype(str),
+        "log_type": "Firewall",
+        "event_type": ["Login Failure", "Port Scan", "Connection"] * (rows // 3),
+        "severity": ["Critical", "Low", "Medium"] * (rows // 3),
+        "host": "web-01",
+        "source_ip": [f"192.168.1.{i % 100}" for i in range(rows)],
+        "destination_ip": "10.0.0.2",
+        "user": [f"user{i % 7}" for i in range(rows)],
+        "message": "",
+    }))
+
+@pytest.mark.parametrize("question", [
+    "What is the most serious threat in these logs?",
+    "Which user is most likely compromised and what should I do about it?",
+    "Is 192.168.1.25 an attacker? Why is it the most active?",
+    "How many events are there and which of them look suspicious?",
+    "Which hosts should be investigated first?",
+    "Explain the Port Scan events from 192.168.1.25",
+    "How many attacks came from 192.168.1.25?",
+    "How many users are there?",
+    "Show me the breakdown of events per user",
+    "What are the most common event types?",
+    "Summarize the logs",
+    "How many times did the admin reset passwords?",
+])
+def test_open_questions_go_to_the_llm(table, question):
+    assert parse_question(question, table) is None
+    assert route_question(question, table) is None
+
+def test_count_of_all_events(table):
+    assert route_question("How many events are there?", table)["answer"] == "There are 1500 events."
+
+def test_count_with_filters(table):
+    query = parse_question("How many Critical events from 192.168.1.25?", table)
+    assert query["filters"] == {"source_ip": ["192.168.1.25"], "severity": ["Critical"]}
+    assert query["group_by"] == []
+
+def test_top_n_ranking(table):
+    query = parse_question("Top 3 source IPs by number of events", table)
+    assert query["group_by"] == ["source_ip"]
+    assert query["limit"] == 3
+    assert len(route_question("Top 3 source IPs by number of events", table)["result"]["groups"]) == 3
+
+def test_count_per_dimension(table):
+    assert parse_question("How many events per severity?", table)["group_by"] == ["severity"]
+    assert parse_question("count events by severity", table)["group_by"] == ["severity"]
+
+@pytest.mark.parametrize("question", [
+    "How many failed logins for user bob?",
+    "How many events from host db-02?",
+    "how many events yesterday",
+    "How many events by user admin",
+    "How many events last week?",
+    "How many events at 2024-05-01?",
+])
+def test_unresolved_names_and_times_go_to_the_llm(table, question):
+    # counting these without the filter would answer for the whole table
+    assert parse_question(question, table) is None
+
+def test_known_user_and_host_are_filters(table):
+    query = parse_question("How many failed logins for user user3 on host web-01?", table)
+    assert query["filters"] == {"event_type": ["Login Failure"], "host": ["web-01"], "user": ["user3"]}
+    assert route_question("How many failed logins for user user3?", table)["result"]["count"] == 72
+
+def test_top_ranking_without_a_number(table):
+    query = parse_question("top users by failed logins", table)
+    assert query["group_by"] == ["user"]
+    assert query["filters"] == {"event_type": ["Login Failure"]}
+    assert query["limit"] == config.SUMMARY_TOP_N